@@ -0,0 +1,172 @@
+"""
+Measurements, datasets and baselines shared by the benchmarks.
+"""
+
+import json
+import os
+import platform
+import resource
+import statistics
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+from unittest import mock
+
+# Importing the database changes the working directory, so the paths given to the benchmarks are resolved from
+# this one. This module must be imported before any module of the server
+STARTING_DIRECTORY: str = os.getcwd()
+
+from src.server import settings  # noqa: E402
+from src.server.persistence import database  # noqa: E402
+
+# Directory of the saved baselines
+BASELINES_DIRECTORY: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+# Metrics compared against a baseline, and whether a greater value is worse
+COMPARED_METRICS: dict[str, bool] = {"p50_ms": True, "p99_ms": True, "throughput": False}
+
+
+@contextmanager
+def use_dataset(directory: str) -> Iterator[database.Dataset]:
+    """
+    Serve the jsons of a directory while the context is active. The snapshot, the database and the cache are kept
+    with them
+    :param directory: Directory with users.json and tasks.json
+    :return: Dataset loaded from the directory
+    """
+    directory = os.path.join(STARTING_DIRECTORY, directory)
+    patches = [
+        mock.patch.object(database, "USERS_PATH", os.path.join(directory, "users.json")),
+        mock.patch.object(database, "TASKS_PATH", os.path.join(directory, "tasks.json")),
+        mock.patch.object(database, "SNAPSHOT_PATH", os.path.join(directory, "snapshot.bin")),
+        mock.patch.object(database, "CACHE_DIRECTORY", os.path.join(directory, ".cache")),
+        mock.patch.object(database, "TASKS_LOG_PATH", os.path.join(directory, "tasks.log")),
+        mock.patch.object(database, "DATA_SQLITE_PATH", os.path.join(directory, "data.sqlite3")),
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        yield database.reload_data()
+    finally:
+        for patch in patches:
+            patch.stop()
+        database.StaticData.Current = None
+
+
+def peak_resident_memory() -> int:
+    """
+    Get the maximum memory used by the process so far
+    :return: Peak resident set size, in bytes
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """
+    Summarize the latencies of an operation
+    :param latencies: Seconds taken by each call
+    :return: Number of calls, mean and percentiles in milliseconds
+    """
+    ordered = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 4)
+
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def environment() -> dict[str, Any]:
+    """
+    Describe where the benchmark runs, so that results are only compared with results of the same kind
+    :return: Python version, machine and data settings
+    """
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "DATA_BACKEND": settings.DATA_BACKEND,
+        "DATA_SNAPSHOT": settings.DATA_SNAPSHOT,
+        "DATA_COLUMNAR": settings.DATA_COLUMNAR,
+        "RESULT_CACHE_BYTES": settings.RESULT_CACHE_BYTES,
+    }
+
+
+def save_baseline(name: str, results: dict[str, Any]) -> str:
+    """
+    Save results as a baseline
+    :param name: Name of the baseline
+    :param results: Results of a benchmark
+    :return: Path of the baseline
+    """
+    os.makedirs(BASELINES_DIRECTORY, exist_ok=True)
+    path = os.path.join(BASELINES_DIRECTORY, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+        file.write("\n")
+    return path
+
+
+def load_baseline(name: str) -> Optional[dict[str, Any]]:
+    """
+    Load a saved baseline
+    :param name: Name of the baseline
+    :return: Results of the baseline, None if it was never saved
+    """
+    try:
+        with open(os.path.join(BASELINES_DIRECTORY, f"{name}.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def regressions(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Compare the cases of some results with the ones of a baseline
+    :param results: Results of a benchmark
+    :param baseline: Results of the baseline
+    :param tolerance: Fraction a metric can get worse before it is a regression
+    :return: Description of each regression
+    """
+    found = []
+    for case, metrics in results["cases"].items():
+        for metric, greater_is_worse in COMPARED_METRICS.items():
+            previous, current = baseline["cases"].get(case, {}).get(metric), metrics.get(metric)
+            if not previous or current is None:
+                continue
+            change = (current - previous) / previous
+            if (change if greater_is_worse else -change) > tolerance:
+                found.append(f"{case} {metric}: {previous} -> {current} ({change:+.1%})")
+    return found
+
+
+def report(results: dict[str, Any], save: Optional[str], compare: Optional[str], tolerance: float) -> int:
+    """
+    Print the results of a benchmark, saving them or comparing them with a baseline
+    :param results: Results of a benchmark
+    :param save: Name of the baseline to save the results as
+    :param compare: Name of the baseline to compare the results with
+    :param tolerance: Fraction a metric can get worse before it is a regression
+    :return: Exit status: 1 if there are regressions, 0 otherwise
+    """
+    for case, metrics in results["cases"].items():
+        print(f"{case:<40} " + "  ".join(f"{metric}={value}" for metric, value in metrics.items()))
+    print(f"peak_rss_bytes={results['peak_rss_bytes']}")
+    if save:
+        print(f"saved {save_baseline(save, results)}")
+    if compare:
+        baseline = load_baseline(compare)
+        if baseline is None:
+            print(f"there is no baseline '{compare}'")
+            return 1
+        if baseline["environment"] != results["environment"]:
+            print(f"the baseline was measured in another environment: {baseline['environment']}")
+        found = regressions(results, baseline, tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        return 1 if found else 0
+    return 0
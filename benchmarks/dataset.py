@@ -0,0 +1,159 @@
+"""
+Generator of synthetic users.json and tasks.json files, at the scale of a production dataset.
+
+    python -m benchmarks.dataset --users 10000 --tasks 1000000 --output /tmp/dataset
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+from collections.abc import Iterator
+from typing import Any
+
+# Words the titles are made of, the ones of the titles of the original tasks
+WORDS: list[str] = (
+    "et ut aut qui quia est id quo sed in sit non eum ipsa illo ea nam rerum vel velit quis dolorem laboriosam "
+    "voluptatem omnis nesciunt expedita fugiat veniam minus delectus autem officia facilis repellendus "
+    "perspiciatis consequatur molestiae porro tempora accusamus eos sint distinctio voluptas magnam dolor "
+    "architecto numquam ipsam libero cupiditate quas mollitia natus eveniet odio reprehenderit tenetur earum "
+    "corporis dignissimos explicabo enim ab amet suscipit doloribus adipisci laudantium esse pariatur veritatis"
+).split()
+# Syllables the names of the places, people and companies are made of
+SYLLABLES: list[str] = "ka ro mi len ta vor she bri dan el wick ham ton ley ford mar ga lin os ber port".split()
+STREET_SUFFIXES: list[str] = ["Street", "Avenue", "Light", "Plains", "Extension", "Mall", "Walks", "Crossing", "Trail"]
+COMPANY_SUFFIXES: list[str] = ["LLC", "Group", "and Sons", "Inc", "Crona", "Corkery"]
+# Number of distinct cities, streets and companies. Their frequency follows Zipf's law, as in real address data
+CITIES_COUNT: int = 2000
+STREETS_COUNT: int = 20000
+COMPANIES_COUNT: int = 5000
+
+
+def zipf_weights(count: int, exponent: float = 1.0) -> list[float]:
+    """
+    Get the weights of a Zipf distribution, where the value of rank r is 1 / r ** exponent times as frequent
+    as the first one
+    :param count: Number of values
+    :param exponent: Skew of the distribution
+    :return: Cumulative weights of the values, in order of rank
+    """
+    weights, total = [], 0.0
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+def name(generator: random.Random, syllables: int) -> str:
+    """
+    Build a capitalized name from random syllables
+    :param generator: Random generator
+    :param syllables: Number of syllables
+    :return: Name
+    """
+    return "".join(generator.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def generate_users(generator: random.Random, count: int) -> Iterator[dict[str, Any]]:
+    """
+    Generate users whose cities, streets and companies are shared with a skewed frequency
+    :param generator: Random generator
+    :param count: Number of users
+    :return: Users, in ascending order of identifier
+    """
+    cities = [f"{name(generator, 2)}{generator.choice(['', 'ville', 'borough', 'haven', 'view'])}"
+              for _ in range(CITIES_COUNT)]
+    streets = [f"{name(generator, 2)} {generator.choice(STREET_SUFFIXES)}" for _ in range(STREETS_COUNT)]
+    companies = [f"{name(generator, 3)} {generator.choice(COMPANY_SUFFIXES)}" for _ in range(COMPANIES_COUNT)]
+    city_weights, street_weights = zipf_weights(len(cities)), zipf_weights(len(streets))
+    company_weights = zipf_weights(len(companies))
+
+    for user_id in range(1, count + 1):
+        first_name, last_name = name(generator, 2), name(generator, 3)
+        username = f"{first_name}.{last_name}{user_id}"
+        yield {
+            "id": user_id,
+            "name": f"{first_name} {last_name}",
+            "username": username,
+            "email": f"{username}@example.com",
+            "address": {
+                "street": generator.choices(streets, cum_weights=street_weights)[0],
+                "suite": f"Apt. {generator.randint(1, 999)}",
+                "city": generator.choices(cities, cum_weights=city_weights)[0],
+                "zipcode": f"{generator.randint(10000, 99999)}-{generator.randint(1000, 9999)}",
+                "geo": {
+                    "lat": f"{generator.uniform(-90, 90):.4f}",
+                    "lng": f"{generator.uniform(-180, 180):.4f}",
+                },
+            },
+            "phone": f"1-{generator.randint(100, 999)}-{generator.randint(100, 999)}-{generator.randint(1000, 9999)}",
+            "website": f"{last_name.lower()}.org",
+            "company": {
+                "name": generator.choices(companies, cum_weights=company_weights)[0],
+                "catchPhrase": " ".join(generator.choices(WORDS, k=4)),
+                "bs": " ".join(generator.choices(WORDS, k=3)),
+            },
+        }
+
+
+def generate_tasks(generator: random.Random, count: int, users_count: int) -> Iterator[dict[str, Any]]:
+    """
+    Generate tasks whose titles are made of words with a Zipf distribution, like the words of natural language.
+    Some users have many more tasks than others
+    :param generator: Random generator
+    :param count: Number of tasks
+    :param users_count: Number of users the tasks belong to
+    :return: Tasks, in ascending order of identifier
+    """
+    word_weights = zipf_weights(len(WORDS))
+    user_weights = zipf_weights(users_count, exponent=0.5)
+    for task_id in range(1, count + 1):
+        yield {
+            "user_id": generator.choices(range(1, users_count + 1), cum_weights=user_weights)[0],
+            "id": task_id,
+            "title": " ".join(generator.choices(WORDS, cum_weights=word_weights, k=generator.randint(2, 8))),
+            "completed": generator.random() < 0.4,
+        }
+
+
+def write_json_list(path: str, items: Iterator[dict[str, Any]]) -> None:
+    """
+    Write a json list an item at a time, so that datasets of any size can be written
+    :param path: Json file
+    :param items: Items of the list
+    """
+    with io.open(path, "w", encoding="utf-8") as file:
+        file.write("[")
+        for index, item in enumerate(items):
+            file.write(",\n" if index else "\n")
+            file.write(json.dumps(item, ensure_ascii=False))
+        file.write("\n]\n")
+
+
+def generate_dataset(directory: str, users_count: int, tasks_count: int, seed: int = 0) -> None:
+    """
+    Write users.json and tasks.json into a directory. The same seed always generates the same dataset
+    :param directory: Directory of the jsons
+    :param users_count: Number of users
+    :param tasks_count: Number of tasks
+    :param seed: Seed of the random generator
+    """
+    os.makedirs(directory, exist_ok=True)
+    generator = random.Random(seed)
+    write_json_list(os.path.join(directory, "users.json"), generate_users(generator, users_count))
+    write_json_list(os.path.join(directory, "tasks.json"), generate_tasks(generator, tasks_count, users_count))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument("--users", type=int, default=10_000, help="Number of users")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Number of tasks")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--output", required=True, help="Directory where the jsons are written")
+    arguments = parser.parse_args()
+    generate_dataset(arguments.output, arguments.users, arguments.tasks, arguments.seed)
+
+
+if __name__ == "__main__":
+    main()
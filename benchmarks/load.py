@@ -0,0 +1,157 @@
+"""
+In-process HTTP load driver. Concurrent clients send a mix of requests straight to the ASGI application,
+without a server or sockets in between, so that the results measure the application only.
+
+    python -m benchmarks.load --data /tmp/dataset --concurrency 64 --duration 20 --save load-1m
+    python -m benchmarks.load --data /tmp/dataset --concurrency 64 --duration 20 --compare load-1m
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Any
+from urllib.parse import urlencode
+
+from starlette.types import ASGIApp, Message
+
+from benchmarks.common import environment, peak_resident_memory, report, summarize, use_dataset
+from src.server.app import app
+from src.server.persistence.database import Dataset
+
+
+async def request(application: ASGIApp, path: str, query: dict[str, Any]) -> int:
+    """
+    Send a GET request to an ASGI application, consuming its whole response
+    :param application: ASGI application
+    :param path: Path of the request
+    :param query: Query parameters
+    :return: Status of the response
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    response_status = 0
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        nonlocal response_status
+        if message["type"] == "http.response.start":
+            response_status = message["status"]
+
+    await application(scope, receive, send)
+    return response_status
+
+
+def scenarios(data: Dataset, generator: random.Random) -> dict[str, tuple[float, Any]]:
+    """
+    Build the requests of the mix, with the share of the traffic of each one
+    :param data: Dataset being served
+    :param generator: Random generator
+    :return: Share of the traffic and a function that returns the path and query of a request, by name
+    """
+
+    def user_id() -> int:
+        return data.users[generator.randrange(len(data.users))].id
+
+    def task_id() -> int:
+        return data.tasks[generator.randrange(len(data.tasks))].id
+
+    cities = [data.users[generator.randrange(len(data.users))].address.city for _ in range(20)]
+    words = ["et", "aut", "dolor", "quia", "voluptatem", "laboriosam"]
+    return {
+        "GET /tasks/{id}": (0.35, lambda: (f"/tasks/{task_id()}", {})),
+        "GET /users/{id}": (0.2, lambda: (f"/users/{user_id()}", {})),
+        "GET /users/{id}/tasks": (0.15, lambda: (f"/users/{user_id()}/tasks", {"limit": 50})),
+        "GET /tasks?title": (0.15, lambda: ("/tasks/", {"title": generator.choice(words), "limit": 100})),
+        "GET /tasks?completed": (0.1, lambda: ("/tasks/", {"completed": generator.random() < 0.5, "limit": 100})),
+        "GET /users?city": (0.05, lambda: ("/users/", {"city": generator.choice(cities), "limit": 100})),
+    }
+
+
+async def drive(concurrency: int, duration: float, data: Dataset, seed: int) -> dict[str, Any]:
+    """
+    Keep a number of clients sending requests of the mix, one after the other, for some time
+    :param concurrency: Number of clients
+    :param duration: Seconds to send requests for
+    :param data: Dataset being served
+    :param seed: Seed of the random generator
+    :return: Latencies and throughput of each request of the mix, and of all of them
+    """
+    generator = random.Random(seed)
+    mix = scenarios(data, generator)
+    names, weights = list(mix), [share for share, _ in mix.values()]
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        while time.perf_counter() < deadline:
+            name = generator.choices(names, weights)[0]
+            path, query = mix[name][1]()
+            started = time.perf_counter()
+            response_status = await request(app, path, query)
+            latencies[name].append(time.perf_counter() - started)
+            if response_status >= 500:
+                errors[name] += 1
+
+    await app.router.startup()
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await app.router.shutdown()
+
+    cases: dict[str, Any] = {}
+    for name in names:
+        if latencies[name]:
+            cases[name] = {
+                **summarize(latencies[name]),
+                "throughput": round(len(latencies[name]) / elapsed, 1),
+                "errors": errors[name],
+            }
+    every_latency = [latency for values in latencies.values() for latency in values]
+    cases["all"] = {
+        **summarize(every_latency),
+        "throughput": round(len(every_latency) / elapsed, 1),
+        "errors": sum(errors.values()),
+    }
+    return cases
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load the application with a mix of requests")
+    parser.add_argument("--data", required=True, help="Directory with the users.json and tasks.json to serve")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send requests for")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--save", help="Save the results as a baseline with this name")
+    parser.add_argument("--compare", help="Compare the results with the baseline with this name")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Fraction a metric can get worse")
+    arguments = parser.parse_args()
+
+    with use_dataset(arguments.data) as data:
+        results: dict[str, Any] = {
+            "environment": environment(),
+            "scale": {"users": len(data.users), "tasks": len(data.tasks), "concurrency": arguments.concurrency},
+            "cases": asyncio.run(drive(arguments.concurrency, arguments.duration, data, arguments.seed)),
+            "peak_rss_bytes": peak_resident_memory(),
+        }
+    return report(results, arguments.save, arguments.compare, arguments.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Microbenchmarks of the functions of the repositories, against a generated dataset.
+
+    python -m benchmarks.repositories --data /tmp/dataset --save repositories-1m
+    python -m benchmarks.repositories --data /tmp/dataset --compare repositories-1m
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections.abc import Callable
+from itertools import islice
+from typing import Any
+
+import anyio
+
+from benchmarks.common import environment, peak_resident_memory, report, summarize, use_dataset
+from src.server.persistence.database import Dataset
+from src.server.repositories import tasks, users
+
+# Size of the pages of the lazy iterators, as requested by the clients
+PAGE_SIZE: int = 100
+
+
+def cases(data: Dataset, generator: random.Random) -> dict[str, Callable[[], Any]]:
+    """
+    Build a call of each function of the repositories, with arguments picked from the dataset.
+    Each call gets new random identifiers, so that lookups are not measured against a single hot item
+    :param data: Dataset being served
+    :param generator: Random generator
+    :return: Calls, by name
+    """
+
+    def user_id() -> int:
+        return data.users[generator.randrange(len(data.users))].id
+
+    def task_id() -> int:
+        return data.tasks[generator.randrange(len(data.tasks))].id
+
+    city = data.users[0].address.city
+    return {
+        "tasks.get_task_by_id": lambda: tasks.get_task_by_id(task_id()),
+        "tasks.get_task_by_id_async": lambda: anyio.run(tasks.get_task_by_id_async, task_id()),
+        "tasks.iter_tasks page": lambda: list(islice(tasks.iter_tasks("", None), PAGE_SIZE)),
+        "tasks.iter_tasks page completed": lambda: list(islice(tasks.iter_tasks("", True), PAGE_SIZE)),
+        "tasks.iter_tasks page title": lambda: list(islice(tasks.iter_tasks("dolor", None), PAGE_SIZE)),
+        "tasks.get_all_tasks title": lambda: tasks.get_all_tasks("laboriosam", True),
+        "tasks.get_all_tasks_async page": lambda: anyio.run(tasks.get_all_tasks_async, "", False, None, PAGE_SIZE),
+        "tasks.get_tasks_by_user_id": lambda: list(tasks.get_tasks_by_user_id(user_id(), "", None)),
+        "users.get_user_by_id": lambda: users.get_user_by_id(user_id()),
+        "users.get_user_by_id_async": lambda: anyio.run(users.get_user_by_id_async, user_id()),
+        "users.iter_users page": lambda: list(islice(users.iter_users(None, None, None), PAGE_SIZE)),
+        "users.get_all_users city": lambda: users.get_all_users(None, city, None),
+        "users.get_user_tasks completed": lambda: users.get_user_tasks(user_id(), None, True),
+        "users.get_user_tasks_async page": lambda: anyio.run(
+            users.get_user_tasks_async, user_id(), None, None, None, PAGE_SIZE
+        ),
+    }
+
+
+def measure(call: Callable[[], Any], duration: float, max_calls: int) -> list[float]:
+    """
+    Call a function repeatedly, timing each call
+    :param call: Function to call
+    :param duration: Seconds to keep calling it
+    :param max_calls: Maximum number of calls
+    :return: Seconds taken by each call
+    """
+    call()
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+    while len(latencies) < max_calls and time.perf_counter() < deadline:
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the functions of the repositories")
+    parser.add_argument("--data", required=True, help="Directory with the users.json and tasks.json to serve")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds spent on each function")
+    parser.add_argument("--max-calls", type=int, default=10_000, help="Maximum number of calls of each function")
+    parser.add_argument("--filter", default="", help="Only run the functions whose name contains this text")
+    parser.add_argument("--save", help="Save the results as a baseline with this name")
+    parser.add_argument("--compare", help="Compare the results with the baseline with this name")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Fraction a metric can get worse")
+    arguments = parser.parse_args()
+
+    started = time.perf_counter()
+    with use_dataset(arguments.data) as data:
+        load_seconds = time.perf_counter() - started
+        results: dict[str, Any] = {
+            "environment": environment(),
+            "scale": {"users": len(data.users), "tasks": len(data.tasks), "load_s": round(load_seconds, 3)},
+            "cases": {},
+        }
+        for name, call in cases(data, random.Random(0)).items():
+            if arguments.filter in name:
+                results["cases"][name] = summarize(measure(call, arguments.duration, arguments.max_calls))
+        results["peak_rss_bytes"] = peak_resident_memory()
+    print(f"users={results['scale']['users']} tasks={results['scale']['tasks']} load_s={results['scale']['load_s']}")
+    return report(results, arguments.save, arguments.compare, arguments.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Configuration of gunicorn, which reads this file from the working directory when it starts.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Every worker writes its metrics in this directory, so that '/metrics' aggregates the ones of all of them.
+# It must be set before the workers import the application, and it must start empty
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+else:
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def child_exit(server, worker) -> None:
+    """
+    Discard the gauges of the live processes of a worker that exited, such as its in-flight requests
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
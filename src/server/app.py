@@ -1,8 +1,79 @@
+import logging
+
 from fastapi import FastAPI
 
+from src.server.application.compression import CompressionMiddleware
+from src.server.application.metrics import MetricsMiddleware
+from src.server.application.profiling import ProfilingMiddleware
+from src.server.application.result_cache import ResultCache, ResultCacheMiddleware
+from src.server.persistence.database import load_once, watch_data
+from src.server.routes.health import router as health_router
+from src.server.routes.metrics import router as metrics_router
+from src.server.routes.stats import router as stats_router
 from src.server.routes.tasks import router as tasks_router
 from src.server.routes.users import router as users_router
+from src.server.settings import (
+    COMPRESSION,
+    COMPRESSION_MINIMUM_BYTES,
+    DATA_PRELOAD,
+    DATA_RELOAD_INTERVAL,
+    LOG_LEVEL,
+    METRICS,
+    PROFILING_DIRECTORY,
+    PROFILING_ENABLED,
+    PROFILING_INTERVAL,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_TOKEN,
+    RESULT_CACHE_BYTES,
+)
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 
 app = FastAPI(title="Test API")
 app.include_router(tasks_router, tags=["Task"])
 app.include_router(users_router, tags=["User"])
+app.include_router(stats_router, tags=["Stats"])
+app.include_router(health_router, tags=["Health"])
+
+# Results of the queries on the data, reused until the data is reloaded
+result_cache = ResultCache(RESULT_CACHE_BYTES)
+if RESULT_CACHE_BYTES > 0:
+    app.add_middleware(
+        ResultCacheMiddleware,
+        cache=result_cache,
+        paths=("/tasks", "/users"),
+        minimum_size=COMPRESSION_MINIMUM_BYTES if COMPRESSION else None,
+    )
+# Outside of the result cache, whose responses are already compressed, to compress the responses of the other routes
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MINIMUM_BYTES)
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=PROFILING_TOKEN,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        interval=PROFILING_INTERVAL,
+        directory=PROFILING_DIRECTORY,
+    )
+# Added last, so that it is the outermost middleware and also measures the responses served from the cache
+if METRICS:
+    app.include_router(metrics_router, tags=["Metrics"])
+    app.add_middleware(MetricsMiddleware, routes=app.router)
+
+
+@app.on_event("startup")
+def load_data() -> None:
+    """
+    Load the data before serving requests, when enabled, so that no request waits for it
+    """
+    if DATA_PRELOAD:
+        load_once()
+
+
+@app.on_event("startup")
+def start_data_watcher() -> None:
+    """
+    Reload the data in the background whenever the jsons change, when enabled
+    """
+    if DATA_RELOAD_INTERVAL > 0:
+        watch_data(DATA_RELOAD_INTERVAL)
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+from src.server.application.pagination import MAX_PAGE_SIZE
+
+# Maximum number of identifiers that can be looked up in a single request
+MAX_BATCH_SIZE: int = MAX_PAGE_SIZE
+
+
+def unique_ids(ids: list[int]) -> list[int]:
+    """
+    Remove the repeated identifiers of a batch, checking its size
+    :param ids: Requested identifiers
+    :return: Identifiers in the order they were first requested
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} identifiers can be requested at once.",
+        )
+    return ids
+
+
+def parse_ids(ids: Optional[str]) -> Optional[list[int]]:
+    """
+    Parse a comma separated list of identifiers, such as '1,2,3'
+    :param ids: Value of the 'ids' parameter
+    :return: Identifiers in the order they were first requested, None if there is no list
+    """
+    if ids is None:
+        return None
+    try:
+        parsed = [int(item_id) for item_id in ids.split(",") if item_id.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The identifiers '{ids}' are not a comma separated list of integers.",
+        )
+    return unique_ids(parsed)
@@ -0,0 +1,182 @@
+import zlib
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.server.application.concurrency import run_in_worker
+
+# Compression level of gzip, a balance between the CPU spent and the size saved
+GZIP_LEVEL: int = 6
+# Quality of brotli, on its 0 to 11 scale
+BROTLI_QUALITY: int = 5
+# Encodings the responses can be compressed with, most preferred first when the client accepts them equally
+ENCODINGS: tuple[str, ...] = ("br", "gzip")
+# Media types of the responses that are compressed. Anything else is sent as it is
+COMPRESSIBLE_MEDIA_TYPES: tuple[str, ...] = ("application/json", "application/x-ndjson", "text/")
+# Bytes of a streamed response compressed before flushing them, so that clients keep receiving complete lines
+STREAM_FLUSH_BYTES: int = 64 * 1024
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choose the encoding of a response from the Accept-Encoding header of the request, honouring its quality values
+    :param accept_encoding: Value of the Accept-Encoding header
+    :return: Preferred encoding among ENCODINGS, None to send the response as it is
+    """
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, parameters = part.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressible(response_headers: Headers) -> bool:
+    """
+    Determine if a response can be compressed
+    :param response_headers: Response headers
+    :return: True if its media type is compressible and it is not encoded yet
+    """
+    return "content-encoding" not in response_headers and response_headers.get("content-type", "").startswith(
+        COMPRESSIBLE_MEDIA_TYPES
+    )
+
+
+class Encoder:
+    """
+    Incremental compressor of a response body, in gzip or brotli.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # The gzip container written by zlib has no timestamp, so the same body always gives the same bytes
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def write(self, data: bytes) -> bytes:
+        return self.compressor.process(data) if self.encoding == "br" else self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush() if self.encoding == "br" else self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.finish() if self.encoding == "br" else self.compressor.flush(zlib.Z_FINISH)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a whole response body
+    :param body: Response body
+    :param encoding: Encoding among ENCODINGS
+    :return: Compressed body
+    """
+    encoder = Encoder(encoding)
+    return encoder.write(body) + encoder.finish()
+
+
+def encoded_headers(
+    headers: list[tuple[bytes, bytes]], encoding: str, length: Optional[int]
+) -> list[tuple[bytes, bytes]]:
+    """
+    Build the headers of a compressed response
+    :param headers: Headers of the response as it is
+    :param encoding: Encoding of the body
+    :param length: Length of the compressed body, None when it is streamed
+    :return: Headers with the encoding, and the length of the compressed body
+    """
+    response_headers = MutableHeaders(raw=list(headers))
+    del response_headers["content-length"]
+    if length is not None:
+        response_headers["content-length"] = str(length)
+    response_headers["content-encoding"] = encoding
+    return response_headers.raw
+
+
+def vary_on_encoding(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """
+    Mark a response as depending on the Accept-Encoding header, so that caches keep a copy per encoding
+    :param headers: Response headers
+    :return: Headers with 'Vary: Accept-Encoding'
+    """
+    response_headers = MutableHeaders(raw=list(headers))
+    response_headers.add_vary_header("Accept-Encoding")
+    return response_headers.raw
+
+
+class CompressionMiddleware:
+    """
+    Compresses the responses whose body has at least 'minimum_size' bytes, with the encoding negotiated from the
+    Accept-Encoding header of the request. Whole bodies are compressed on a worker thread, and streamed bodies as they
+    come. Responses that are already encoded, such as the ones served precompressed from the ResultCache, go through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start: Optional[Message] = None
+        encoder: Optional[Encoder] = None
+        pending = 0
+
+        async def compressing(message: Message) -> None:
+            """
+            Hold back the start of the compressible responses until their first body tells if they are compressed
+            """
+            nonlocal start, encoder, pending
+            if message["type"] == "http.response.start":
+                if compressible(Headers(raw=message["headers"])):
+                    start = {**message, "headers": vary_on_encoding(message["headers"])}
+                    return
+            elif message["type"] == "http.response.body" and start is not None:
+                body, more_body = message.get("body", b""), message.get("more_body", False)
+                if encoder is None:
+                    # First body of the response: a whole body smaller than the minimum is sent as it is
+                    response_start, start = start, None
+                    headers = response_start["headers"]
+                    if encoding is None or (not more_body and len(body) < self.minimum_size):
+                        await send(response_start)
+                        await send(message)
+                        return
+                    if not more_body:
+                        body = await run_in_worker(compress, body, encoding)
+                        await send({**response_start, "headers": encoded_headers(headers, encoding, len(body))})
+                        await send({**message, "body": body})
+                        return
+                    start, encoder = response_start, Encoder(encoding)
+                    await send({**response_start, "headers": encoded_headers(headers, encoding, None)})
+                pending += len(body)
+                compressed = encoder.write(body)
+                if not more_body:
+                    compressed += encoder.finish()
+                elif pending >= STREAM_FLUSH_BYTES:
+                    compressed += encoder.flush()
+                    pending = 0
+                await send({**message, "body": compressed})
+                return
+            await send(message)
+
+        await self.app(scope, receive, compressing)
@@ -0,0 +1,93 @@
+from collections.abc import Callable, Iterator
+from itertools import islice
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.server.application.profiling import profiled_run_in_threadpool
+from src.server.persistence.database import StaticData, apply_writes, load_once
+from src.server.settings import DATA_BACKEND, PROFILING_ENABLED
+
+# Maximum number of items collected by a worker thread at a time, before giving control back to the event loop
+SCAN_CHUNK_SIZE: int = 1000
+
+# Runs a function on a worker thread. When profiling is enabled, the thread is sampled if the request is profiled
+run_in_worker = profiled_run_in_threadpool if PROFILING_ENABLED else run_in_threadpool
+
+
+def take(items: Iterator, size: int) -> list:
+    """
+    Consume the next items of an iterator
+    :param items: Iterator to consume
+    :param size: Maximum number of items to consume
+    :return: Consumed items
+    """
+    return list(islice(items, size))
+
+
+async def ensure_loaded() -> None:
+    """
+    Load the data on a worker thread if it is not loaded yet, so that the event loop is never blocked by a load.
+    Once it is loaded, the writes that other processes made to the tasks are applied on a worker thread first,
+    so that every process serves them. With SQLite, checking for those writes is a query, so it runs there too
+    """
+    dataset = StaticData.Current
+    if dataset is None:
+        await run_in_worker(load_once)
+    elif DATA_BACKEND == "sqlite" or dataset.written_elsewhere():
+        await run_in_worker(apply_writes)
+
+
+async def lookup(find: Callable, *args):
+    """
+    Run a lookup of a repository once the data is loaded. It runs on the event loop when the data is in memory,
+    where it is cheap, and on a worker thread with SQLite, where it is a query
+    :param find: Repository function that looks the items up
+    :param args: Arguments of the repository function
+    :return: What the repository function returns
+    """
+    await ensure_loaded()
+    if DATA_BACKEND == "sqlite":
+        return await run_in_worker(find, *args)
+    return find(*args)
+
+
+async def scan(iterate: Callable[..., Iterator], *args) -> Iterator:
+    """
+    Start a scan of a repository on a worker thread, once the data is loaded and the writes of other processes are
+    applied, so that the scan never misses them
+    :param iterate: Repository function that returns a lazy iterator of items
+    :param args: Arguments of the repository function
+    :return: Lazy iterator of items
+    """
+    await ensure_loaded()
+    return await run_in_worker(iterate, *args)
+
+
+async def collect(iterate: Callable[..., Iterator], *args, limit: Optional[int] = None) -> list:
+    """
+    Run a scan of a repository on worker threads, in bounded chunks, without blocking the event loop.
+    Between chunks, the threads are free to serve other requests and the scan stops as soon as it has enough items
+    :param iterate: Repository function that returns a lazy iterator of items
+    :param args: Arguments of the repository function
+    :param limit: Maximum number of items to collect. All when not specified
+    :return: Collected items
+    """
+    return await consume(await scan(iterate, *args), limit)
+
+
+async def consume(items: Iterator, limit: Optional[int] = None) -> list:
+    """
+    Consume a lazy iterator of items on worker threads, in bounded chunks, without blocking the event loop
+    :param items: Iterator to consume
+    :param limit: Maximum number of items to consume. All when not specified
+    :return: Consumed items
+    """
+    collected: list = []
+    while limit is None or len(collected) < limit:
+        size = SCAN_CHUNK_SIZE if limit is None else min(SCAN_CHUNK_SIZE, limit - len(collected))
+        chunk = await run_in_worker(take, items, size)
+        collected += chunk
+        if len(chunk) < size:
+            break
+    return collected
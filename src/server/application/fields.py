@@ -0,0 +1,103 @@
+from collections.abc import Callable, Iterable
+from typing import Any, Optional, Union
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from starlette import status
+
+from src.server.persistence.records import Record
+
+# Fields of the items to return: each field maps to the fields to return of its value, or to None to return all of it
+FieldTree = dict[str, Optional["FieldTree"]]
+
+# Description of the parameter that selects the fields of the items
+FIELDS_DESCRIPTION: str = (
+    "Comma separated fields of the items to return, such as 'id,name,address.city'. Nested fields are separated "
+    "by dots. All the fields when not specified"
+)
+
+
+def parse_fields(fields: Optional[str], model: type[BaseModel]) -> Optional[FieldTree]:
+    """
+    Parse the fields to return, checking that they are fields of the model of the items
+    :param fields: Value of the 'fields' parameter
+    :param model: API model of the items
+    :return: Fields to return, None to return every field
+    """
+    paths = [path.strip() for path in (fields or "").split(",") if path.strip()]
+    if not paths:
+        return None
+    tree: FieldTree = {}
+    for path in paths:
+        node: Optional[FieldTree] = tree
+        current: Optional[type[BaseModel]] = model
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            field = current.__fields__.get(name) if current is not None else None
+            if field is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"The field '{path}' does not exist.",
+                )
+            current = field.type_ if isinstance(field.type_, type) and issubclass(field.type_, BaseModel) else None
+            if depth == len(names) - 1:
+                # The whole value is returned, whatever fields of it were also asked for
+                node[name] = None
+                break
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def project(item: Record, tree: FieldTree) -> dict[str, Any]:
+    """
+    Keep some fields of an item, before it is serialized
+    :param item: Item
+    :param tree: Fields to keep
+    :return: Fields of the item, in the order of its model
+    """
+    data: dict[str, Any] = {}
+    for name in item.fields:
+        if name in tree:
+            value, subtree = getattr(item, name), tree[name]
+            if subtree is not None:
+                data[name] = project(value, subtree)
+            else:
+                data[name] = value.dict() if isinstance(value, Record) else value
+    return data
+
+
+def project_item(item: Record, tree: Optional[FieldTree]) -> Union[Record, dict[str, Any]]:
+    """
+    Keep some fields of an item, if only some of them were asked for
+    :param item: Item
+    :param tree: Fields to keep, None to keep the item as it is
+    :return: Item, or its projection
+    """
+    return project(item, tree) if tree is not None else item
+
+
+def project_items(items: Iterable[Record], tree: Optional[FieldTree]) -> Iterable[Union[Record, dict[str, Any]]]:
+    """
+    Lazily keep some fields of the items
+    :param items: Items
+    :param tree: Fields to keep, None to keep the items as they are
+    :return: Items, or their projections
+    """
+    if tree is None:
+        return items
+    return (project(item, tree) for item in items)
+
+
+def fields_request(model: type[BaseModel]) -> Callable:
+    """
+    Build the dependency that gets the fields to return of the items of a model
+    :param model: API model of the items
+    :return: Dependency
+    """
+
+    async def dependency(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)) -> Optional[FieldTree]:
+        return parse_fields(fields, model)
+
+    return dependency
@@ -0,0 +1,159 @@
+import functools
+import inspect
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Media type of the metrics exposition
+METRICS_MEDIA_TYPE: str = CONTENT_TYPE_LATEST
+# Label of the requests that match no route, so that unknown paths don't create new series
+UNMATCHED_ROUTE: str = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time spent serving a request", ["method", "route", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being served", ["method", "route"], multiprocess_mode="livesum"
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of the response bodies",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, float("inf")),
+)
+REPOSITORY_DURATION = Histogram(
+    "repository_call_duration_seconds", "Time spent in a function of the repositories", ["function"]
+)
+ROWS_SCANNED = Counter("repository_filter_rows_scanned", "Rows evaluated by a filter", ["filter"])
+ROWS_RETURNED = Counter("repository_filter_rows_returned", "Rows that passed a filter", ["filter"])
+DATA_LOAD_DURATION = Histogram(
+    "data_load_duration_seconds", "Time spent loading the data", buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+DATA_ROWS = Gauge("data_rows", "Rows of the data being served", ["entity"], multiprocess_mode="max")
+
+
+def registry() -> CollectorRegistry:
+    """
+    Get the registry to expose. When the application runs in several processes, PROMETHEUS_MULTIPROC_DIR is where
+    each of them writes its metrics, and they are aggregated from there, whichever worker serves the scrape
+    :return: Registry with the metrics of every process
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    aggregated = CollectorRegistry()
+    multiprocess.MultiProcessCollector(aggregated)
+    return aggregated
+
+
+def exposition() -> bytes:
+    """
+    Render the metrics in the text format of Prometheus
+    :return: Metrics of every process
+    """
+    return generate_latest(registry())
+
+
+def timed(function: Callable) -> Callable:
+    """
+    Time the calls of a function of the repositories, whether it is synchronous or a coroutine function
+    """
+    histogram = REPOSITORY_DURATION.labels(function.__name__)
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def coroutine_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return coroutine_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def count_rows(name: str, expression: Callable, items: Iterable) -> Iterator:
+    """
+    Filter items lazily, counting the rows scanned and returned by the filter.
+    The counts are kept locally and added to the metrics once, when the iteration ends or is abandoned
+    :param name: Name of the filter
+    :param expression: Expression that represents the filter to apply
+    :param items: Items to filter
+    :return: Filtered items
+    """
+    scanned = returned = 0
+    try:
+        for item in items:
+            scanned += 1
+            if expression(item):
+                returned += 1
+                yield item
+    finally:
+        ROWS_SCANNED.labels(name).inc(scanned)
+        ROWS_RETURNED.labels(name).inc(returned)
+
+
+def route_template(app: ASGIApp, scope: Scope) -> str:
+    """
+    Find the template of the route a request matches, such as '/users/{id}', to label its metrics
+    :param app: Application whose routes are searched
+    :param scope: Request scope
+    :return: Path template of the route
+    """
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Measures the latency, the concurrency and the size of the responses of the HTTP requests, by route template.
+    """
+
+    def __init__(self, app: ASGIApp, routes: ASGIApp):
+        self.app = app
+        # Application whose routes give the templates, since the middleware wraps it
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(self.routes, scope)
+        status, size = 500, 0
+
+        async def measure(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, measure)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            RESPONSE_SIZE.labels(method, route).observe(size)
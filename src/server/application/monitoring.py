@@ -0,0 +1,27 @@
+import json
+import logging
+import os
+import resource
+
+
+def resident_memory() -> int:
+    """
+    Get the memory currently used by the process
+    :return: Resident set size, in bytes. The peak size when the current one is not available
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields) -> None:
+    """
+    Log an event as a single json document, so that its fields can be parsed by the log collector
+    :param logger: Logger to use
+    :param event: Name of the event
+    :param level: Logging level
+    :param fields: Fields of the event
+    """
+    logger.log(level, json.dumps({"event": event, **fields}, default=str))
@@ -0,0 +1,95 @@
+import base64
+import binascii
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from starlette import status
+from starlette.responses import Response
+
+from src.server.application.fields import FieldTree, project_items
+from src.server.application.responses import list_response
+
+# Maximum number of items that can be requested in a single page
+MAX_PAGE_SIZE: int = 1000
+
+
+def encode_cursor(item_id: int) -> str:
+    """
+    Build the opaque cursor that points after an item
+    :param item_id: Identifier of the last item of a page
+    :return: Cursor
+    """
+    return base64.urlsafe_b64encode(str(item_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Get the identifier of the item a cursor points after
+    :param cursor: Cursor received from a previous page
+    :return: Item identifier, None if there is no cursor
+    """
+    if not cursor:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The cursor '{cursor}' is not valid.",
+        )
+
+
+class PageRequest:
+    """
+    Keyset pagination parameters of a list endpoint. Items are returned in ascending order of their identifier.
+    """
+
+    def __init__(self, limit: Optional[int], after_id: Optional[int]):
+        self.limit = limit
+        self.after_id = after_id
+
+    @property
+    def fetch_size(self) -> Optional[int]:
+        """
+        Number of items to fetch to build the page: one more than the limit, to know if there is a next page
+        """
+        return self.limit + 1 if self.limit is not None else None
+
+
+async def page_request(
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return. All when not specified"
+    ),
+    cursor: Optional[str] = Query(None, description="'next_cursor' of the previous page"),
+) -> PageRequest:
+    """
+    Get the pagination parameters of a request
+    :param limit: Maximum number of items to return
+    :param cursor: Cursor of the previous page
+    :return: Pagination parameters
+    """
+    return PageRequest(limit, decode_cursor(cursor))
+
+
+def page_of(data: list, page: PageRequest) -> tuple[list, Optional[str]]:
+    """
+    Cut a page from the fetched items
+    :param data: Items sorted by identifier, starting after the cursor of the page. At most page.fetch_size of them
+    :param page: Pagination parameters
+    :return: Items of the page, and the cursor of the next page if there are more items
+    """
+    if page.limit is None or len(data) <= page.limit:
+        return data, None
+    return data[: page.limit], encode_cursor(data[page.limit - 1].id)
+
+
+def page_response(data: list, page: PageRequest, fields: Optional[FieldTree] = None) -> Response:
+    """
+    Build a page from the fetched items
+    :param data: Items sorted by identifier, starting after the cursor of the page. At most page.fetch_size of them
+    :param page: Pagination parameters
+    :param fields: Fields of the items to return, None to return every field
+    :return: Page of items, with the shape of GetAllResult and the cursor of the next page if there are more items
+    """
+    items, next_cursor = page_of(data, page)
+    return list_response(project_items(items, fields), next_cursor)
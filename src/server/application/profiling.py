@@ -0,0 +1,241 @@
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Callable, Optional, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.server.application.monitoring import log_event
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Header whose value must be the profiling token to profile a request
+PROFILE_HEADER: str = "x-profile"
+# Header that chooses the format of the profile: 'speedscope' or 'collapsed'
+PROFILE_FORMAT_HEADER: str = "x-profile-format"
+PROFILE_FORMATS: tuple[str, ...] = ("speedscope", "collapsed")
+
+# Profile of the request being served, if it is being profiled. Worker threads inherit it from the request
+CURRENT_PROFILE: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+
+def frame_name(frame: FrameType) -> str:
+    """
+    Name a frame of a call stack
+    :param frame: Frame
+    :return: Function, file and line where the function starts
+    """
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    """
+    Sampling profiler of a single request. A background thread takes the call stack of the threads that serve
+    the request at a regular interval: the event loop thread, while the request is the task it runs, and the worker
+    threads, while they run functions of the request. Other requests are not sampled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # Frame where the stacks of each sampled thread start, by thread identifier
+        self.threads: dict[int, FrameType] = {}
+        # Number of times each stack was sampled, from the outermost frame to the innermost one
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.started = self.finished = 0.0
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    def attach(self, root: FrameType) -> None:
+        """
+        Sample the current thread, from a frame down, until it is detached
+        :param root: Outermost frame of the stacks to sample
+        """
+        self.threads[threading.get_ident()] = root
+
+    def detach(self) -> None:
+        """
+        Stop sampling the current thread
+        """
+        self.threads.pop(threading.get_ident(), None)
+
+    def sample(self) -> None:
+        """
+        Record the stacks of the sampled threads. A stack that doesn't reach its root frame belongs to something else
+        the thread is running, such as another request, and is not recorded
+        """
+        frames = sys._current_frames()
+        for ident, root in list(self.threads.items()):
+            frame: Optional[FrameType] = frames.get(ident)
+            stack: list[str] = []
+            while frame is not None and frame is not root:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if frame is root:
+                stack.append(frame_name(root))
+                self.samples[tuple(reversed(stack))] += 1
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.sampler.join()
+        self.finished = time.perf_counter()
+
+    def collapsed(self) -> str:
+        """
+        Render the profile as collapsed stacks, the input of flame graph tools
+        :return: One line per stack: its frames separated by ';', and the number of samples
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        """
+        Render the profile in the file format of speedscope
+        :param name: Name of the profile
+        :return: Sampled profile, whose weights are seconds
+        """
+        frames: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": frame} for frame in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.finished - self.started,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": name,
+            "exporter": "wazuh-api",
+        }
+
+
+async def profiled_run_in_threadpool(function: Callable[..., T], *args: Any) -> T:
+    """
+    Run a function on a worker thread, sampling the thread when the request is being profiled
+    :param function: Function to run
+    :param args: Arguments of the function
+    :return: Result of the function
+    """
+    profile = CURRENT_PROFILE.get()
+    if profile is None:
+        return await run_in_threadpool(function, *args)
+
+    def sampled() -> T:
+        profile.attach(sys._getframe())
+        try:
+            return function(*args)
+        finally:
+            profile.detach()
+
+    return await run_in_threadpool(sampled)
+
+
+def profile_requested(request_headers: Headers, token: str, sample_rate: float) -> bool:
+    """
+    Determine if a request must be profiled: either it has the profiling token or it is sampled
+    :param request_headers: Request headers
+    :param token: Profiling token. Empty when profiling requests on demand is disabled
+    :param sample_rate: Fraction of the requests to profile
+    :return: True if the request must be profiled
+    """
+    given = request_headers.get(PROFILE_HEADER)
+    if token and given is not None and hmac.compare_digest(given.encode(), token.encode()):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests that carry the profiling token, and a sample of the others, writing a call-tree profile
+    of each one into a directory. It is only installed when profiling is enabled, so that it costs nothing otherwise.
+    """
+
+    def __init__(self, app: ASGIApp, token: str, sample_rate: float, interval: float, directory: str):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = directory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        if not profile_requested(request_headers, self.token, self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(self.interval)
+        profile.attach(sys._getframe())
+        reset = CURRENT_PROFILE.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.detach()
+            profile.stop()
+            CURRENT_PROFILE.reset(reset)
+            output_format = request_headers.get(PROFILE_FORMAT_HEADER, PROFILE_FORMATS[0])
+            output_format = output_format if output_format in PROFILE_FORMATS else PROFILE_FORMATS[0]
+            # The profile is written off the event loop, and failing to write it never hides what the request raised
+            try:
+                await run_in_threadpool(self.write, profile, scope, output_format)
+            except Exception as error:  # the response was already sent
+                log_event(logger, "request_profile_failed", logging.ERROR, path=scope["path"], error=repr(error))
+
+    def write(self, profile: Profile, scope: Scope, output_format: str) -> None:
+        """
+        Write the profile of a request into the profiles directory
+        :param profile: Profile of the request
+        :param scope: Request scope
+        :param output_format: 'speedscope' or 'collapsed'
+        """
+        query = scope.get("query_string", b"").decode("latin-1")
+        name = f"{scope['method']} {scope['path']}{'?' + query if query else ''}"
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{scope['method']} {scope['path']}").strip("-")[:80]
+        if output_format == "collapsed":
+            content, extension = profile.collapsed(), "txt"
+        else:
+            content, extension = json.dumps(profile.speedscope(name)), "json"
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.time_ns()}-{os.getpid()}-{slug}.{extension}")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        log_event(
+            logger,
+            "request_profiled",
+            request=name,
+            path=path,
+            samples=sum(profile.samples.values()),
+            duration_ms=round((profile.finished - profile.started) * 1000, 3),
+        )
@@ -0,0 +1,92 @@
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from src.server.application.utils import to_json
+from src.server.persistence.records import Record
+
+# Media type of the json responses
+JSON_MEDIA_TYPE: str = "application/json"
+
+
+def serialize(item: Union[Record, BaseModel, dict, bytes]) -> bytes:
+    """
+    Serialize an item, reusing the json cached for it when the data was loaded
+    :param item: Record, API model, or projection of a record, to serialize. Items that are already serialized are
+    returned as they are
+    :return: Json of the item
+    """
+    if isinstance(item, bytes):
+        return item
+    if isinstance(item, dict):
+        return to_json(item)
+    if isinstance(item, Record):
+        return item._json if item._json is not None else to_json(item.dict())
+    return to_json(jsonable_encoder(item))
+
+
+def embed(item: Union[Record, BaseModel, dict], name: str, children: Iterable[Union[Record, BaseModel]]) -> bytes:
+    """
+    Serialize an item with a list of other items embedded in it, splicing their serialized json
+    :param item: Item to serialize, whose json is an object
+    :param name: Attribute of the item that holds the embedded items
+    :param children: Items to embed
+    :return: Json of the item, with the embedded items as its last attribute
+    """
+    return b"".join(
+        (serialize(item)[:-1], b',"', name.encode(), b'":[', b",".join(serialize(child) for child in children), b"]}")
+    )
+
+
+def annotate(item: Union[Record, BaseModel, dict], name: str, value: Any) -> bytes:
+    """
+    Serialize an item with an attribute added to it, splicing its serialized json
+    :param item: Item to serialize, whose json is an object
+    :param name: Name of the attribute
+    :param value: Value of the attribute
+    :return: Json of the item, with the attribute as its last one
+    """
+    return b"".join((serialize(item)[:-1], b',"', name.encode(), b'":', to_json(value), b"}"))
+
+
+def item_response(item: Union[Record, BaseModel, dict], status_code: int = 200) -> Response:
+    """
+    Build the response of a single item from its serialized json, without validating it again
+    :param item: Item to return
+    :param status_code: Status of the response
+    :return: Json response
+    """
+    return Response(serialize(item), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def list_response(
+    items: Iterable[Union[Record, BaseModel, dict, bytes]],
+    next_cursor: Optional[str] = None,
+    missing: Optional[list[int]] = None,
+) -> Response:
+    """
+    Build the response of a list of items, with the shape of GetAllResult,
+    by joining the serialized json of the items. total_items is the number of items returned, which is the size of
+    the page when the items are paginated
+    :param items: Items to return
+    :param next_cursor: Cursor of the next page, if there are more items
+    :param missing: Identifiers that were requested and not found, in a batch lookup
+    :return: Json response
+    """
+    fragments: list[bytes] = [serialize(item) for item in items]
+    body = b"".join(
+        (
+            b'{"total_items":',
+            str(len(fragments)).encode(),
+            b',"data":[',
+            b",".join(fragments),
+            b'],"next_cursor":',
+            to_json(next_cursor),
+            b',"missing":' + to_json(missing) if missing is not None else b"",
+            b"}",
+        )
+    )
+    return Response(body, media_type=JSON_MEDIA_TYPE)
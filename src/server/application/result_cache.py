@@ -0,0 +1,240 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.server.application.compression import compress, encoded_headers, negotiate, vary_on_encoding
+from src.server.application.concurrency import ensure_loaded, run_in_worker
+from src.server.application.responses import JSON_MEDIA_TYPE
+from src.server.persistence.database import StaticData
+
+
+class CachedResult:
+    """
+    Response of a request, stored with the generation of the data it was computed from, and with its body
+    compressed in each encoding it was asked in.
+    """
+
+    def __init__(self, generation: int, headers: list[tuple[bytes, bytes]], body: bytes, etag: bytes):
+        self.generation = generation
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.encoded: dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.encoded.values())
+
+
+class ResultCache:
+    """
+    Least recently used cache of responses, bounded by the total size of their bodies.
+    All the results are discarded when the generation of the data changes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self.results: OrderedDict[str, CachedResult] = OrderedDict()
+
+    def clear(self, generation: int) -> None:
+        """
+        Discard every result
+        :param generation: Generation of the data the next results will be computed from
+        """
+        self.results.clear()
+        self.size = 0
+        self.generation = generation
+
+    def get(self, key: str, generation: int) -> Optional[CachedResult]:
+        """
+        Get a result, marking it as the most recently used
+        :param key: Normalized request
+        :param generation: Generation of the data being served
+        :return: The result, None if it is not cached for that generation
+        """
+        if generation != self.generation:
+            self.clear(generation)
+            return None
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """
+        Store a result, discarding the least recently used ones to make room for it
+        :param key: Normalized request
+        :param result: Result to store
+        """
+        if result.generation != self.generation or result.size > self.max_bytes:
+            return
+        previous = self.results.pop(key, None)
+        if previous is not None:
+            self.size -= previous.size
+        self.results[key] = result
+        self.size += result.size
+        self.evict()
+
+    def put_encoded(self, key: str, result: CachedResult, encoding: str, body: bytes) -> None:
+        """
+        Store the compressed body of a result, so that it is not compressed again
+        :param key: Normalized request
+        :param result: Result, that may have been discarded since it was got
+        :param encoding: Encoding of the body
+        :param body: Compressed body
+        """
+        if self.results.get(key) is not result:
+            result.encoded[encoding] = body
+            return
+        self.size -= result.size
+        result.encoded[encoding] = body
+        self.size += result.size
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Discard the least recently used results until the cache is under its size
+        """
+        while self.size > self.max_bytes:
+            _, evicted = self.results.popitem(last=False)
+            self.size -= evicted.size
+
+
+def request_key(scope: Scope, request_headers: Headers) -> str:
+    """
+    Normalize a request, so that the same query with its parameters in another order uses the same result
+    :param scope: Request scope
+    :param request_headers: Request headers. The Accept header is part of the key, since it can change the response
+    :return: Path, sorted query parameters and accepted media types
+    """
+    parameters = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    return f"{scope['path']}?{urlencode(parameters)} {request_headers.get('accept', '')}"
+
+
+def entity_tag(body: bytes) -> bytes:
+    """
+    Build the strong ETag of a response body. It depends only on the body, so every worker gives the same tag
+    :param body: Response body
+    :return: Quoted tag
+    """
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def encoded_tag(etag: bytes, encoding: str) -> bytes:
+    """
+    Build the ETag of a compressed response, that must differ from the one of the response as it is
+    :param etag: Quoted tag of the response as it is
+    :param encoding: Encoding of the body
+    :return: Quoted tag
+    """
+    return etag[:-1] + b"-" + encoding.encode() + b'"'
+
+
+def etag_matches(request_headers: Headers, etag: bytes) -> bool:
+    """
+    Determine if the client already has the response, according to its If-None-Match header
+    :param request_headers: Request headers
+    :param etag: ETag of the response
+    :return: True if the response is not modified
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or etag.decode() in tags
+
+
+class ResultCacheMiddleware:
+    """
+    Serves the json responses of the GET requests from a ResultCache, computing them only when they are not cached
+    for the generation of the data being served. Responses carry a strong ETag, and requests whose If-None-Match
+    has it get a '304 Not Modified' without a body. When 'minimum_size' is given, bodies that have at least that many
+    bytes are sent compressed in the encoding negotiated with the client, and each encoding is compressed once per
+    result and kept with it.
+    """
+
+    def __init__(self, app: ASGIApp, cache: ResultCache, paths: tuple[str, ...], minimum_size: Optional[int] = None):
+        self.app = app
+        self.cache = cache
+        self.paths = paths
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        # The writes of other processes are applied first, so that the results they change are not served
+        await ensure_loaded()
+        request_headers = Headers(scope=scope)
+        key, generation = request_key(scope, request_headers), StaticData.Generation
+        result = self.cache.get(key, generation)
+        if result is not None:
+            await self.send_result(key, result, request_headers, send)
+            return
+
+        start: Optional[Message] = None
+        body: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            """
+            Hold back the successful json responses, forwarding anything else as it comes
+            """
+            nonlocal start
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                if message["status"] == 200 and response_headers.get("content-type") == JSON_MEDIA_TYPE:
+                    start = message
+                    return
+            elif message["type"] == "http.response.body" and start is not None:
+                body.append(message.get("body", b""))
+                return
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        if start is None:
+            return
+
+        content = b"".join(body)
+        result = CachedResult(generation, list(start["headers"]), content, entity_tag(content))
+        # Results computed while the data was being loaded or replaced can't be tied to a single generation
+        if generation != 0 and generation == StaticData.Generation:
+            self.cache.put(key, result)
+        await self.send_result(key, result, request_headers, send)
+
+    async def send_result(self, key: str, result: CachedResult, request_headers: Headers, send: Send) -> None:
+        """
+        Send a result, compressed if the client accepts it, or '304 Not Modified' if the client already has it
+        :param key: Normalized request
+        :param result: Result to send
+        :param request_headers: Request headers
+        :param send: ASGI send channel
+        """
+        encoding = None
+        if self.minimum_size is not None and len(result.body) >= self.minimum_size:
+            encoding = negotiate(request_headers.get("accept-encoding"))
+        headers, body, etag = result.headers, result.body, result.etag
+        if encoding is not None:
+            etag = encoded_tag(result.etag, encoding)
+        if etag_matches(request_headers, etag):
+            headers = [(b"etag", etag)]
+            if self.minimum_size is not None:
+                headers = vary_on_encoding(headers)
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if encoding is not None:
+            body = result.encoded.get(encoding)
+            if body is None:
+                body = await run_in_worker(compress, result.body, encoding)
+                self.cache.put_encoded(key, result, encoding, body)
+            # The encoded response is not compressed again by the CompressionMiddleware, so it is marked here
+            headers = vary_on_encoding(encoded_headers(result.headers, encoding, len(body)))
+        await send({"type": "http.response.start", "status": 200, "headers": [*headers, (b"etag", etag)]})
+        await send({"type": "http.response.body", "body": body})
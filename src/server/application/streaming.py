@@ -0,0 +1,89 @@
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+
+from fastapi import Query, Request
+from starlette.responses import StreamingResponse
+
+from src.server.application.concurrency import consume, run_in_worker
+from src.server.application.pagination import PageRequest, page_of
+from src.server.application.responses import serialize
+from src.server.persistence.records import Record
+
+# Media type of the newline delimited JSON responses
+NDJSON_MEDIA_TYPE: str = "application/x-ndjson"
+# Bytes of serialized items sent in each chunk of a stream
+STREAM_CHUNK_BYTES: int = 64 * 1024
+# Header of a streamed page that has a limit, with the cursor of the next page when there are more items
+NEXT_CURSOR_HEADER: str = "X-Next-Cursor"
+
+
+async def stream_requested(
+    request: Request,
+    stream: bool = Query(
+        False,
+        description=f"Stream the items as {NDJSON_MEDIA_TYPE}, one per line. With a limit, the cursor of the next "
+        f"page is in the {NEXT_CURSOR_HEADER} header",
+    ),
+) -> bool:
+    """
+    Determine if the client asked for the items to be streamed, through the 'stream' parameter or the Accept header
+    :param request: Request being served
+    :param stream: Value of the 'stream' parameter
+    :return: True if the items should be streamed
+    """
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_lines(items: Iterable[Record]) -> Iterator[bytes]:
+    """
+    Serialize the items as they are consumed, one JSON document per line
+    :param items: Items to serialize
+    :return: Lines of the response body
+    """
+    for item in items:
+        yield serialize(item) + b"\n"
+
+
+def ndjson_chunk(lines: Iterator[bytes]) -> bytes:
+    """
+    Consume the next lines of a stream, until they fill a chunk
+    :param lines: Lines of the response body
+    :return: Chunk of the response body, empty when there are no more lines
+    """
+    chunk = bytearray()
+    for line in lines:
+        chunk += line
+        if len(chunk) >= STREAM_CHUNK_BYTES:
+            break
+    return bytes(chunk)
+
+
+async def ndjson_chunks(items: Iterable) -> AsyncIterator[bytes]:
+    """
+    Serialize the items on worker threads a chunk at a time, so that a stream costs a round trip to the threads
+    per chunk, instead of one per item
+    :param items: Items to serialize
+    :return: Chunks of the response body
+    """
+    lines = ndjson_lines(items)
+    while chunk := await run_in_worker(ndjson_chunk, lines):
+        yield chunk
+
+
+async def stream(
+    items: Iterator[Record], page: PageRequest, render: Callable[[Iterable[Record]], Iterable]
+) -> StreamingResponse:
+    """
+    Stream the items straight from the repository, without collecting them first. When a limit is given, the page,
+    which has at most MAX_PAGE_SIZE items, is collected first, so that the cursor of the next page can be sent in the
+    X-Next-Cursor header
+    :param items: Items sorted by identifier, starting after the cursor of the page
+    :param page: Pagination parameters. When a limit is given, at most that many items are streamed
+    :param render: Function that gives what is serialized of the items, such as their projections
+    :return: Newline delimited JSON response
+    """
+    headers = None
+    if page.limit is not None:
+        items, next_cursor = page_of(await consume(items, page.fetch_size), page)
+        if next_cursor is not None:
+            headers = {NEXT_CURSOR_HEADER: next_cursor}
+    return StreamingResponse(ndjson_chunks(render(items)), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -1,11 +1,51 @@
-def filter_if(condition: bool, expression, iterable):
+import json
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from src.server.application.metrics import count_rows
+
+
+def filter_if(condition: bool, expression, iterable, name: Optional[str] = None):
     """
     Allows you to filter an iterable based on a condition. If the condition is met, the filter is applied
     :param condition: Condition to apply the filter
     :param expression: Expression that represents the filter to apply
     :param iterable: Iterable that contains the elements to filter
+    :param name: Name of the filter. When given, the rows it scans and returns are counted in the metrics
     :return: Iterable applying the filters as appropriate
     """
     if condition:
-        return filter(expression, iterable)
+        return count_rows(name, expression, iterable) if name is not None else filter(expression, iterable)
     return iterable
+
+
+def contains_sorted(values: Sequence[int], value: int) -> bool:
+    """
+    Check if a value is in a sorted sequence, using binary search
+    :param values: Sequence sorted in ascending order
+    :param value: Value to find
+    :return: True if the value is in the sequence
+    """
+    index = bisect_left(values, value)
+    return index < len(values) and values[index] == value
+
+
+def intersect_sorted(postings: list[Sequence[int]]) -> list[int]:
+    """
+    Intersect posting lists sorted in ascending order.
+    The shortest list is walked and each of its values is looked up in the others
+    :param postings: Posting lists to intersect
+    :return: Values present in every posting list, in ascending order
+    """
+    shortest, *others = sorted(postings, key=len)
+    return [value for value in shortest if all(contains_sorted(other, value) for other in others)]
+
+
+def to_json(data: Any) -> bytes:
+    """
+    Serialize data the way the json responses are encoded: compact and utf-8
+    :param data: Data made of json types
+    :return: Json document
+    """
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
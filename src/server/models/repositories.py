@@ -1,17 +1,31 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
 class GetAllResult(BaseModel):
     """
     Class that represents the result of getting a list of items from a repository.
+    With a limit, it is a page of the items, and total_items counts the items of the page, not every matching item.
     """
 
-    total_items: int = Field(default=0, ge=0)
-    data: list = Field(default=[])
+    total_items: int = Field(
+        default=0,
+        ge=0,
+        description="Number of items in 'data'. Every matching item when no limit is given, the items of the page "
+        "otherwise. Follow 'next_cursor' to know if there are more.",
+    )
+    data: list = Field(default=[], description="Items, with only the fields asked for in 'fields' when it is given.")
+    next_cursor: Optional[str] = Field(
+        default=None, description="Cursor to get the next page. None when there are no more items."
+    )
+    missing: Optional[list[int]] = Field(
+        default=None, description="Requested identifiers that were not found. Only present in batch lookups."
+    )
 
     class Config:
         schema_extra = {
-            "total_items": 28,
+            "total_items": 3,
             "data": [
                 {"user_id": 1, "id": 4, "title": "et porro tempora", "completed": True},
                 {
@@ -27,12 +41,24 @@ class GetAllResult(BaseModel):
                     "completed": True,
                 },
             ],
+            "next_cursor": "MTY",
         }
 
     def __init__(self, **data):
         """
-        Initialize the object with only the data attribute, to calculate the total_items property based on it
+        Initialize the object, calculating the total_items property based on the data attribute when it is not given
         :param data: data collection
         """
-        data["total_items"] = len(data.get("data", []))
+        data.setdefault("total_items", len(data.get("data", [])))
         super().__init__(**data)
+
+
+class BatchRequest(BaseModel):
+    """
+    Class that represents the identifiers of a batch lookup.
+    """
+
+    ids: list[int] = Field(..., min_items=1, description="Identifiers of the items to get.")
+
+    class Config:
+        schema_extra = {"ids": [1, 4, 15]}
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+
+
+class TaskStats(BaseModel):
+    """
+    Class that represents the number of tasks, by status.
+    """
+
+    total: int = Field(..., ge=0, description="Number of tasks.")
+    completed: int = Field(..., ge=0, description="Number of completed tasks.")
+    pending: int = Field(..., ge=0, description="Number of tasks that are not completed.")
+
+    class Config:
+        schema_extra = {"total": 20, "completed": 11, "pending": 9}
+
+    @classmethod
+    def of(cls, total: int, completed: int, **data) -> "TaskStats":
+        """
+        Build the statistics from the number of tasks and of completed tasks
+        :param total: Number of tasks
+        :param completed: Number of completed tasks
+        :param data: Other attributes of the statistics
+        :return: Statistics
+        """
+        return cls(total=total, completed=completed, pending=total - completed, **data)
+
+
+class UserTaskStats(TaskStats):
+    """
+    Class that represents the number of tasks of a user, by status.
+    """
+
+    user_id: int = Field(..., ge=1)
+
+    class Config:
+        schema_extra = {"user_id": 1, "total": 20, "completed": 11, "pending": 9}
+
+
+class Stats(TaskStats):
+    """
+    Class that represents the number of users and of tasks, by status, of the whole data.
+    """
+
+    users: int = Field(..., ge=0, description="Number of users.")
+
+    class Config:
+        schema_extra = {"users": 10, "total": 200, "completed": 90, "pending": 110}
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -20,3 +22,29 @@ class Task(BaseModel):
             "title": "delectus aut autem",
             "completed": False,
         }
+
+
+class TaskCreate(BaseModel):
+    """
+    Class that represents a task to create. Its identifier is assigned when it is created.
+    """
+
+    user_id: int = Field(..., ge=1, description="User ID should do the task.")
+    title: str = Field(..., description="Task title.")
+    completed: bool = Field(default=False, description="Determines if the task was completed.")
+
+    class Config:
+        schema_extra = {"user_id": 1, "title": "delectus aut autem", "completed": False}
+
+
+class TaskUpdate(BaseModel):
+    """
+    Class that represents the changes of a task. The attributes that are not given keep their value.
+    """
+
+    user_id: Optional[int] = Field(default=None, ge=1, description="User ID should do the task.")
+    title: Optional[str] = Field(default=None, description="Task title.")
+    completed: Optional[bool] = Field(default=None, description="Determines if the task was completed.")
+
+    class Config:
+        schema_extra = {"completed": True}
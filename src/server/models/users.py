@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from src.server.models.repositories import GetAllResult
+from src.server.models.tasks import Task
 
 
 class Geo(BaseModel):
@@ -85,3 +90,32 @@ class User(BaseModel):
                 "bs": "harness real-time e-markets",
             },
         }
+
+
+class NearbyUser(User):
+    """
+    Class that represents a user found near a point.
+    """
+
+    distance_km: float = Field(..., description="Great-circle distance from the point to the user, in kilometers.")
+
+
+class NearbyUsersResult(GetAllResult):
+    """
+    Class that represents the users found near a point, nearest first.
+    """
+
+    data: list[NearbyUser] = Field(
+        default=[], description="Users, nearest first, with only the fields asked for in 'fields' when it is given."
+    )
+
+    class Config:
+        schema_extra = {"total_items": 1, "data": [{**User.Config.schema_example, "distance_km": 12.345}]}
+
+
+class UserWithTasks(User):
+    """
+    Class that represents a user, with its tasks when they are included.
+    """
+
+    tasks: Optional[list[Task]] = Field(default=None, description="Tasks of the user. Only present with include=tasks.")
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import marshal
+import os
+import sys
+from collections.abc import Callable
+from typing import Any, Optional
+
+from src.server.persistence.records import Record
+
+# Identifies the format of the cache files. They are rebuilt when it changes
+CACHE_FORMAT: tuple = ("validated", 1, marshal.version, sys.version_info[:2])
+
+
+def read_cache(cache_path: str, digest: str) -> Optional[list[dict[str, Any]]]:
+    """
+    Read the validated items of a cache file
+    :param cache_path: Cache file
+    :param digest: Hash of the content of the source file
+    :return: Items as dictionaries, None if the cache is missing, unreadable or was built from another content
+    """
+    try:
+        with open(cache_path, "rb") as file:
+            cache_format, cached_digest, rows = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return rows if cache_format == CACHE_FORMAT and cached_digest == digest else None
+
+
+def write_cache(cache_path: str, digest: str, rows: list[dict[str, Any]]) -> None:
+    """
+    Write the validated items into a cache file, replacing it atomically
+    :param cache_path: Cache file
+    :param digest: Hash of the content of the source file
+    :param rows: Items as dictionaries
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        marshal.dump((CACHE_FORMAT, digest, rows), file)
+    os.replace(temporary_path, cache_path)
+
+
+def read_validated(
+    path: str,
+    cache_directory: str,
+    validate: Callable[[dict[str, Any]], Record],
+    construct: Callable[[dict[str, Any]], Record],
+) -> list:
+    """
+    Read the items of a json file, validating them only when the file changed since they were last validated.
+    Validated items are cached, keyed by the hash of the content of the file, and built without validation
+    when the hash matches
+    :param path: Json file with a list of items
+    :param cache_directory: Directory of the cache files
+    :param validate: Builds an item validating its data
+    :param construct: Builds an item from data that was already validated
+    :return: Items
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    cache_path = os.path.join(cache_directory, f"{os.path.basename(path)}.cache")
+
+    rows = read_cache(cache_path, digest)
+    if rows is not None:
+        return [construct(row) for row in rows]
+
+    items = [validate(item) for item in json.loads(content)]
+    try:
+        write_cache(cache_path, digest, [item.dict() for item in items])
+    except OSError:  # the data can still be served, it will be validated again on the next load
+        pass
+    return items
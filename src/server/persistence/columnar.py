@@ -0,0 +1,227 @@
+from collections.abc import Iterator, Sequence
+from functools import reduce
+from typing import Optional
+
+import numpy as np
+
+from src.server.application.metrics import ROWS_RETURNED, ROWS_SCANNED
+from src.server.application.utils import to_json
+from src.server.persistence.records import TaskRecord
+from src.server.persistence.snapshot import MappedIndex, MappedPostings, postings_columns, trigram_key
+
+# Rows evaluated by each vectorized mask. Scans stop at the first chunk that has enough rows for a page
+MASK_CHUNK_SIZE: int = 65536
+
+
+class ColumnarTasks(Sequence):
+    """
+    Tasks stored as columns: identifiers, user identifiers and status in typed arrays,
+    and every title in one utf-8 buffer, delimited by offsets, with a lowercase copy of it to search the titles.
+    Filters are evaluated as vectorized masks over the columns, and a record is built only when a row is accessed.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        user_ids: np.ndarray,
+        completed: np.ndarray,
+        title_offsets: np.ndarray,
+        titles: bytes,
+        lowered_offsets: np.ndarray,
+        lowered_titles: bytes,
+    ):
+        self.ids = ids
+        self.user_ids = user_ids
+        self.completed = completed
+        # Title of row i is titles[title_offsets[i] : title_offsets[i + 1]]
+        self.title_offsets = title_offsets
+        self.titles = titles
+        # Lowercase title of row i is lowered_titles[lowered_offsets[i] : lowered_offsets[i + 1]]. Lowercasing
+        # can change the length of a title, so it has offsets of its own
+        self.lowered_offsets = lowered_offsets
+        self.lowered_titles = lowered_titles
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> TaskRecord:
+        task = TaskRecord(
+            int(self.user_ids[position]), int(self.ids[position]), self.title(position), bool(self.completed[position])
+        )
+        task._json = to_json(task.dict())
+        return task
+
+    def title(self, position: int) -> str:
+        """
+        Get the title of a row without building its task
+        :param position: Row
+        :return: Title
+        """
+        return str(self.titles[self.title_offsets[position] : self.title_offsets[position + 1]], "utf-8")
+
+    def containing(self, text: str, start: int) -> np.ndarray:
+        """
+        Find the rows whose lowercase title contains a text, searching the buffer of the lowercase titles instead of
+        decoding the title of every row. The occurrences are mapped to their rows with a binary search over the
+        offsets, skipping the ones that span two titles, and the search goes on from the end of each row found
+        :param text: Lowercase text
+        :param start: First row to consider
+        :return: Rows, in ascending order
+        """
+        needle, offsets, titles = text.encode(), self.lowered_offsets, self.lowered_titles
+        rows: list[int] = []
+        found = titles.find(needle, int(offsets[start]))
+        while found != -1:
+            row = int(offsets.searchsorted(found, side="right")) - 1
+            end = int(offsets[row + 1])
+            if found + len(needle) <= end:
+                rows.append(row)
+                found = titles.find(needle, end)
+            else:
+                found = titles.find(needle, found + 1)
+        ROWS_SCANNED.labels("tasks.title").inc(len(self) - start)
+        ROWS_RETURNED.labels("tasks.title").inc(len(rows))
+        return np.asarray(rows, dtype=np.int64)
+
+    def position_after(self, task_id: Optional[int]) -> int:
+        """
+        Find where the tasks that come after an identifier start
+        :param task_id: Identifier to skip to, None to start from the beginning
+        :return: Position of the first task whose identifier is greater than task_id
+        """
+        return 0 if task_id is None else int(np.searchsorted(self.ids, task_id, side="right"))
+
+    def select(self, start: int, positions: Optional[Sequence[int]], completed: Optional[bool]) -> Iterator[int]:
+        """
+        Lazily find the rows that have a status, evaluating the mask a chunk of rows at a time.
+        The rows scanned and returned by the mask are counted in the metrics once per chunk
+        :param start: First row to consider
+        :param positions: Rows to consider, in ascending order. None to consider every row
+        :param completed: Status of the rows to find. None to find every row
+        :return: Positions of the rows, in ascending order
+        """
+        if positions is None:
+            for chunk_start in range(start, len(self), MASK_CHUNK_SIZE):
+                chunk_end = min(chunk_start + MASK_CHUNK_SIZE, len(self))
+                if completed is None:
+                    yield from range(chunk_start, chunk_end)
+                else:
+                    selected = np.flatnonzero(self.completed[chunk_start:chunk_end] == completed) + chunk_start
+                    count_mask(chunk_end - chunk_start, len(selected))
+                    yield from selected.tolist()
+            return
+
+        positions = np.asarray(positions, dtype=np.int64)
+        positions = positions[np.searchsorted(positions, start) :]
+        for chunk_start in range(0, len(positions), MASK_CHUNK_SIZE):
+            chunk = positions[chunk_start : chunk_start + MASK_CHUNK_SIZE]
+            if completed is not None:
+                scanned, chunk = len(chunk), chunk[self.completed[chunk] == completed]
+                count_mask(scanned, len(chunk))
+            yield from chunk.tolist()
+
+
+class ColumnarIndex(MappedIndex):
+    """
+    Primary-key index over a typed column of identifiers, whose bulk lookups are a single vectorized search.
+    """
+
+    def get_many(self, item_ids: list[int]) -> list[Optional[int]]:
+        # Identifiers that the type of the column can't hold are not in it, and are searched as its smallest value
+        bounds = np.iinfo(self.ids.dtype)
+        in_range = np.fromiter((bounds.min <= item_id <= bounds.max for item_id in item_ids), np.bool_, len(item_ids))
+        requested = np.fromiter(
+            (item_id if inside else bounds.min for item_id, inside in zip(item_ids, in_range.tolist())),
+            self.ids.dtype,
+            len(item_ids),
+        )
+        positions = np.searchsorted(self.ids, requested)
+        found = in_range & (positions < len(self.ids))
+        found[found] = self.ids[positions[found]] == requested[found]
+        return [int(position) if present else None for position, present in zip(positions.tolist(), found.tolist())]
+
+
+def count_mask(scanned: int, returned: int) -> None:
+    """
+    Count the rows evaluated by the status mask, under the same filter as the status filter of the lists of tasks
+    :param scanned: Rows evaluated
+    :param returned: Rows selected
+    """
+    ROWS_SCANNED.labels("tasks.completed").inc(scanned)
+    ROWS_RETURNED.labels("tasks.completed").inc(returned)
+
+
+def string_column(strings: list[str]) -> tuple[np.ndarray, bytes]:
+    """
+    Store strings in one utf-8 buffer
+    :param strings: Strings
+    :return: Offset where each string starts, followed by the end of the last one, and the buffer
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def columnar_tasks(tasks: list[TaskRecord]) -> ColumnarTasks:
+    """
+    Store tasks as columns
+    :param tasks: Tasks, sorted by identifier
+    :return: Columnar tasks
+    """
+    return ColumnarTasks(
+        np.fromiter((task.id for task in tasks), dtype=np.uint32, count=len(tasks)),
+        np.fromiter((task.user_id for task in tasks), dtype=np.uint32, count=len(tasks)),
+        np.fromiter((task.completed for task in tasks), dtype=np.bool_, count=len(tasks)),
+        *string_column([task.title for task in tasks]),
+        *string_column([task.title.lower() for task in tasks]),
+    )
+
+
+def count_by_user(user_ids: Sequence[int], completed: Sequence[bool]) -> dict[int, tuple[int, int]]:
+    """
+    Count the tasks of each user, and how many of them are completed, with a vectorized pass over the columns
+    :param user_ids: User identifier of each task
+    :param completed: Status of each task
+    :return: Number of tasks and of completed tasks, by user identifier
+    """
+    users, inverse = np.unique(np.asarray(user_ids, dtype=np.uint32), return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(users))
+    done = np.bincount(inverse, weights=np.asarray(completed, dtype=np.bool_), minlength=len(users))
+    return dict(zip(users.tolist(), zip(totals.tolist(), done.astype(np.int64).tolist())))
+
+
+def postings_by_user(tasks: ColumnarTasks) -> MappedPostings:
+    """
+    Build the user_id posting index over the columns, sorting the rows by user with a stable sort
+    :param tasks: Columnar tasks
+    :return: Positions of the tasks of each user, in ascending order, by user identifier
+    """
+    positions = np.argsort(tasks.user_ids, kind="stable").astype(np.uint32)
+    keys, starts = np.unique(tasks.user_ids[positions], return_index=True)
+    return MappedPostings(keys, starts, positions)
+
+
+def postings_by_trigram(tasks_by_trigram: dict) -> MappedPostings:
+    """
+    Flatten the trigram inverted index into typed arrays
+    :param tasks_by_trigram: Positions of the tasks whose lowercase title contains each trigram, by trigram
+    :return: The same posting lists, with the lookup interface of the dictionary
+    """
+    keys, starts, positions = postings_columns(tasks_by_trigram, trigram_key)
+    return MappedPostings(
+        np.frombuffer(keys, dtype=np.uint64),
+        np.frombuffer(starts, dtype=np.uint64),
+        np.frombuffer(positions, dtype=np.uint32),
+        key=trigram_key,
+    )
+
+
+def intersect_postings(postings: list[Sequence[int]]) -> np.ndarray:
+    """
+    Intersect posting lists sorted in ascending order, with vectorized set operations
+    :param postings: Posting lists to intersect
+    :return: Values present in every posting list, in ascending order
+    """
+    arrays = sorted((np.asarray(positions, dtype=np.int64) for positions in postings), key=len)
+    return reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True), arrays)
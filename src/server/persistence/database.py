@@ -1,14 +1,343 @@
+import fcntl
+import functools
+import hashlib
 import io
 import json
+import logging
 import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from typing import Optional
 
+from src.server.application.metrics import DATA_LOAD_DURATION, DATA_ROWS
+from src.server.application.monitoring import log_event, resident_memory
+from src.server.application.utils import to_json
 from src.server.models.tasks import Task
 from src.server.models.users import User
+from src.server.persistence.cache import read_validated
+from src.server.persistence.geo import GeoIndex, locate_users
+from src.server.persistence.columnar import (
+    ColumnarIndex,
+    columnar_tasks,
+    count_by_user,
+    postings_by_trigram,
+    postings_by_user,
+)
+from src.server.persistence.journal import TaskJournal
+from src.server.persistence.records import TaskRecord, UserRecord, task_record, user_record
+from src.server.persistence.snapshot import Snapshot, write_snapshot
+from src.server.persistence.sqlite import (
+    SqliteIndex,
+    SqlitePostings,
+    SqliteStore,
+    SqliteTaskCounts,
+    SqliteTasks,
+    SqliteUsers,
+    SqliteWrites,
+    import_records,
+)
+from src.server.settings import (
+    DATA_BACKEND,
+    DATA_CACHE,
+    DATA_COLUMNAR,
+    DATA_SNAPSHOT,
+    DATA_SQLITE_PATH,
+    TASKS_LOG_COMPACT_ENTRIES,
+)
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+logger = logging.getLogger(__name__)
+
 USERS_PATH: str = "../data/users.json"
 TASKS_PATH: str = "../data/tasks.json"
+SNAPSHOT_PATH: str = "../data/snapshot.bin"
+CACHE_DIRECTORY: str = "../data/.cache"
+TASKS_LOG_PATH: str = "../data/tasks.log"
+# Length of the n-grams used to index the tasks titles
+TRIGRAM_SIZE: int = 3
+
+
+class TaskCounts:
+    """
+    Number of tasks, and of completed tasks, of the whole dataset and of each user.
+    They are counted once, when the dataset is built, so that statistics are answered without reading any task.
+    """
+
+    __slots__ = ("total", "completed", "by_user")
+
+    def __init__(self, by_user: dict[int, tuple[int, int]]):
+        self.by_user = by_user
+        self.total = sum(total for total, _ in by_user.values())
+        self.completed = sum(completed for _, completed in by_user.values())
+
+    def of_user(self, user_id: int) -> tuple[int, int]:
+        """
+        Get the counts of a user
+        :param user_id: User identifier
+        :return: Number of tasks and of completed tasks of the user
+        """
+        return self.by_user.get(user_id, (0, 0))
+
+    def add(self, task: TaskRecord, count: int) -> None:
+        """
+        Count a task that was added, or removed
+        :param task: Task
+        :param count: 1 when the task was added, -1 when it was removed
+        """
+        total, completed = self.of_user(task.user_id)
+        self.by_user[task.user_id] = (total + count, completed + count * task.completed)
+        self.total += count
+        self.completed += count * task.completed
+
+
+def count_tasks(tasks: Sequence[TaskRecord]) -> TaskCounts:
+    """
+    Count the tasks of each user. Columnar and mapped tasks are counted from their columns, without building records
+    :param tasks: Tasks of the dataset
+    :return: Counts of the tasks
+    """
+    user_ids, completed = getattr(tasks, "user_ids", None), getattr(tasks, "completed", None)
+    if user_ids is None or completed is None:
+        user_ids, completed = [task.user_id for task in tasks], [task.completed for task in tasks]
+    return TaskCounts(count_by_user(user_ids, completed))
+
+
+def with_position(postings: Sequence[int], position: int) -> Sequence[int]:
+    """
+    Copy a posting list, adding a position to it
+    :param postings: Positions in ascending order
+    :param position: Position to add
+    :return: New posting list, of the same type
+    """
+    index = bisect_left(postings, position)
+    copy = postings[:index]
+    copy.append(position)
+    copy.extend(postings[index:])
+    return copy
+
+
+def without_position(postings: Sequence[int], position: int) -> Sequence[int]:
+    """
+    Copy a posting list, removing a position from it
+    :param postings: Positions in ascending order
+    :param position: Position to remove
+    :return: New posting list, of the same type
+    """
+    index = bisect_left(postings, position)
+    return postings[:index] + postings[index + 1 :]
+
+
+class Dataset:
+    """
+    One generation of the information of the jsons, with its indexes.
+    Users and tasks are kept in ascending order of their identifier.
+    Reloading the jsons builds a new dataset, that replaces it. When the data is kept in memory, the writes of the
+    tasks update the dataset in place: lists are only appended to, or replaced by modified copies, so that the
+    requests reading them are never broken. A deleted task stays in its position, so that the positions don't move,
+    but it is removed from every index.
+    When the data is served from a snapshot, the lists and indexes are views of its mapping, with the same interface.
+    When the tasks are stored as columns, their list and indexes are typed arrays, with the same interface too.
+    When the data is stored in SQLite, a SqliteDataset queries the database instead.
+    """
+
+    def __init__(
+        self,
+        generation: int,
+        signature: str,
+        users: list[UserRecord],
+        users_index: dict[int, int],
+        tasks: list[TaskRecord],
+        tasks_index: dict[int, int],
+        tasks_by_user: dict[int, list[int]],
+        tasks_by_trigram: dict[str, array],
+        journal: Optional[TaskJournal] = None,
+        task_counts: Optional[TaskCounts] = None,
+    ):
+        self.generation = generation
+        # Version of the jsons the dataset was built from
+        self.signature = signature
+        self.users = users
+        self.tasks = tasks
+        # Primary-key indexes: position of each item in its list, by identifier
+        self.users_index = users_index
+        self.tasks_index = tasks_index
+        # Secondary index: positions of the tasks of each user, by user identifier
+        self.tasks_by_user = tasks_by_user
+        # Spatial index: grid of the coordinates of the users, built on the first search near a point
+        self.located_users: Optional[GeoIndex] = None
+        # Inverted index: positions of the tasks whose lowercase title contains each trigram
+        self.tasks_by_trigram = tasks_by_trigram
+        # Statistics of the tasks, precomputed
+        self.task_counts = task_counts if task_counts is not None else count_tasks(tasks)
+        # Log of the writes of the tasks, None when the tasks can't be written
+        self.journal = journal
+        # Positions of the tasks that were deleted
+        self.deleted: set[int] = set()
+
+    @property
+    def users_by_location(self) -> GeoIndex:
+        """
+        Grid of the coordinates of the users. It is built on the first search, so that the workers that never search
+        near a point don't decode every user of a snapshot to build it
+        """
+        if self.located_users is None:
+            self.located_users = locate_users(self.users)
+        return self.located_users
+
+    def put_task(self, task: TaskRecord) -> None:
+        """
+        Add a task, or replace the task that has its identifier, updating the indexes incrementally
+        :param task: Task. A new task must have a greater identifier than the other tasks
+        """
+        position = self.tasks_index.get(task.id)
+        if position is None:
+            if self.tasks and task.id <= self.tasks[-1].id:
+                raise ValueError(f"The task '{task.id}' must come after the task '{self.tasks[-1].id}'.")
+            position = len(self.tasks)
+            self.tasks.append(task)
+            self.tasks_index[task.id] = position
+            self.tasks_by_user.setdefault(task.user_id, []).append(position)
+            for trigram in trigrams(task.title.lower()):
+                self.tasks_by_trigram.setdefault(trigram, array("I")).append(position)
+            self.task_counts.add(task, 1)
+            return
+
+        previous: TaskRecord = self.tasks[position]
+        self.tasks[position] = task
+        if previous.user_id != task.user_id:
+            self.tasks_by_user[previous.user_id] = without_position(self.tasks_by_user[previous.user_id], position)
+            self.tasks_by_user[task.user_id] = with_position(self.tasks_by_user.get(task.user_id, []), position)
+        previous_trigrams, task_trigrams = trigrams(previous.title.lower()), trigrams(task.title.lower())
+        for trigram in previous_trigrams - task_trigrams:
+            self.tasks_by_trigram[trigram] = without_position(self.tasks_by_trigram[trigram], position)
+        for trigram in task_trigrams - previous_trigrams:
+            self.tasks_by_trigram[trigram] = with_position(self.tasks_by_trigram.get(trigram, array("I")), position)
+        self.task_counts.add(previous, -1)
+        self.task_counts.add(task, 1)
+
+    def delete_task(self, task_id: int) -> None:
+        """
+        Delete a task, removing it from the indexes incrementally
+        :param task_id: Task identifier
+        """
+        position = self.tasks_index.pop(task_id, None)
+        if position is None:
+            return
+        task: TaskRecord = self.tasks[position]
+        self.deleted.add(position)
+        self.tasks_by_user[task.user_id] = without_position(self.tasks_by_user[task.user_id], position)
+        for trigram in trigrams(task.title.lower()):
+            self.tasks_by_trigram[trigram] = without_position(self.tasks_by_trigram[trigram], position)
+        self.task_counts.add(task, -1)
+
+    def apply(self, entries: list[dict]) -> None:
+        """
+        Apply entries of the log of the writes of the tasks
+        :param entries: Entries, {"put": task} or {"delete": task identifier}
+        """
+        for entry in entries:
+            if "put" in entry:
+                self.put_task(cache_json([validate_task(entry["put"])])[0])
+            else:
+                self.delete_task(entry["delete"])
+
+    def next_task_id(self) -> int:
+        """
+        Get the identifier of the next task to add, never reusing the identifier of a deleted task
+        :return: Task identifier
+        """
+        last_id = self.tasks[-1].id if self.tasks else 0
+        return max(last_id, self.journal.last_id if self.journal is not None else 0) + 1
+
+    def trigram_postings(self, text: Optional[str]) -> Optional[list[array]]:
+        """
+        Get the posting lists to intersect in order to find the tasks whose title contains a text.
+        The intersection only gives candidates, which must then be verified against the text
+        :param text: Text that a task title should contain
+        :return: Posting lists of the trigrams of the text, None if the text is too short to use the index
+        """
+        text = text.lower() if text is not None else ""
+        if len(text) < TRIGRAM_SIZE:
+            return None
+        return [self.tasks_by_trigram.get(trigram, array("I")) for trigram in trigrams(text)]
+
+    def changed(self) -> bool:
+        """
+        Determine if the jsons changed since the dataset was built
+        """
+        return self.signature != source_signature()
+
+    def written_elsewhere(self) -> bool:
+        """
+        Determine if other processes wrote the tasks since this one last read them. It only compares the size and the
+        file of the log with the ones that were read, so it is cheap enough to be checked on every request.
+        With SQLite, it queries the version of the database instead, so it is checked on a worker thread
+        """
+        return self.journal is not None and self.journal.changed()
+
+    def catch_up(self) -> Optional[int]:
+        """
+        Apply the entries other processes appended to the log since it was last read.
+        It must be called holding StaticData.Lock
+        :return: Number of entries applied, None if the log was compacted since, and must be replayed from the beginning
+        """
+        with self.journal.locked():
+            entries = self.journal.tail()
+            if entries is None:
+                return None
+            self.apply(entries)
+        return len(entries)
+
+
+class SqliteDataset(Dataset):
+    """
+    Data stored in a SQLite database, that every request queries. The position of an item is its identifier, so that
+    the lists and indexes keep the interface of the ones kept in memory. Searches are answered by the database, and
+    writes are committed to it, so there is nothing to apply in memory.
+    """
+
+    def __init__(self, generation: int, store: SqliteStore):
+        super().__init__(
+            generation,
+            store.path,
+            SqliteUsers(store),
+            SqliteIndex(store, "users"),
+            SqliteTasks(store),
+            SqliteIndex(store, "tasks"),
+            SqlitePostings(),
+            {},
+            SqliteWrites(store),
+            SqliteTaskCounts(store),
+        )
+        self.store = store
+
+    def apply(self, entries: list[dict]) -> None:
+        """
+        The writes are applied by the database
+        """
+
+    def next_task_id(self) -> int:
+        return self.journal.last_id + 1
+
+    def changed(self) -> bool:
+        """
+        The jsons are not imported again
+        """
+        return False
+
+    def catch_up(self) -> Optional[int]:
+        """
+        The writes of other processes are already in the database, so they only give the dataset a new generation.
+        It must be called holding StaticData.Lock
+        :return: Number of writes since the version that was read
+        """
+        version = self.journal.current_version()
+        writes, self.journal.version = version - self.journal.version, version
+        return writes
 
 
 class StaticData:
@@ -17,40 +346,515 @@ class StaticData:
     It is used to simulate the database.
     """
 
-    Users: list[User] = []
-    Tasks: list[Task] = []
+    # Dataset being served, None until the jsons are loaded
+    Current: Optional[Dataset] = None
+    # Number of datasets loaded so far
+    Generation: int = 0
+    # Serializes the loads, so that a dataset is never built twice at the same time
+    Lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def ready(cls) -> bool:
+        """
+        Determine if the data is loaded and can be served
+        """
+        return cls.Current is not None
 
 
-def load_users(function):
+def index_by_id(items: list) -> dict[int, int]:
     """
-    It allows to load the static information corresponding to the users, in case it is not previously loaded.
-    It is used in the user repository
+    Build a primary-key index over a list of items
+    :param items: Items that have an 'id' attribute
+    :return: Position of each item in the list, by identifier
     """
+    return {item.id: position for position, item in enumerate(items)}
 
-    def wrapper(*args, **kwargs):
-        if not StaticData.Users:
-            print("Loading users...")
-            with io.open(USERS_PATH, "r", encoding="utf-8") as jsonFile:
-                StaticData.Users = [User(**user) for user in json.load(jsonFile)]
-                print(f"Number of uploaded 'users' - {len(StaticData.Users)}")
 
-        return function(*args, **kwargs)
+def positions_of(index, item_ids: list[int]) -> list[Optional[int]]:
+    """
+    Look up many identifiers in a primary-key index at once, in bulk when the index supports it
+    :param index: Primary-key index
+    :param item_ids: Identifiers to look up
+    :return: Position of each identifier, None for the ones that are not in the index
+    """
+    get_many = getattr(index, "get_many", None)
+    return get_many(item_ids) if get_many is not None else [index.get(item_id) for item_id in item_ids]
 
-    return wrapper
+
+def items_at(items: list, positions: list[int]) -> list:
+    """
+    Get the items at many positions at once, in bulk when the list supports it
+    :param items: Items
+    :param positions: Positions of the items
+    :return: Items, in the order of the positions
+    """
+    fetch_many = getattr(items, "fetch_many", None)
+    return fetch_many(positions) if fetch_many is not None else [items[position] for position in positions]
+
+
+def find_by_ids(items: list, index, item_ids: list[int]) -> tuple[list, list[int]]:
+    """
+    Get many items based on their identifiers, looking them up and getting them in bulk
+    :param items: Items sorted by identifier
+    :param index: Primary-key index of the items
+    :param item_ids: Identifiers of the items to get
+    :return: Items found, in the order of the identifiers, and the identifiers that were not found
+    """
+    positions, missing = [], []
+    for item_id, position in zip(item_ids, positions_of(index, item_ids)):
+        if position is None:
+            missing.append(item_id)
+        else:
+            positions.append(position)
+    return items_at(items, positions), missing
+
+
+def position_after(items: list, item_id: Optional[int]) -> int:
+    """
+    Find where the items that come after an identifier start, using binary search
+    :param items: Items sorted by identifier
+    :param item_id: Identifier to skip to, None to start from the beginning
+    :return: Position of the first item whose identifier is greater than item_id
+    """
+    low, high = 0, len(items)
+    if item_id is None:
+        return low
+    while low < high:
+        middle = (low + high) // 2
+        if items[middle].id <= item_id:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def index_by_user(tasks: list[TaskRecord]) -> dict[int, list[int]]:
+    """
+    Build the user_id posting index over the tasks
+    :param tasks: Tasks to index
+    :return: Positions of the tasks of each user, in ascending order, by user identifier
+    """
+    postings: dict[int, list[int]] = {}
+    for position, task in enumerate(tasks):
+        postings.setdefault(task.user_id, []).append(position)
+    return postings
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Get the distinct trigrams of a text
+    :param text: Text to split
+    :return: Trigrams of the text
+    """
+    return {text[i : i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+def index_by_trigram(tasks: list[TaskRecord]) -> dict[str, array]:
+    """
+    Build the trigram inverted index over the lowercase titles of the tasks
+    :param tasks: Tasks to index
+    :return: Positions of the tasks, in ascending order, by trigram
+    """
+    postings: dict[str, array] = {}
+    for position, task in enumerate(tasks):
+        for trigram in trigrams(task.title.lower()):
+            postings.setdefault(trigram, array("I")).append(position)
+    return postings
+
+
+def cache_json(items: list) -> list:
+    """
+    Serialize each item once, so that the responses reuse its json instead of serializing it on every request
+    :param items: Items to serialize
+    :return: The same items
+    """
+    for item in items:
+        item._json = to_json(item.dict())
+    return items
+
+
+def validate_user(data: dict) -> UserRecord:
+    """
+    Validate a user with its API model, keeping it as a record
+    :param data: User as a dictionary
+    :return: User record
+    """
+    return user_record(User(**data).dict())
+
+
+def validate_task(data: dict) -> TaskRecord:
+    """
+    Validate a task with its API model, keeping it as a record
+    :param data: Task as a dictionary
+    :return: Task record
+    """
+    return task_record(Task(**data).dict())
+
+
+def read_users() -> list[UserRecord]:
+    """
+    Read and validate the users json. When the cache is enabled, users are validated only if the json changed
+    :return: Users, sorted by identifier
+    """
+    if DATA_CACHE:
+        users = read_validated(USERS_PATH, CACHE_DIRECTORY, validate_user, user_record)
+    else:
+        with io.open(USERS_PATH, "r", encoding="utf-8") as jsonFile:
+            users = [validate_user(user) for user in json.load(jsonFile)]
+    users.sort(key=lambda user: user.id)
+    return users
+
+
+def read_tasks() -> list[TaskRecord]:
+    """
+    Read and validate the tasks json. When the cache is enabled, tasks are validated only if the json changed
+    :return: Tasks, sorted by identifier
+    """
+    if DATA_CACHE:
+        tasks = read_validated(TASKS_PATH, CACHE_DIRECTORY, validate_task, task_record)
+    else:
+        with io.open(TASKS_PATH, "r", encoding="utf-8") as jsonFile:
+            tasks = [validate_task(task) for task in json.load(jsonFile)]
+    tasks.sort(key=lambda task: task.id)
+    return tasks
+
+
+def apply_changes(tasks: list[TaskRecord], changes: dict[int, dict]) -> list[TaskRecord]:
+    """
+    Apply the last write of each task on top of the tasks of the json
+    :param tasks: Tasks of the json
+    :param changes: Last entry of the log of each task that was written, by task identifier
+    :return: Tasks, sorted by identifier
+    """
+    if not changes:
+        return tasks
+    tasks_by_id = {task.id: task for task in tasks}
+    for task_id, entry in changes.items():
+        if "put" in entry:
+            tasks_by_id[task_id] = validate_task(entry["put"])
+        else:
+            tasks_by_id.pop(task_id, None)
+    return sorted(tasks_by_id.values(), key=lambda task: task.id)
+
+
+def source_signature() -> str:
+    """
+    Identify the current version of the jsons without reading them
+    :return: Hash of the size and modification time of the jsons
+    """
+    stats = [os.stat(path) for path in (USERS_PATH, TASKS_PATH)]
+    return hashlib.sha256(" ".join(f"{stat.st_size}:{stat.st_mtime_ns}" for stat in stats).encode()).hexdigest()
+
+
+def compile_snapshot() -> None:
+    """
+    Compile the jsons, and the indexes of their data, into the snapshot file
+    """
+    log_event(logger, "snapshot_compiling", path=SNAPSHOT_PATH)
+    signature = source_signature()
+    tasks = read_tasks()
+    write_snapshot(
+        SNAPSHOT_PATH, signature, read_users(), tasks, index_by_user(tasks), index_by_trigram(tasks)
+    )
+
+
+def open_snapshot() -> Snapshot:
+    """
+    Map the snapshot file, compiling it first when it is missing or the jsons changed since it was compiled.
+    Workers wait for each other, so that only one of them compiles it
+    :return: Snapshot of the current jsons
+    """
+    with io.open(f"{SNAPSHOT_PATH}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            snapshot = Snapshot(SNAPSHOT_PATH)
+        except (OSError, ValueError):
+            snapshot = None
+        if snapshot is None or snapshot.signature != source_signature():
+            compile_snapshot()
+            snapshot = Snapshot(SNAPSHOT_PATH)
+    return snapshot
+
+
+def import_sqlite(path: str) -> None:
+    """
+    Import the jsons, with the writes of the log of the tasks, into a new SQLite database
+    :param path: Path of the database
+    """
+    started = time.perf_counter()
+    journal = TaskJournal(TASKS_LOG_PATH)
+    journal.replay()
+    users, tasks = read_users(), apply_changes(read_tasks(), journal.changes)
+    import_records(path, users, tasks)
+    log_event(
+        logger,
+        "sqlite_imported",
+        path=path,
+        users=len(users),
+        tasks=len(tasks),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+
+def open_database() -> SqliteStore:
+    """
+    Open the SQLite database, importing the jsons into it first when it doesn't exist.
+    Workers wait for each other, so that only one of them imports it
+    :return: Database
+    """
+    with io.open(f"{DATA_SQLITE_PATH}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(DATA_SQLITE_PATH):
+            import_sqlite(DATA_SQLITE_PATH)
+    return SqliteStore(DATA_SQLITE_PATH)
+
+
+def build_dataset(generation: int) -> Dataset:
+    """
+    Read the jsons, or their snapshot, and build their indexes. With SQLite, the database is opened instead
+    :param generation: Generation of the dataset
+    :return: Dataset
+    """
+    if DATA_BACKEND == "sqlite":
+        return SqliteDataset(generation, open_database())
+
+    if DATA_SNAPSHOT:
+        snapshot = open_snapshot()
+        return Dataset(
+            generation,
+            snapshot.signature,
+            snapshot.users,
+            snapshot.users_index,
+            snapshot.tasks,
+            snapshot.tasks_index,
+            snapshot.tasks_by_user,
+            snapshot.tasks_by_trigram,
+        )
+
+    signature = source_signature()
+    if DATA_COLUMNAR:
+        users, tasks = cache_json(read_users()), read_tasks()
+        columns = columnar_tasks(tasks)
+        return Dataset(
+            generation,
+            signature,
+            users,
+            index_by_id(users),
+            columns,
+            ColumnarIndex(columns.ids),
+            postings_by_user(columns),
+            postings_by_trigram(index_by_trigram(tasks)),
+        )
+
+    journal = TaskJournal(TASKS_LOG_PATH)
+    journal.replay()
+    users, tasks = cache_json(read_users()), cache_json(apply_changes(read_tasks(), journal.changes))
+    return Dataset(
+        generation,
+        signature,
+        users,
+        index_by_id(users),
+        tasks,
+        index_by_id(tasks),
+        index_by_user(tasks),
+        index_by_trigram(tasks),
+        journal,
+    )
+
+
+def replace_dataset() -> Dataset:
+    """
+    Build a new dataset from the jsons and swap it in. Requests being served keep the dataset they started with,
+    so they never see a partially loaded dataset. It must be called holding StaticData.Lock
+    :return: Dataset being served
+    """
+    started, memory = time.perf_counter(), resident_memory()
+    dataset = build_dataset(StaticData.Generation + 1)
+    StaticData.Current, StaticData.Generation = dataset, dataset.generation
+    duration = time.perf_counter() - started
+    DATA_LOAD_DURATION.observe(duration)
+    DATA_ROWS.labels("users").set(len(dataset.users))
+    DATA_ROWS.labels("tasks").set(len(dataset.tasks))
+    log_event(
+        logger,
+        "data_loaded",
+        generation=dataset.generation,
+        backend=DATA_BACKEND,
+        snapshot=DATA_SNAPSHOT,
+        columnar=DATA_COLUMNAR and not DATA_SNAPSHOT,
+        users=len(dataset.users),
+        tasks=len(dataset.tasks),
+        duration_ms=round(duration * 1000, 3),
+        memory_bytes=resident_memory() - memory,
+    )
+    return dataset
+
+
+def reload_data() -> Dataset:
+    """
+    Build a new dataset from the jsons and swap it in, waiting for any load in progress to finish first
+    :return: Dataset being served
+    """
+    with StaticData.Lock:
+        return replace_dataset()
+
+
+def load_once() -> Dataset:
+    """
+    Load the data if it is not loaded yet. When several threads get here at the same time,
+    only one of them loads the data and the others wait for it
+    :return: Dataset being served
+    """
+    dataset = StaticData.Current
+    if dataset is None:
+        with StaticData.Lock:
+            dataset = StaticData.Current or replace_dataset()
+    return dataset
+
+
+def reload_if_changed() -> bool:
+    """
+    Reload the data if the jsons changed since the dataset being served was built
+    :return: True if the data was reloaded
+    """
+    dataset = StaticData.Current
+    if dataset is not None and not dataset.changed():
+        return False
+    reload_data()
+    return True
+
+
+def next_generation(dataset: Dataset) -> None:
+    """
+    Give a new generation to a dataset that was modified, so that the results computed from it are discarded.
+    It must be called holding StaticData.Lock
+    :param dataset: Dataset being served
+    """
+    StaticData.Generation += 1
+    dataset.generation = StaticData.Generation
+    DATA_ROWS.labels("tasks").set(dataset.task_counts.total)
+
+
+def apply_writes() -> bool:
+    """
+    Apply the writes that other processes made to the tasks since this one last read them, without reloading the
+    data. It is only replayed from the beginning when another process compacted the log
+    :return: True if there were writes to apply
+    """
+    dataset = StaticData.Current
+    if dataset is None or not dataset.written_elsewhere():
+        return False
+    with StaticData.Lock:
+        dataset = StaticData.Current
+        if dataset is None or not dataset.written_elsewhere():
+            return False
+        applied = dataset.catch_up()
+        if applied is None:
+            replace_dataset()
+        elif applied:
+            next_generation(dataset)
+        return applied != 0
+
+
+def write_tasks(change: Callable[[Dataset], Optional[dict]]) -> Optional[dict]:
+    """
+    Write a change of the tasks. The entries other processes appended to the log are applied first, so that the
+    change is built from the latest tasks. Its entry is then appended to the log and applied to the dataset,
+    without reloading it
+    :param change: Function that builds the entry of the log from the dataset. It returns None to write nothing
+    :return: Entry written, None if nothing was written
+    """
+    load_once()
+    with StaticData.Lock:
+        while True:
+            dataset = StaticData.Current
+            if dataset.journal is None:
+                raise RuntimeError("The tasks can only be written when the data is kept in memory or in SQLite.")
+            with dataset.journal.locked():
+                entries = dataset.journal.tail()
+                if entries is not None:
+                    dataset.apply(entries)
+                    entry = change(dataset)
+                    if entry is not None:
+                        dataset.journal.append(entry)
+                        dataset.apply([entry])
+                    if entries or entry is not None:
+                        next_generation(dataset)
+                    break
+            # Another process compacted the log, so it is replayed from the beginning
+            replace_dataset()
+        journal = dataset.journal
+        if 0 < TASKS_LOG_COMPACT_ENTRIES <= journal.entries and not journal.compacting:
+            journal.compacting = True
+            threading.Thread(target=compact_tasks_log, name="tasks-log-compaction", daemon=True).start()
+    return entry
+
+
+def compact_tasks_log() -> None:
+    """
+    Compact the log of the writes of the tasks, keeping only the last entry of each task.
+    The requests that read the data are served meanwhile, while writes wait for it to finish
+    """
+    started = time.perf_counter()
+    with StaticData.Lock:
+        dataset = StaticData.Current
+        journal = dataset.journal if dataset is not None else None
+        if journal is None:
+            return
+        try:
+            with journal.locked():
+                entries = journal.tail()
+                # A log compacted by another process is replayed by the next request or write
+                if entries is None:
+                    return
+                if entries:
+                    dataset.apply(entries)
+                    next_generation(dataset)
+                compacted = journal.entries
+                journal.compact()
+        except Exception as error:  # the log is kept as it is until the next compaction
+            log_event(logger, "tasks_log_compaction_failed", logging.ERROR, error=repr(error))
+            return
+        finally:
+            journal.compacting = False
+    log_event(
+        logger,
+        "tasks_log_compacted",
+        entries=compacted,
+        tasks=len(journal.changes),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+
+def watch_data(interval: float) -> threading.Thread:
+    """
+    Start polling the jsons in the background, reloading the data when they change
+    :param interval: Seconds between checks
+    :return: Thread that polls the jsons
+    """
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                reload_if_changed()
+            except Exception as error:  # the dataset being served is kept until the jsons can be loaded
+                log_event(logger, "data_reload_failed", logging.ERROR, error=repr(error))
+
+    thread = threading.Thread(target=watch, name="data-watcher", daemon=True)
+    thread.start()
+    return thread
 
 
-def load_tasks(function):
+def load_data(function):
     """
-    It allows to load the static information corresponding to the tasks, in case it is not previously loaded.
-    It is used in the user repository
+    It allows to load the static information of the jsons, in case it is not previously loaded.
+    It is used in the repositories
     """
 
+    @functools.wraps(function)
     def wrapper(*args, **kwargs):
-        if not StaticData.Tasks:
-            print("Loading tasks...")
-            with io.open(TASKS_PATH, "r", encoding="utf-8") as jsonFile:
-                StaticData.Tasks = [Task(**task) for task in json.load(jsonFile)]
-                print(f"Number of uploaded tasks - {len(StaticData.Tasks)}")
+        load_once()
 
         return function(*args, **kwargs)
 
@@ -0,0 +1,118 @@
+import math
+from collections.abc import Sequence
+
+import numpy as np
+
+from src.server.persistence.records import UserRecord
+
+# Mean radius of the Earth, in kilometers
+EARTH_RADIUS_KM: float = 6371.0088
+# Side of the cells of the grid, in degrees of latitude and of longitude
+CELL_DEGREES: float = 1.0
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """
+    Compute the great-circle distance from a point to many others
+    :param lat: Latitude of the point, in degrees
+    :param lng: Longitude of the point, in degrees
+    :param lats: Latitudes of the other points, in degrees
+    :param lngs: Longitudes of the other points, in degrees
+    :return: Distance to each of the other points, in kilometers
+    """
+    lat, lng, lats, lngs = math.radians(lat), math.radians(lng), np.radians(lats), np.radians(lngs)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """
+    Grid of cells of CELL_DEGREES over the coordinates of the users. The points are sorted by cell, so that each cell
+    is a slice of them, and a query only computes the distance to the points of the cells that intersect its circle.
+    """
+
+    rows: int = math.ceil(180 / CELL_DEGREES)
+    columns: int = math.ceil(360 / CELL_DEGREES)
+
+    def __init__(self, positions: np.ndarray, lats: np.ndarray, lngs: np.ndarray):
+        keys = self.cell_of(lats, lngs)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Position in the list of users, and coordinates, of each point, sorted by cell
+        self.positions = positions[order]
+        self.lats, self.lngs = lats[order], lngs[order]
+        # Cells that have points, and where their slice of points starts and ends
+        self.keys, starts = np.unique(keys, return_index=True)
+        self.starts = np.append(starts, len(keys))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def row_of(self, lats: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor((lats + 90) / CELL_DEGREES), 0, self.rows - 1).astype(np.int64)
+
+    def column_of(self, lngs: np.ndarray) -> np.ndarray:
+        return np.floor((lngs + 180) / CELL_DEGREES).astype(np.int64) % self.columns
+
+    def cell_of(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        return self.row_of(lats) * self.columns + self.column_of(lngs)
+
+    def cells_within(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """
+        Find the cells that intersect a circle
+        :param lat: Latitude of the center, in degrees
+        :param lng: Longitude of the center, in degrees
+        :param radius_km: Radius, in kilometers
+        :return: Keys of the cells, some of which may have no points
+        """
+        angle = math.degrees(radius_km / EARTH_RADIUS_KM)
+        low, high = lat - angle, lat + angle
+        rows = np.arange(self.row_of(np.array(max(low, -90.0))), self.row_of(np.array(min(high, 90.0))) + 1)
+        if low <= -90 or high >= 90:
+            # The circle covers a pole, and so every longitude
+            columns = np.arange(self.columns)
+        else:
+            # Widest longitude difference of the points of the circle, reached off its center row
+            span = math.degrees(math.asin(min(1.0, math.sin(math.radians(angle)) / math.cos(math.radians(lat)))))
+            first, last = math.floor((lng - span + 180) / CELL_DEGREES), math.floor((lng + span + 180) / CELL_DEGREES)
+            columns = np.arange(self.columns) if last - first + 1 >= self.columns else np.arange(first, last + 1)
+        return (rows[:, None] * self.columns + columns[None, :] % self.columns).ravel()
+
+    def nearest(self, lat: float, lng: float, radius_km: float, limit: int) -> tuple[list[int], list[float]]:
+        """
+        Find the points within a distance of a point, nearest first
+        :param lat: Latitude of the point, in degrees
+        :param lng: Longitude of the point, in degrees
+        :param radius_km: Maximum distance, in kilometers
+        :param limit: Maximum number of points to return
+        :return: Positions of the points found, and their distance in kilometers. Equally distant points are sorted by
+        position
+        """
+        cells = np.unique(self.cells_within(lat, lng, radius_km))
+        # Indexes of the cells that have points
+        found = np.searchsorted(self.keys, cells)
+        found = found[(found < len(self.keys)) & (self.keys[np.minimum(found, len(self.keys) - 1)] == cells)]
+        if not len(found):
+            return [], []
+        points = np.concatenate([np.arange(self.starts[index], self.starts[index + 1]) for index in found])
+        distances = haversine_km(lat, lng, self.lats[points], self.lngs[points])
+        inside = distances <= radius_km
+        points, distances = points[inside], distances[inside]
+        order = np.lexsort((self.positions[points], distances))[:limit]
+        return self.positions[points[order]].tolist(), distances[order].tolist()
+
+
+def locate_users(users: Sequence[UserRecord]) -> GeoIndex:
+    """
+    Build the grid over the coordinates of the users. Users stored in a database give their coordinates without
+    building records
+    :param users: Users of the dataset
+    :return: Grid of the users
+    """
+    coordinates = getattr(users, "coordinates", None)
+    if coordinates is not None:
+        positions, lats, lngs = coordinates()
+    else:
+        points = np.array([(user.address.geo.lat, user.address.geo.lng) for user in users], dtype=np.float64)
+        positions, (lats, lngs) = np.arange(len(users), dtype=np.int64), points.reshape(-1, 2).T
+    return GeoIndex(positions, lats, lngs)
@@ -0,0 +1,191 @@
+import fcntl
+import io
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Optional
+
+from src.server.application.utils import to_json
+
+
+def entry_task_id(entry: dict) -> int:
+    """
+    Get the task an entry of the log changes
+    :param entry: {"put": task} or {"delete": task identifier}
+    :return: Task identifier
+    """
+    return entry["put"]["id"] if "put" in entry else entry["delete"]
+
+
+def fsync_directory(path: str) -> None:
+    """
+    Persist the entries of a directory, so that files created or renamed in it survive a crash
+    :param path: Path of a file of the directory
+    """
+    descriptor = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def file_inode(path: str) -> Optional[int]:
+    """
+    Identify a file, which is replaced by another one when it is moved into its place
+    :param path: Path of the file
+    :return: Inode of the file, None if there is no file
+    """
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def read_entries(path: str, offset: int = 0) -> tuple[list[dict], int]:
+    """
+    Read the complete entries of a log from an offset. A last line without its newline is a write that was cut
+    short, and is not read
+    :param path: Path of the log
+    :param offset: Bytes of the log to skip
+    :return: Entries, and the offset after the last complete one
+    """
+    try:
+        with io.open(path, "rb") as file:
+            file.seek(offset)
+            content = file.read()
+    except FileNotFoundError:
+        return [], offset
+    end = content.rfind(b"\n") + 1
+    return [json.loads(line) for line in content[:end].splitlines() if line], offset + end
+
+
+class TaskJournal:
+    """
+    Append-only log of the writes of the tasks. Each line is an entry, {"put": task} or {"delete": task identifier},
+    that is fsync'd before the write is acknowledged. The log is replayed on top of the tasks json when the data is
+    loaded, and compacted into a file that keeps only the last entry of each task.
+    Processes that serve the same data share the log: they write to it one at a time, holding a lock on it, and
+    read the entries the others appended before writing their own.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compacted_path = f"{path}.compacted"
+        self.lock_path = f"{path}.lock"
+        # Last entry of every task that was written, by task identifier
+        self.changes: dict[int, dict] = {}
+        # Greatest task identifier that was ever written, so that identifiers of deleted tasks are not reused
+        self.last_id = 0
+        # Entries of the log, and bytes of it that were read, since it was last compacted
+        self.entries = 0
+        self.offset = 0
+        # File of the log that was read. A different one means that another process compacted it
+        self.inode: Optional[int] = None
+        # File of the compacted entries that was read. When there was no log, a different one also means that another
+        # process compacted it
+        self.compacted_inode: Optional[int] = None
+        self.compacting = False
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Hold the lock of the log, that every process takes to write to it or compact it
+        """
+        with io.open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def record(self, entries: list[dict]) -> None:
+        """
+        Keep the last entry of each task
+        :param entries: Entries read or written
+        """
+        for entry in entries:
+            task_id = entry_task_id(entry)
+            self.changes[task_id] = entry
+            self.last_id = max(self.last_id, task_id)
+
+    def replay(self) -> None:
+        """
+        Read the compacted entries and the log, from the beginning
+        """
+        with self.locked():
+            self.compacted_inode = file_inode(self.compacted_path)
+            compacted, _ = read_entries(self.compacted_path)
+            self.record(compacted)
+            self.inode = file_inode(self.path)
+            entries, self.offset = read_entries(self.path)
+            self.record(entries)
+            self.entries = len(entries)
+
+    def tail(self) -> Optional[list[dict]]:
+        """
+        Read the entries other processes appended to the log since it was last read. It must be called holding the lock
+        :return: New entries, None if the log was compacted since, and must be replayed from the beginning
+        """
+        inode = file_inode(self.path)
+        if inode != self.inode:
+            # A log that another process started, when there was none, is read from its beginning
+            if self.inode is not None or file_inode(self.compacted_path) != self.compacted_inode:
+                return None
+            self.inode = inode
+        entries, self.offset = read_entries(self.path, self.offset)
+        self.record(entries)
+        self.entries += len(entries)
+        return entries
+
+    def changed(self) -> bool:
+        """
+        Determine if other processes wrote to the log since it was last read
+        :return: True if there are new entries, or the log was compacted
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self.inode is not None
+        return stat.st_ino != self.inode or stat.st_size != self.offset
+
+    def append(self, entry: dict) -> None:
+        """
+        Append an entry to the log, and wait until it is on disk. It must be called holding the lock,
+        once the log was read up to its end
+        :param entry: Entry to append
+        """
+        line = to_json(entry) + b"\n"
+        created = self.inode is None
+        with io.open(self.path, "ab") as file:
+            # Remove what a write that was cut short left after the last complete entry
+            if file.tell() > self.offset:
+                file.truncate(self.offset)
+                file.seek(self.offset)
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+            self.inode = os.fstat(file.fileno()).st_ino
+        if created:
+            fsync_directory(self.path)
+        self.offset += len(line)
+        self.entries += 1
+        self.record([entry])
+
+    def compact(self) -> None:
+        """
+        Write the last entry of each task into the compacted file, and start an empty log.
+        It must be called holding the lock, once the log was read up to its end. Replaying the compacted file and then
+        the old log gives the same tasks, so a crash at any point loses nothing
+        """
+        compacted = f"{self.compacted_path}.tmp"
+        with io.open(compacted, "wb") as file:
+            file.writelines(to_json(entry) + b"\n" for entry in self.changes.values())
+            file.flush()
+            os.fsync(file.fileno())
+            self.compacted_inode = os.fstat(file.fileno()).st_ino
+        os.replace(compacted, self.compacted_path)
+        log = f"{self.path}.tmp"
+        with io.open(log, "wb") as file:
+            os.fsync(file.fileno())
+            self.inode = os.fstat(file.fileno()).st_ino
+        os.replace(log, self.path)
+        fsync_directory(self.path)
+        self.offset = self.entries = 0
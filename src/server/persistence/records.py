@@ -0,0 +1,115 @@
+from typing import Any, Optional
+
+
+class Record:
+    """
+    Read-only item of the data kept in memory. Records are slotted: they have no per-instance dictionary
+    and no validation machinery, so they cost a fraction of the memory of a pydantic model.
+    Their data is validated with the API models before they are built.
+    """
+
+    __slots__ = ("_json",)
+    # Names of the fields, in the order of the API model, which is the order of the json
+    fields: tuple[str, ...] = ()
+
+    def dict(self) -> dict[str, Any]:
+        """
+        Get the data of the record, with the shape of its API model
+        :return: Record as a dictionary
+        """
+        data: dict[str, Any] = {}
+        for name in self.fields:
+            value = getattr(self, name)
+            data[name] = value.dict() if isinstance(value, Record) else value
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields)})"
+
+
+class GeoRecord(Record):
+    __slots__ = fields = ("lat", "lng")
+
+    def __init__(self, lat: float, lng: float):
+        self.lat, self.lng = lat, lng
+        self._json: Optional[bytes] = None
+
+
+class AddressRecord(Record):
+    __slots__ = fields = ("street", "suite", "city", "zipcode", "geo")
+
+    def __init__(self, street: str, suite: str, city: str, zipcode: str, geo: GeoRecord):
+        self.street, self.suite, self.city, self.zipcode, self.geo = street, suite, city, zipcode, geo
+        self._json: Optional[bytes] = None
+
+
+class CompanyRecord(Record):
+    __slots__ = fields = ("name", "catchPhrase", "bs")
+
+    def __init__(self, name: str, catchPhrase: str, bs: str):
+        self.name, self.catchPhrase, self.bs = name, catchPhrase, bs
+        self._json: Optional[bytes] = None
+
+
+class UserRecord(Record):
+    __slots__ = fields = ("id", "name", "username", "email", "address", "website", "company")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        username: str,
+        email: str,
+        address: AddressRecord,
+        website: str,
+        company: CompanyRecord,
+    ):
+        self.id, self.name, self.username, self.email = id, name, username, email
+        self.address, self.website, self.company = address, website, company
+        # Serialized json of the user, cached when the data is loaded
+        self._json: Optional[bytes] = None
+
+
+class TaskRecord(Record):
+    __slots__ = fields = ("user_id", "id", "title", "completed")
+
+    def __init__(self, user_id: int, id: int, title: str, completed: bool):
+        self.user_id, self.id, self.title, self.completed = user_id, id, title, completed
+        # Serialized json of the task, cached when the data is loaded
+        self._json: Optional[bytes] = None
+
+
+def user_record(data: dict[str, Any]) -> UserRecord:
+    """
+    Build a user record from data that was already validated
+    :param data: User as a dictionary
+    :return: User record
+    """
+    address, company = data["address"], data["company"]
+    return UserRecord(
+        data["id"],
+        data["name"],
+        data["username"],
+        data["email"],
+        AddressRecord(
+            address["street"],
+            address["suite"],
+            address["city"],
+            address["zipcode"],
+            GeoRecord(address["geo"]["lat"], address["geo"]["lng"]),
+        ),
+        data["website"],
+        CompanyRecord(company["name"], company["catchPhrase"], company["bs"]),
+    )
+
+
+def task_record(data: dict[str, Any]) -> TaskRecord:
+    """
+    Build a task record from data that was already validated
+    :param data: Task as a dictionary
+    :return: Task record
+    """
+    return TaskRecord(data["user_id"], data["id"], data["title"], data["completed"])
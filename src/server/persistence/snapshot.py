@@ -0,0 +1,281 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Callable, Optional
+
+from src.server.application.utils import to_json
+from src.server.persistence.records import TaskRecord, UserRecord, user_record
+
+# Identifies the file format. Changing the layout requires changing the version
+MAGIC: bytes = b"WZSNAP02"
+# magic, byte order, source signature, number of sections
+HEADER = struct.Struct("<8s1s64sI")
+# name, offset, length
+SECTION = struct.Struct("<8sQQ")
+# Sections start at multiples of this value, so that they can be cast to typed memoryviews
+ALIGNMENT: int = 8
+
+# Every column of a snapshot is stored in a section, as an array of the given type code:
+# - u.id, u.off, u.len: users identifiers, and offset and length of their json in the heap
+# - t.id, t.user, t.done, t.off, t.len: tasks identifiers, user identifiers, status, and offset and length of the title
+# - t.joff, t.jlen: offset and length of the json of the tasks in the heap
+# - ut.key, ut.start, ut.pos: positions of the tasks of each user (posting lists)
+# - tg.key, tg.start, tg.pos: positions of the tasks whose title contains each trigram (posting lists)
+# - heap: utf-8 encoded strings
+COLUMNS: dict[str, str] = {
+    "u.id": "I",
+    "u.off": "Q",
+    "u.len": "I",
+    "t.id": "I",
+    "t.user": "I",
+    "t.done": "B",
+    "t.off": "Q",
+    "t.len": "I",
+    "t.joff": "Q",
+    "t.jlen": "I",
+    "ut.key": "Q",
+    "ut.start": "Q",
+    "ut.pos": "I",
+    "tg.key": "Q",
+    "tg.start": "Q",
+    "tg.pos": "I",
+    "heap": "B",
+}
+
+
+def trigram_key(trigram: str) -> int:
+    """
+    Pack a trigram into an integer, so that trigrams can be stored in a typed column
+    :param trigram: Three characters
+    :return: Code points of the characters, 21 bits each
+    """
+    key = 0
+    for character in trigram:
+        key = (key << 21) | ord(character)
+    return key
+
+
+class MappedIndex:
+    """
+    Primary-key index over a column of identifiers sorted in ascending order.
+    It has the lookup interface of a dictionary from identifier to position.
+    """
+
+    def __init__(self, ids: Sequence[int]):
+        self.ids = ids
+
+    def get(self, item_id: int, default: Optional[int] = None) -> Optional[int]:
+        position = bisect_left(self.ids, item_id)
+        if position < len(self.ids) and self.ids[position] == item_id:
+            return position
+        return default
+
+    def get_many(self, item_ids: list[int]) -> list[Optional[int]]:
+        """
+        Look up many identifiers at once. They are searched in ascending order,
+        each search starting where the previous one ended
+        :param item_ids: Identifiers to look up
+        :return: Position of each identifier, None for the ones that are not in the index
+        """
+        positions: dict[int, Optional[int]] = {}
+        low = 0
+        for item_id in sorted(set(item_ids)):
+            low = bisect_left(self.ids, item_id, low)
+            positions[item_id] = low if low < len(self.ids) and self.ids[low] == item_id else None
+        return [positions[item_id] for item_id in item_ids]
+
+
+class MappedPostings:
+    """
+    Posting lists stored as three columns: the sorted keys, where the list of each key starts, and the positions.
+    It has the lookup interface of a dictionary from key to posting list.
+    """
+
+    def __init__(self, keys: Sequence[int], starts: Sequence[int], positions: Sequence[int], key: Callable = int):
+        self.keys = keys
+        self.starts = starts
+        self.positions = positions
+        self.key = key
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key, default=None) -> Optional[Sequence[int]]:
+        key = self.key(key)
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return default
+        end = self.starts[index + 1] if index + 1 < len(self.keys) else len(self.positions)
+        return self.positions[self.starts[index] : end]
+
+
+class MappedUsers(Sequence):
+    """
+    Users of a snapshot. Each user is decoded from the mapping when it is accessed.
+    """
+
+    def __init__(self, columns: dict[str, memoryview]):
+        self.ids, self.offsets, self.lengths = columns["u.id"], columns["u.off"], columns["u.len"]
+        self.heap = columns["heap"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> UserRecord:
+        offset = self.offsets[position]
+        encoded = self.heap[offset : offset + self.lengths[position]].tobytes()
+        user = user_record(json.loads(encoded))
+        user._json = encoded
+        return user
+
+
+class MappedTasks(Sequence):
+    """
+    Tasks of a snapshot. Each task is built from the columns of the mapping when it is accessed.
+    """
+
+    def __init__(self, columns: dict[str, memoryview]):
+        self.ids, self.user_ids, self.completed = columns["t.id"], columns["t.user"], columns["t.done"]
+        self.offsets, self.lengths = columns["t.off"], columns["t.len"]
+        self.json_offsets, self.json_lengths = columns["t.joff"], columns["t.jlen"]
+        self.heap = columns["heap"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> TaskRecord:
+        offset, json_offset = self.offsets[position], self.json_offsets[position]
+        task = TaskRecord(
+            self.user_ids[position],
+            self.ids[position],
+            str(self.heap[offset : offset + self.lengths[position]], "utf-8"),
+            bool(self.completed[position]),
+        )
+        task._json = self.heap[json_offset : json_offset + self.json_lengths[position]].tobytes()
+        return task
+
+
+class Snapshot:
+    """
+    Read-only memory mapping of a snapshot file. Every process that maps the same file shares its pages,
+    so the data costs its memory only once no matter how many workers serve it.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self.mapping)
+        if size < HEADER.size:
+            raise ValueError(f"'{path}' is too short to be a snapshot")
+        magic, byte_order, signature, sections = HEADER.unpack_from(self.mapping)
+        if magic != MAGIC or byte_order != sys.byteorder[0].encode():
+            raise ValueError(f"'{path}' is not a snapshot of this version")
+        self.signature: str = signature.rstrip(b"\0").decode()
+
+        # A snapshot that was cut short, or corrupted, is rejected as a whole, so that it is compiled again
+        if size < HEADER.size + sections * SECTION.size:
+            raise ValueError(f"'{path}' is too short for its {sections} sections")
+        view = memoryview(self.mapping)
+        columns: dict[str, memoryview] = {}
+        for index in range(sections):
+            name, offset, length = SECTION.unpack_from(self.mapping, HEADER.size + index * SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            code = COLUMNS.get(name)
+            if code is None or offset + length > size or length % struct.calcsize(code):
+                raise ValueError(f"'{path}' has an invalid section '{name}'")
+            columns[name] = view[offset : offset + length].cast(code)
+        missing = COLUMNS.keys() - columns.keys()
+        if missing:
+            raise ValueError(f"'{path}' has no sections {sorted(missing)}")
+
+        self.users = MappedUsers(columns)
+        self.users_index = MappedIndex(columns["u.id"])
+        self.tasks = MappedTasks(columns)
+        self.tasks_index = MappedIndex(columns["t.id"])
+        self.tasks_by_user = MappedPostings(columns["ut.key"], columns["ut.start"], columns["ut.pos"])
+        self.tasks_by_trigram = MappedPostings(
+            columns["tg.key"], columns["tg.start"], columns["tg.pos"], key=trigram_key
+        )
+
+
+def postings_columns(postings: dict, key: Callable = int) -> tuple[array, array, array]:
+    """
+    Flatten posting lists into columns
+    :param postings: Posting lists by key
+    :param key: Conversion of the keys to integers
+    :return: Sorted keys, start of the list of each key, and the positions of every list one after the other
+    """
+    keys, starts, positions = array("Q"), array("Q"), array("I")
+    for packed, original in sorted((key(original), original) for original in postings):
+        keys.append(packed)
+        starts.append(len(positions))
+        positions.extend(postings[original])
+    return keys, starts, positions
+
+
+def write_snapshot(
+    path: str,
+    signature: str,
+    users: list[UserRecord],
+    tasks: list[TaskRecord],
+    tasks_by_user: dict[int, list[int]],
+    tasks_by_trigram: dict[str, array],
+) -> None:
+    """
+    Write a snapshot of the data and its indexes. The file is replaced atomically,
+    so processes never map a partially written snapshot
+    :param path: Snapshot file
+    :param signature: Identifies the source files the snapshot was compiled from
+    :param users: Users, sorted by identifier
+    :param tasks: Tasks, sorted by identifier
+    :param tasks_by_user: Positions of the tasks of each user, by user identifier
+    :param tasks_by_trigram: Positions of the tasks whose lowercase title contains each trigram, by trigram
+    """
+    columns: dict[str, array] = {name: array(code) for name, code in COLUMNS.items()}
+    heap = bytearray()
+    for user in users:
+        encoded = to_json(user.dict())
+        columns["u.id"].append(user.id)
+        columns["u.off"].append(len(heap))
+        columns["u.len"].append(len(encoded))
+        heap += encoded
+    for task in tasks:
+        encoded = task.title.encode()
+        columns["t.id"].append(task.id)
+        columns["t.user"].append(task.user_id)
+        columns["t.done"].append(task.completed)
+        columns["t.off"].append(len(heap))
+        columns["t.len"].append(len(encoded))
+        heap += encoded
+        encoded = to_json(task.dict())
+        columns["t.joff"].append(len(heap))
+        columns["t.jlen"].append(len(encoded))
+        heap += encoded
+    columns["ut.key"], columns["ut.start"], columns["ut.pos"] = postings_columns(tasks_by_user)
+    columns["tg.key"], columns["tg.start"], columns["tg.pos"] = postings_columns(tasks_by_trigram, trigram_key)
+    columns["heap"] = array("B", heap)
+
+    offset = HEADER.size + SECTION.size * len(columns)
+    sections, contents = [], []
+    for name, column in columns.items():
+        offset += -offset % ALIGNMENT
+        content = column.tobytes()
+        sections.append(SECTION.pack(name.encode(), offset, len(content)))
+        contents.append((offset, content))
+        offset += len(content)
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, sys.byteorder[0].encode(), signature.encode(), len(columns)))
+        file.write(b"".join(sections))
+        for offset, content in contents:
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
@@ -0,0 +1,531 @@
+"""
+SQLite storage of the users and the tasks, for data that doesn't fit in the memory of every worker.
+
+    python -m src.server.persistence.sqlite --output src/server/data/data.sqlite3
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import numpy as np
+from src.server.application.utils import to_json
+from src.server.persistence.records import Record, TaskRecord, UserRecord, user_record
+from src.server.settings import DATA_SQLITE_PATH
+
+# Rows read by each query of a scan. A scan runs one query per batch, so that it can move between worker threads
+QUERY_BATCH_SIZE: int = 1000
+# Shortest text that the trigram indexes can search
+MATCH_SIZE: int = 3
+# Seconds a write waits for the writes of other processes to finish
+BUSY_TIMEOUT: float = 10.0
+# Bytes of the database that each connection reads through a memory mapping
+MMAP_SIZE: int = 256 * 1024 * 1024
+# Integers that a column can store. Identifiers outside of it can't be in the database, and can't be bound to a query
+INTEGER_RANGE: range = range(-(2**63), 2**63)
+
+TABLES: str = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY,
+    street TEXT NOT NULL,
+    city TEXT NOT NULL,
+    company_name TEXT NOT NULL,
+    json BLOB NOT NULL
+);
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    json BLOB NOT NULL
+);
+CREATE TABLE task_counts (user_id INTEGER PRIMARY KEY, total INTEGER NOT NULL, completed INTEGER NOT NULL);
+"""
+
+# Built once the rows are imported, which is faster than maintaining them row by row
+INDEXES: str = """
+BEGIN;
+CREATE INDEX tasks_user_id ON tasks (user_id, id);
+CREATE INDEX tasks_completed ON tasks (completed, id);
+CREATE VIRTUAL TABLE users_text USING fts5(
+    street, city, company_name, content='users', content_rowid='id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE tasks_title USING fts5(title, content='tasks', content_rowid='id', tokenize='trigram');
+INSERT INTO users_text (users_text) VALUES ('rebuild');
+INSERT INTO tasks_title (tasks_title) VALUES ('rebuild');
+INSERT INTO task_counts SELECT user_id, count(*), sum(completed) FROM tasks GROUP BY user_id;
+INSERT INTO metadata VALUES
+    ('version', 0),
+    ('total', (SELECT count(*) FROM tasks)),
+    ('completed', (SELECT coalesce(sum(completed), 0) FROM tasks));
+CREATE TRIGGER tasks_inserted AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_title (rowid, title) VALUES (new.id, new.title);
+    INSERT INTO task_counts VALUES (new.user_id, 1, new.completed)
+        ON CONFLICT (user_id) DO UPDATE SET total = total + 1, completed = completed + new.completed;
+    UPDATE metadata SET value = value + 1 WHERE key IN ('version', 'total');
+    UPDATE metadata SET value = value + new.completed WHERE key = 'completed';
+END;
+CREATE TRIGGER tasks_deleted AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_title (tasks_title, rowid, title) VALUES ('delete', old.id, old.title);
+    UPDATE task_counts SET total = total - 1, completed = completed - old.completed WHERE user_id = old.user_id;
+    UPDATE metadata SET value = value + 1 WHERE key = 'version';
+    UPDATE metadata SET value = value - 1 WHERE key = 'total';
+    UPDATE metadata SET value = value - old.completed WHERE key = 'completed';
+END;
+CREATE TRIGGER tasks_updated AFTER UPDATE ON tasks BEGIN
+    INSERT INTO tasks_title (tasks_title, rowid, title) VALUES ('delete', old.id, old.title);
+    INSERT INTO tasks_title (rowid, title) VALUES (new.id, new.title);
+    UPDATE task_counts SET total = total - 1, completed = completed - old.completed WHERE user_id = old.user_id;
+    INSERT INTO task_counts VALUES (new.user_id, 1, new.completed)
+        ON CONFLICT (user_id) DO UPDATE SET total = total + 1, completed = completed + new.completed;
+    UPDATE metadata SET value = value + 1 WHERE key = 'version';
+    UPDATE metadata SET value = value + new.completed - old.completed WHERE key = 'completed';
+END;
+COMMIT;
+"""
+
+
+def serialized(item: Record) -> bytes:
+    """
+    Get the json of a record, reusing the one cached for it
+    :param item: Record
+    :return: Json of the record
+    """
+    return item._json if item._json is not None else to_json(item.dict())
+
+
+def phrase(text: str) -> str:
+    """
+    Quote a text as a phrase of a full-text query. With the trigram tokenizer, it matches the texts that contain it
+    :param text: Text to search
+    :return: Phrase
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+def user_from_row(row: tuple) -> UserRecord:
+    """
+    Build a user from its row
+    :param row: Identifier and json of the user
+    :return: User record, with its json cached
+    """
+    user = user_record(json.loads(row[1]))
+    user._json = row[1]
+    return user
+
+
+def task_from_row(row: tuple) -> TaskRecord:
+    """
+    Build a task from its row
+    :param row: Identifier, user identifier, title, status and json of the task
+    :return: Task record, with its json cached
+    """
+    task = TaskRecord(row[1], row[0], row[2], bool(row[3]))
+    task._json = row[4]
+    return task
+
+
+def import_records(path: str, users: Iterable[UserRecord], tasks: Iterable[TaskRecord]) -> None:
+    """
+    Write users and tasks into a new database. It is built aside and moved into place once it is complete
+    :param path: Path of the database
+    :param users: Users
+    :param tasks: Tasks
+    """
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.executescript(TABLES)
+        connection.execute("BEGIN")
+        connection.executemany(
+            "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+            ((user.id, user.address.street, user.address.city, user.company.name, serialized(user)) for user in users),
+        )
+        connection.executemany(
+            "INSERT INTO tasks VALUES (?, ?, ?, ?, ?)",
+            ((task.id, task.user_id, task.title, int(task.completed), serialized(task)) for task in tasks),
+        )
+        connection.execute("COMMIT")
+        connection.executescript(INDEXES)
+        connection.execute("PRAGMA journal_mode = WAL")
+    finally:
+        connection.close()
+    with open(temporary, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class SqliteStore:
+    """
+    Connections to a SQLite database. Each thread gets its own connection the first time it needs one,
+    so that the worker threads of a process are its pool of connections.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Get the connection of the current thread, opening it if it has none
+        :return: Connection, in autocommit mode
+        """
+        connection: Optional[sqlite3.Connection] = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=BUSY_TIMEOUT)
+            connection.execute("PRAGMA synchronous = FULL")
+            connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            self.local.connection = connection
+        return connection
+
+    def query(self, sql: str, parameters: Iterable[Any] = ()) -> list[tuple]:
+        """
+        Run a query
+        :param sql: Query
+        :param parameters: Values of its parameters
+        :return: Rows
+        """
+        return self.connection().execute(sql, tuple(parameters)).fetchall()
+
+    def value(self, sql: str, parameters: Iterable[Any] = ()) -> Any:
+        """
+        Run a query that gets a single value
+        :param sql: Query
+        :param parameters: Values of its parameters
+        :return: First column of the first row, None if there are no rows
+        """
+        row = self.connection().execute(sql, tuple(parameters)).fetchone()
+        return row[0] if row is not None else None
+
+    def fetch(self, sql: str, item_ids: list[int], build: Callable[[tuple], Record]) -> list[Record]:
+        """
+        Get many items by identifier with a single query. The query must select the identifier first and end with
+        'WHERE id IN ({})', where the parameters of the identifiers go
+        :param sql: Query
+        :param item_ids: Identifiers of the items
+        :param build: Function that builds an item from its row
+        :return: Items found, in the order of the identifiers
+        """
+        item_ids = [item_id for item_id in item_ids if item_id in INTEGER_RANGE]
+        items = {row[0]: build(row) for row in self.query(sql.format(",".join("?" * len(item_ids))), item_ids)}
+        return [items[item_id] for item_id in item_ids if item_id in items]
+
+    def scan(
+        self, sql: str, parameters: list[Any], after_id: Optional[int], build: Callable[[tuple], Record]
+    ) -> Iterator[Record]:
+        """
+        Lazily run a query in batches, with keyset pagination. The query must select the identifier first, take
+        'id > ?' as its first parameter, be sorted by identifier and end with 'LIMIT ?'.
+        No cursor is kept open between batches, so the items can be consumed from any thread
+        :param sql: Query
+        :param parameters: Values of the parameters between the first and the last one
+        :param after_id: Only items with a greater identifier are returned. None to start from the first item
+        :param build: Function that builds an item from its row
+        :return: Items, in ascending order of identifier
+        """
+        last_id = min(max(after_id, -1), INTEGER_RANGE[-1]) if after_id is not None else -1
+        while True:
+            rows = self.query(sql, (last_id, *parameters, QUERY_BATCH_SIZE))
+            for row in rows:
+                yield build(row)
+            if len(rows) < QUERY_BATCH_SIZE:
+                return
+            last_id = rows[-1][0]
+
+
+class SqliteIndex:
+    """
+    Primary-key index of a table, with the interface of the index of the lists: the position of an item is its
+    identifier.
+    """
+
+    def __init__(self, store: SqliteStore, table: str):
+        self.store = store
+        self.table = table
+
+    def get(self, item_id: int, default: Optional[int] = None) -> Optional[int]:
+        if item_id not in INTEGER_RANGE:
+            return default
+        return item_id if self.store.value(f"SELECT 1 FROM {self.table} WHERE id = ?", (item_id,)) else default
+
+    def get_many(self, item_ids: list[int]) -> list[Optional[int]]:
+        stored = [item_id for item_id in item_ids if item_id in INTEGER_RANGE]
+        marks = ",".join("?" * len(stored))
+        found = {row[0] for row in self.store.query(f"SELECT id FROM {self.table} WHERE id IN ({marks})", stored)}
+        return [item_id if item_id in found else None for item_id in item_ids]
+
+    def __contains__(self, item_id: int) -> bool:
+        return self.get(item_id) is not None
+
+
+class UserPostings:
+    """
+    Posting list of the tasks of some users, that queries evaluate with the user index of the database.
+    """
+
+    def __init__(self, user_ids: list[int]):
+        self.user_ids = user_ids
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+class SqlitePostings:
+    """
+    User index of the tasks, with the interface of the posting lists of the lists.
+    """
+
+    def get(self, user_id: int, default: Optional[UserPostings] = None) -> UserPostings:
+        return UserPostings([user_id])
+
+    def get_many(self, user_ids: list[int]) -> UserPostings:
+        return UserPostings(user_ids)
+
+
+class SqliteUsers:
+    """
+    Users stored in a table. The position of a user is its identifier.
+    """
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+        # Users are not written, so they are counted once
+        self.count: int = store.value("SELECT count(*) FROM users")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, user_id: int) -> UserRecord:
+        if user_id not in INTEGER_RANGE:
+            raise IndexError(user_id)
+        rows = self.store.query("SELECT id, json FROM users WHERE id = ?", (user_id,))
+        if not rows:
+            raise IndexError(user_id)
+        return user_from_row(rows[0])
+
+    def fetch_many(self, user_ids: list[int]) -> list[UserRecord]:
+        """
+        Get many users with a single query
+        :param user_ids: User identifiers
+        :return: Users found, in the order of the identifiers
+        """
+        return self.store.fetch("SELECT id, json FROM users WHERE id IN ({})", user_ids, user_from_row)
+
+    def coordinates(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Read the coordinates of every user, without building the users
+        :return: Identifiers, latitudes and longitudes of the users
+        """
+        rows = self.store.query(
+            "SELECT id, json_extract(CAST(json AS TEXT), '$.address.geo.lat'), "
+            "json_extract(CAST(json AS TEXT), '$.address.geo.lng') FROM users ORDER BY id"
+        )
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 3).T
+        return columns[0].astype(np.int64), columns[1], columns[2]
+
+    def search(self, after_id: Optional[int], texts: dict[str, Optional[str]]) -> Iterator[UserRecord]:
+        """
+        Lazily find the users whose columns may contain some texts, with the trigram index.
+        The users found are candidates, that must be verified against the texts
+        :param after_id: Only users with a greater identifier are returned. None to start from the first user
+        :param texts: Text that each column should contain, by column. None, or texts too short to be searched,
+        are not searched
+        :return: Users, in ascending order of identifier
+        """
+        searched = {column: text for column, text in texts.items() if text is not None and len(text) >= MATCH_SIZE}
+        match = " AND ".join(f"{column} : {phrase(text)}" for column, text in searched.items())
+        condition = " AND id IN (SELECT rowid FROM users_text WHERE users_text MATCH ?)" if match else ""
+        sql = f"SELECT id, json FROM users WHERE id > ?{condition} ORDER BY id LIMIT ?"
+        return self.store.scan(sql, [match] if match else [], after_id, user_from_row)
+
+
+class SqliteTasks:
+    """
+    Tasks stored in a table. The position of a task is its identifier.
+    """
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.value("SELECT value FROM metadata WHERE key = 'total'")
+
+    def __getitem__(self, task_id: int) -> TaskRecord:
+        if task_id not in INTEGER_RANGE:
+            raise IndexError(task_id)
+        rows = self.store.query("SELECT id, user_id, title, completed, json FROM tasks WHERE id = ?", (task_id,))
+        if not rows:
+            raise IndexError(task_id)
+        return task_from_row(rows[0])
+
+    def fetch_many(self, task_ids: list[int]) -> list[TaskRecord]:
+        """
+        Get many tasks with a single query
+        :param task_ids: Task identifiers
+        :return: Tasks found, in the order of the identifiers
+        """
+        return self.store.fetch(
+            "SELECT id, user_id, title, completed, json FROM tasks WHERE id IN ({})", task_ids, task_from_row
+        )
+
+    def search(
+        self,
+        positions: Optional[UserPostings],
+        title: Optional[str],
+        completed: Optional[bool],
+        after_id: Optional[int],
+    ) -> Iterator[TaskRecord]:
+        """
+        Lazily find the tasks of some users, with a status, whose title may contain a text, with the indexes of the
+        database. The tasks found are candidates, that must be verified against the title
+        :param positions: Users of the tasks, None to search the tasks of every user
+        :param title: Text that the title should contain. None, or texts too short to be searched, are not searched
+        :param completed: Status of the tasks to find. None to find every task
+        :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+        :return: Tasks, in ascending order of identifier
+        """
+        conditions, parameters = [], []
+        if positions is not None:
+            user_ids = [user_id for user_id in positions.user_ids if user_id in INTEGER_RANGE]
+            conditions.append(f"user_id IN ({','.join('?' * len(user_ids))})")
+            parameters += user_ids
+        if completed is not None:
+            conditions.append("completed = ?")
+            parameters.append(int(completed))
+        if title is not None and len(title) >= MATCH_SIZE:
+            conditions.append("id IN (SELECT rowid FROM tasks_title WHERE tasks_title MATCH ?)")
+            parameters.append(phrase(title))
+        condition = "".join(f" AND {condition}" for condition in conditions)
+        sql = f"SELECT id, user_id, title, completed, json FROM tasks WHERE id > ?{condition} ORDER BY id LIMIT ?"
+        return self.store.scan(sql, parameters, after_id, task_from_row)
+
+
+class SqliteTaskCounts:
+    """
+    Number of tasks, and of completed tasks, kept up to date by the triggers of the database.
+    """
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    @property
+    def total(self) -> int:
+        return self.store.value("SELECT value FROM metadata WHERE key = 'total'")
+
+    @property
+    def completed(self) -> int:
+        return self.store.value("SELECT value FROM metadata WHERE key = 'completed'")
+
+    def of_user(self, user_id: int) -> tuple[int, int]:
+        if user_id not in INTEGER_RANGE:
+            return 0, 0
+        rows = self.store.query("SELECT total, completed FROM task_counts WHERE user_id = ?", (user_id,))
+        return rows[0] if rows else (0, 0)
+
+    def add(self, task: TaskRecord, count: int) -> None:
+        """
+        The tasks are counted by the triggers of the database
+        """
+
+
+class SqliteWrites:
+    """
+    Writes of the tasks, committed to the database in transactions. It has the interface of the log of the writes of
+    the tasks kept in memory: the write-ahead log of the database is the log, and it needs no compaction.
+    """
+
+    entries: int = 0
+    compacting: bool = False
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+        # Version of the tasks when this process last wrote them, or read them
+        self.version = self.current_version()
+
+    def current_version(self) -> int:
+        """
+        Get the number of writes of the tasks, by any process
+        """
+        return self.store.value("SELECT value FROM metadata WHERE key = 'version'")
+
+    @property
+    def last_id(self) -> int:
+        """
+        Greatest task identifier that was ever written, so that identifiers of deleted tasks are not reused
+        """
+        return self.store.value("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'") or 0
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Run the write in a transaction, that other processes wait for
+        """
+        connection = self.store.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        self.version = self.current_version()
+
+    def tail(self) -> list[dict]:
+        """
+        Writes of other processes are already in the database
+        """
+        return []
+
+    def changed(self) -> bool:
+        """
+        Determine if other processes wrote the tasks since this one last did
+        """
+        return self.current_version() != self.version
+
+    def append(self, entry: dict) -> None:
+        """
+        Write an entry of the log into the tasks table
+        :param entry: {"put": task} or {"delete": task identifier}
+        """
+        connection = self.store.connection()
+        if "delete" in entry:
+            connection.execute("DELETE FROM tasks WHERE id = ?", (entry["delete"],))
+            return
+        task = entry["put"]
+        connection.execute(
+            "INSERT INTO tasks VALUES (?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, "
+            "title = excluded.title, completed = excluded.completed, json = excluded.json",
+            (task["id"], task["user_id"], task["title"], int(task["completed"]), to_json(task)),
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import the users and tasks jsons into a new SQLite database")
+    parser.add_argument("--output", default=DATA_SQLITE_PATH, help="Path of the database")
+    parser.add_argument("--force", action="store_true", help="Replace the database if it exists")
+    arguments = parser.parse_args()
+    output = os.path.abspath(arguments.output)
+    if os.path.exists(output) and not arguments.force:
+        print(f"{output} already exists, use --force to replace it")
+        return 1
+
+    # Importing the database changes the working directory, so the output path is resolved first
+    from src.server.persistence.database import import_sqlite
+
+    import_sqlite(output)
+    print(f"imported into {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
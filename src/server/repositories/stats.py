@@ -0,0 +1,52 @@
+from typing import Optional
+
+from src.server.application.concurrency import lookup
+from src.server.application.metrics import timed
+from src.server.models.stats import Stats, UserTaskStats
+from src.server.persistence.database import Dataset, StaticData as Db, load_data
+
+
+@timed
+@load_data
+def get_stats() -> Stats:
+    """
+    Get the number of users and of tasks, by status. They are counted when the data is loaded
+    :return: Statistics of the data
+    """
+    data: Dataset = Db.Current
+    return Stats.of(data.task_counts.total, data.task_counts.completed, users=len(data.users))
+
+
+@timed
+@load_data
+def get_user_stats(user_id: int) -> Optional[UserTaskStats]:
+    """
+    Get the number of tasks of a user, by status. They are counted when the data is loaded
+    :param user_id: user identifier
+    :return: Statistics of the user if found, None otherwise
+    """
+    data: Dataset = Db.Current
+    if data.users_index.get(user_id) is None:
+        return None
+    return UserTaskStats.of(*data.task_counts.of_user(user_id), user_id=user_id)
+
+
+@timed
+async def get_stats_async() -> Stats:
+    """
+    Get the number of users and of tasks, by status. The counts are precomputed, so it only runs on a worker thread
+    with SQLite, where they are queried
+    :return: Statistics of the data
+    """
+    return await lookup(get_stats)
+
+
+@timed
+async def get_user_stats_async(user_id: int) -> Optional[UserTaskStats]:
+    """
+    Get the number of tasks of a user, by status. The counts are precomputed, so it only runs on a worker thread
+    with SQLite, where they are queried
+    :param user_id: user identifier
+    :return: Statistics of the user if found, None otherwise
+    """
+    return await lookup(get_user_stats, user_id)
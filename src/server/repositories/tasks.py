@@ -1,15 +1,31 @@
-from collections.abc import Generator
+from bisect import bisect_left
+from collections.abc import Generator, Iterable, Iterator
 from typing import Optional
-from src.server.application.utils import filter_if
-from src.server.models.tasks import Task
-from src.server.persistence.database import StaticData as Db, load_tasks
+
+import numpy as np
+
+from src.server.application.concurrency import collect, ensure_loaded, lookup, run_in_worker
+from src.server.application.metrics import count_rows, timed
+from src.server.application.utils import filter_if, intersect_sorted
+from src.server.persistence.columnar import ColumnarTasks, intersect_postings
+from src.server.persistence.database import (
+    Dataset,
+    StaticData as Db,
+    find_by_ids,
+    load_data,
+    position_after,
+    validate_task,
+    write_tasks,
+)
+from src.server.persistence.records import TaskRecord
+from src.server.persistence.sqlite import SqlitePostings, SqliteTasks, UserPostings
 
 
 def apply_tasks_filters(
-    tasks: list[Task], title: Optional[str], completed: Optional[bool]
-) -> list[Task]:
+    tasks: Iterable[TaskRecord], title: Optional[str], completed: Optional[bool]
+) -> Iterator[TaskRecord]:
     """
-    Apply the filters in the task search
+    Apply the filters in the task search. Tasks are filtered lazily, as they are consumed
     :param tasks: Tasks to filter
     :param title: Title that a task should contain
     :param completed: Status of the tasks to get
@@ -18,48 +34,323 @@ def apply_tasks_filters(
 
     title = title.lower() if title != "" and title is not None else None
     # Filter tasks based on their attribute “completed”. When not specified, returns all tasks.
-    tasks = filter_if(completed is not None, lambda d: d.completed == completed, tasks)
+    tasks = filter_if(completed is not None, lambda d: d.completed == completed, tasks, "tasks.completed")
     # Filter tasks that do not contain the provided string in their title. Defaults to an empty string.
-    tasks = filter_if(title is not None, lambda d: title in d.title, tasks)
-    return list(tasks)
+    tasks = filter_if(title is not None, lambda d: title in d.title.lower(), tasks, "tasks.title")
+    return iter(tasks)
+
+
+def find_tasks(
+    data: Dataset, positions: Optional[list[int]], title: Optional[str], after_id: Optional[int]
+) -> Iterator[TaskRecord]:
+    """
+    Get the candidate tasks to filter, narrowing them with the title index when possible
+    :param data: Dataset to search in
+    :param positions: Positions of the tasks to search in, None to search in all the tasks
+    :param title: Title that a task should contain
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: Tasks that may match the title, in ascending order of identifier
+    """
+    start: int = position_after(data.tasks, after_id)
+    postings = data.trigram_postings(title)
+    if postings is not None:
+        positions = intersect_sorted(postings if positions is None else [positions, *postings])
+    if positions is None:
+        if data.deleted:
+            return (data.tasks[position] for position in range(start, len(data.tasks)) if position not in data.deleted)
+        return (data.tasks[position] for position in range(start, len(data.tasks)))
+    return (data.tasks[positions[index]] for index in range(bisect_left(positions, start), len(positions)))
+
+
+def find_columnar_tasks(
+    data: Dataset,
+    positions: Optional[list[int]],
+    title: Optional[str],
+    completed: Optional[bool],
+    after_id: Optional[int],
+) -> Iterator[TaskRecord]:
+    """
+    Search the tasks stored as columns. The status is evaluated as vectorized masks over the columns, titles too short
+    for the trigram index are searched in the buffer of the lowercase titles, and a task is built only for the rows
+    whose title matches
+    :param data: Dataset to search in
+    :param positions: Positions of the tasks to search in, None to search in all the tasks
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: Filtered tasks, in ascending order of identifier
+    """
+    tasks: ColumnarTasks = data.tasks
+    start = tasks.position_after(after_id)
+    title = title.lower() if title != "" and title is not None else None
+    postings = data.trigram_postings(title)
+    if postings is not None:
+        positions = intersect_postings(postings if positions is None else [positions, *postings])
+    elif title is not None:
+        # The rows found in the buffer contain the title, so they don't have to be verified
+        found = tasks.containing(title, start)
+        positions = found if positions is None else intersect_postings([positions, found])
+        title = None
+    positions = tasks.select(start, positions, completed)
+    if title is not None:
+        positions = count_rows("tasks.title", lambda position: title in tasks.title(position).lower(), positions)
+    for position in positions:
+        yield tasks[position]
+
+
+def find_sqlite_tasks(
+    data: Dataset,
+    positions: Optional[UserPostings],
+    title: Optional[str],
+    completed: Optional[bool],
+    after_id: Optional[int],
+) -> Iterator[TaskRecord]:
+    """
+    Search the tasks stored in SQLite. The users, the status and the trigrams of the title are searched with the
+    indexes of the database, and the title of the candidates is then verified
+    :param data: Dataset to search in
+    :param positions: Users of the tasks to search in, None to search in all the tasks
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: Filtered tasks, in ascending order of identifier
+    """
+    title = title.lower() if title != "" and title is not None else None
+    return apply_tasks_filters(data.tasks.search(positions, title, completed, after_id), title, None)
+
+
+def search_tasks(
+    data: Dataset,
+    positions: Optional[list[int]],
+    title: Optional[str],
+    completed: Optional[bool],
+    after_id: Optional[int],
+) -> Iterator[TaskRecord]:
+    """
+    Search the tasks in the way their store allows
+    :param data: Dataset to search in
+    :param positions: Positions of the tasks to search in, None to search in all the tasks
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: Filtered tasks, in ascending order of identifier
+    """
+    if isinstance(data.tasks, ColumnarTasks):
+        return find_columnar_tasks(data, positions, title, completed, after_id)
+    if isinstance(data.tasks, SqliteTasks):
+        return find_sqlite_tasks(data, positions, title, completed, after_id)
+    return apply_tasks_filters(find_tasks(data, positions, title, after_id), title, completed)
+
+
+@load_data
+def iter_tasks(
+    title: Optional[str], completed: Optional[bool], after_id: Optional[int] = None
+) -> Iterator[TaskRecord]:
+    """
+    Lazily retrieve the tasks, in ascending order of identifier
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: Tasks filtered based on the parameters
+    """
+    return search_tasks(Db.Current, None, title, completed, after_id)
 
 
-@load_tasks
-def get_all_tasks(title: Optional[str], completed: Optional[bool]) -> list[Task]:
+@timed
+def get_all_tasks(title: Optional[str], completed: Optional[bool]) -> list[TaskRecord]:
     """
     Retrieve all tasks
     :param title: Title that a task should contain
     :param completed: Status of the tasks to get
     :return: Tasks filtered based on the parameters
     """
-    tasks: list[Task] = list(Db.Tasks)
-    tasks = apply_tasks_filters(tasks, title, completed)
-    return list(tasks)
+    return list(iter_tasks(title, completed))
 
 
-@load_tasks
-def get_task_by_id(task_id: int) -> Optional[Task]:
+@timed
+@load_data
+def get_task_by_id(task_id: int) -> Optional[TaskRecord]:
     """
     Get a task based on an identifier
     :param task_id:  Task identifier
     :return: Returns the task if found, None otherwise
     """
-    for task in Db.Tasks:
-        if task.id == task_id:
-            return task
+    data: Dataset = Db.Current
+    position: Optional[int] = data.tasks_index.get(task_id)
+    return data.tasks[position] if position is not None else None
 
 
-@load_tasks
+@timed
+@load_data
+def get_tasks_by_ids(task_ids: list[int]) -> tuple[list[TaskRecord], list[int]]:
+    """
+    Get many tasks based on their identifiers, looking them up in bulk
+    :param task_ids: Task identifiers
+    :return: Tasks found, in the order of the identifiers, and the identifiers that were not found
+    """
+    data: Dataset = Db.Current
+    return find_by_ids(data.tasks, data.tasks_index, task_ids)
+
+
+@timed
+@load_data
+def group_tasks_by_user(
+    user_ids: list[int], title: Optional[str], completed: Optional[bool]
+) -> dict[int, list[TaskRecord]]:
+    """
+    Get the tasks of many users at once. The posting lists of the users are merged and searched in a single pass,
+    grouping the tasks found by user. When the users are all the users, the tasks are scanned once instead
+    :param user_ids: User identifiers, without repetitions
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :return: Tasks of each user, in ascending order of identifier, by user identifier. Users without tasks are absent
+    """
+    data: Dataset = Db.Current
+    positions: Optional[list[int]] = None
+    if isinstance(data.tasks_by_user, SqlitePostings):
+        positions = data.tasks_by_user.get_many(user_ids) if len(user_ids) < len(data.users) else None
+    elif len(user_ids) < len(data.users):
+        postings = [data.tasks_by_user.get(user_id) for user_id in user_ids]
+        postings = [np.asarray(posting, dtype=np.int64) for posting in postings if posting is not None]
+        if not postings:
+            return {}
+        positions = np.sort(np.concatenate(postings)).tolist()
+    grouped: dict[int, list[TaskRecord]] = {}
+    for task in search_tasks(data, positions, title, completed, None):
+        grouped.setdefault(task.user_id, []).append(task)
+    return grouped
+
+
+@load_data
 def get_tasks_by_user_id(
-    user_id: int, title: Optional[str], completed: Optional[bool]
+    user_id: int, title: Optional[str], completed: Optional[bool], after_id: Optional[int] = None
 ) -> Generator:
     """
     Get all the tasks of a user based on their identifier
     :param user_id: user id
     :param title: Title that a tasks should contain
     :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
     :return: User tasks generator
     """
-    for task in get_all_tasks(title, completed):
-        if task.user_id == user_id:
-            yield task
+    data: Dataset = Db.Current
+    yield from search_tasks(data, data.tasks_by_user.get(user_id, []), title, completed, after_id)
+
+
+@timed
+async def get_all_tasks_async(
+    title: Optional[str], completed: Optional[bool], after_id: Optional[int] = None, limit: Optional[int] = None
+) -> list[TaskRecord]:
+    """
+    Retrieve the tasks without blocking the event loop: the scan runs on worker threads, in chunks
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :param limit: Maximum number of tasks to return. All when not specified
+    :return: Tasks filtered based on the parameters
+    """
+    return await collect(iter_tasks, title, completed, after_id, limit=limit)
+
+
+@timed
+async def get_task_by_id_async(task_id: int) -> Optional[TaskRecord]:
+    """
+    Get a task based on an identifier. The lookup is cheap in memory, so it only runs on a worker thread with SQLite
+    :param task_id:  Task identifier
+    :return: Returns the task if found, None otherwise
+    """
+    return await lookup(get_task_by_id, task_id)
+
+
+@timed
+async def get_tasks_by_ids_async(task_ids: list[int]) -> tuple[list[TaskRecord], list[int]]:
+    """
+    Get many tasks based on their identifiers, on a worker thread
+    :param task_ids: Task identifiers
+    :return: Tasks found, in the order of the identifiers, and the identifiers that were not found
+    """
+    await ensure_loaded()
+    return await run_in_worker(get_tasks_by_ids, task_ids)
+
+
+@timed
+def create_task(user_id: int, title: str, completed: bool) -> TaskRecord:
+    """
+    Create a task, with the identifier that follows the last one
+    :param user_id: User that should do the task
+    :param title: Task title
+    :param completed: Status of the task
+    :return: Task created
+    """
+
+    def change(data: Dataset) -> dict:
+        task = {"user_id": user_id, "id": data.next_task_id(), "title": title, "completed": completed}
+        return {"put": validate_task(task).dict()}
+
+    entry = write_tasks(change)
+    return get_task_by_id(entry["put"]["id"])
+
+
+@timed
+def update_task(task_id: int, fields: dict) -> Optional[TaskRecord]:
+    """
+    Change some attributes of a task
+    :param task_id: Task identifier
+    :param fields: New value of the attributes to change, by attribute
+    :return: Task changed, None if it was not found
+    """
+
+    def change(data: Dataset) -> Optional[dict]:
+        position: Optional[int] = data.tasks_index.get(task_id)
+        if position is None:
+            return None
+        return {"put": validate_task({**data.tasks[position].dict(), **fields, "id": task_id}).dict()}
+
+    return get_task_by_id(task_id) if write_tasks(change) is not None else None
+
+
+@timed
+def delete_task(task_id: int) -> bool:
+    """
+    Delete a task
+    :param task_id: Task identifier
+    :return: True if the task was deleted, False if it was not found
+    """
+
+    def change(data: Dataset) -> Optional[dict]:
+        return {"delete": task_id} if task_id in data.tasks_index else None
+
+    return write_tasks(change) is not None
+
+
+@timed
+async def create_task_async(user_id: int, title: str, completed: bool) -> TaskRecord:
+    """
+    Create a task on a worker thread, since it waits for the log to be on disk
+    :param user_id: User that should do the task
+    :param title: Task title
+    :param completed: Status of the task
+    :return: Task created
+    """
+    return await run_in_worker(create_task, user_id, title, completed)
+
+
+@timed
+async def update_task_async(task_id: int, fields: dict) -> Optional[TaskRecord]:
+    """
+    Change some attributes of a task on a worker thread, since it waits for the log to be on disk
+    :param task_id: Task identifier
+    :param fields: New value of the attributes to change, by attribute
+    :return: Task changed, None if it was not found
+    """
+    return await run_in_worker(update_task, task_id, fields)
+
+
+@timed
+async def delete_task_async(task_id: int) -> bool:
+    """
+    Delete a task on a worker thread, since it waits for the log to be on disk
+    :param task_id: Task identifier
+    :return: True if the task was deleted, False if it was not found
+    """
+    return await run_in_worker(delete_task, task_id)
@@ -1,15 +1,18 @@
+from collections.abc import Iterable, Iterator
 from typing import Optional
 
+from src.server.application.concurrency import collect, ensure_loaded, lookup, run_in_worker
+from src.server.application.metrics import timed
 from src.server.application.utils import filter_if
-from src.server.models.tasks import Task
-from src.server.models.users import User
 from src.server.repositories.tasks import get_tasks_by_user_id
-from src.server.persistence.database import StaticData as Db, load_users
+from src.server.persistence.database import Dataset, StaticData as Db, find_by_ids, load_data, position_after
+from src.server.persistence.records import TaskRecord, UserRecord
+from src.server.persistence.sqlite import SqliteUsers
 
 
-def apply_users_filters(users: list[User], street: Optional[str], city: Optional[str], company_name: Optional[str]) -> \
-list[User]:
-    """ Apply the filters in the users search
+def apply_users_filters(users: Iterable[UserRecord], street: Optional[str], city: Optional[str],
+                        company_name: Optional[str]) -> Iterator[UserRecord]:
+    """ Apply the filters in the users search. Users are filtered lazily, as they are consumed
     :param users: Users to filter
     :param street: User Street
     :param city: User City
@@ -25,41 +28,102 @@ list[User]:
 
     street, city, company_name = word_format(street), word_format(city), word_format(company_name)
     # Filter users based on their attribute “street”. When not specified, returns all tasks.
-    users = filter_if(street is not None, lambda d: street in d.address.street.lower(), users)
+    users = filter_if(street is not None, lambda d: street in d.address.street.lower(), users, "users.street")
     # Filter users based on their attribute “city”. When not specified, returns all tasks.
-    users = filter_if(city is not None, lambda d: city in d.address.city.lower(), users)
+    users = filter_if(city is not None, lambda d: city in d.address.city.lower(), users, "users.city")
     # Filter users based on their attribute “company_name”. When not specified, returns all tasks.
-    users = filter_if(company_name is not None, lambda d: company_name in d.company.name.lower(), users)
-    return list(users)
+    users = filter_if(company_name is not None, lambda d: company_name in d.company.name.lower(), users,
+                      "users.company_name")
+    return iter(users)
 
 
-@load_users
-def get_all_users(street: Optional[str], city: Optional[str], company_name: Optional[str]) -> list[User]:
+@load_data
+def iter_users(street: Optional[str], city: Optional[str], company_name: Optional[str],
+               after_id: Optional[int] = None) -> Iterator[UserRecord]:
+    """
+    Lazily retrieve the users, in ascending order of identifier
+    :param after_id: Only users with a greater identifier are returned. None to start from the first user
+    :return: users
+    """
+    data: Dataset = Db.Current
+    if isinstance(data.users, SqliteUsers):
+        # The trigram indexes of the database narrow the users down to the candidates, that are then verified
+        texts = {"street": street, "city": city, "company_name": company_name}
+        users: Iterator[UserRecord] = data.users.search(after_id, texts)
+    else:
+        users = (data.users[position] for position in range(position_after(data.users, after_id), len(data.users)))
+    return apply_users_filters(users, street, city, company_name)
+
+
+@timed
+def get_all_users(street: Optional[str], city: Optional[str], company_name: Optional[str]) -> list[UserRecord]:
     """
     Retrieve all users
     :return: users
     """
-    users: list[User] = list(Db.Users)
-    users = apply_users_filters(users, street, city, company_name)
-    return list(users)
+    return list(iter_users(street, city, company_name))
 
 
-@load_users
-def get_user_by_id(user_id: int) -> Optional[User]:
+@timed
+@load_data
+def get_user_by_id(user_id: int) -> Optional[UserRecord]:
     """
     Get a user based on an identifier
     :param user_id:  user identifier
     :return: Returns the user if found, None otherwise
     """
-    for user in Db.Users:
-        if user.id == user_id:
-            return user
+    data: Dataset = Db.Current
+    position: Optional[int] = data.users_index.get(user_id)
+    return data.users[position] if position is not None else None
+
+
+@timed
+@load_data
+def get_users_by_ids(user_ids: list[int]) -> tuple[list[UserRecord], list[int]]:
+    """
+    Get many users based on their identifiers, looking them up in bulk
+    :param user_ids: user identifiers
+    :return: Users found, in the order of the identifiers, and the identifiers that were not found
+    """
+    data: Dataset = Db.Current
+    return find_by_ids(data.users, data.users_index, user_ids)
+
+
+@timed
+@load_data
+def get_nearby_users(lat: float, lng: float, radius_km: float, limit: int) -> list[tuple[UserRecord, float]]:
+    """
+    Get the users nearest to a point, searching only the cells of the spatial index that are close enough
+    :param lat: Latitude of the point, in degrees
+    :param lng: Longitude of the point, in degrees
+    :param radius_km: Maximum distance to the users, in kilometers
+    :param limit: Maximum number of users to return
+    :return: Users and their distance to the point in kilometers, nearest first
+    """
+    data: Dataset = Db.Current
+    positions, distances = data.users_by_location.nearest(lat, lng, radius_km, limit)
+    return [(data.users[position], distance) for position, distance in zip(positions, distances)]
+
+
+@load_data
+def iter_user_tasks(
+        user_id: int, title: Optional[str], completed: Optional[bool], after_id: Optional[int] = None
+) -> Iterator[TaskRecord]:
+    """
+    Lazily retrieve user tasks, in ascending order of identifier
+    :param user_id: user id
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :return: user tasks
+    """
+    return get_tasks_by_user_id(user_id, title, completed, after_id)
 
 
-@load_users
+@timed
 def get_user_tasks(
         user_id: int, title: Optional[str], completed: Optional[bool]
-) -> list[Task]:
+) -> list[TaskRecord]:
     """
     Retrieve user tasks
     :param user_id: user id
@@ -67,4 +131,70 @@ def get_user_tasks(
     :param completed: Status of the tasks to get
     :return: user tasks
     """
-    return list(get_tasks_by_user_id(user_id, title, completed))
+    return list(iter_user_tasks(user_id, title, completed))
+
+
+@timed
+async def get_all_users_async(street: Optional[str], city: Optional[str], company_name: Optional[str],
+                              after_id: Optional[int] = None, limit: Optional[int] = None) -> list[UserRecord]:
+    """
+    Retrieve the users without blocking the event loop: the scan runs on worker threads, in chunks
+    :param after_id: Only users with a greater identifier are returned. None to start from the first user
+    :param limit: Maximum number of users to return. All when not specified
+    :return: users
+    """
+    return await collect(iter_users, street, city, company_name, after_id, limit=limit)
+
+
+@timed
+async def get_user_by_id_async(user_id: int) -> Optional[UserRecord]:
+    """
+    Get a user based on an identifier. The lookup is cheap in memory, so it only runs on a worker thread with SQLite
+    :param user_id:  user identifier
+    :return: Returns the user if found, None otherwise
+    """
+    return await lookup(get_user_by_id, user_id)
+
+
+@timed
+async def get_users_by_ids_async(user_ids: list[int]) -> tuple[list[UserRecord], list[int]]:
+    """
+    Get many users based on their identifiers, on a worker thread
+    :param user_ids: user identifiers
+    :return: Users found, in the order of the identifiers, and the identifiers that were not found
+    """
+    await ensure_loaded()
+    return await run_in_worker(get_users_by_ids, user_ids)
+
+
+@timed
+async def get_nearby_users_async(
+        lat: float, lng: float, radius_km: float, limit: int
+) -> list[tuple[UserRecord, float]]:
+    """
+    Get the users nearest to a point, on a worker thread
+    :param lat: Latitude of the point, in degrees
+    :param lng: Longitude of the point, in degrees
+    :param radius_km: Maximum distance to the users, in kilometers
+    :param limit: Maximum number of users to return
+    :return: Users and their distance to the point in kilometers, nearest first
+    """
+    await ensure_loaded()
+    return await run_in_worker(get_nearby_users, lat, lng, radius_km, limit)
+
+
+@timed
+async def get_user_tasks_async(
+        user_id: int, title: Optional[str], completed: Optional[bool], after_id: Optional[int] = None,
+        limit: Optional[int] = None
+) -> list[TaskRecord]:
+    """
+    Retrieve user tasks without blocking the event loop: the scan runs on worker threads, in chunks
+    :param user_id: user id
+    :param title: Title that a task should contain
+    :param completed: Status of the tasks to get
+    :param after_id: Only tasks with a greater identifier are returned. None to start from the first task
+    :param limit: Maximum number of tasks to return. All when not specified
+    :return: user tasks
+    """
+    return await collect(iter_user_tasks, user_id, title, completed, after_id, limit=limit)
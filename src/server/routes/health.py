@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from starlette import status
+
+from src.server.persistence.database import StaticData
+
+router = APIRouter()
+
+
+@router.get(
+    "/health/live",
+    status_code=status.HTTP_200_OK,
+    summary="Checks that the application is running.",
+)
+def live() -> dict:
+    """
+    Checks that the application is running
+    :return: Status of the application
+    """
+    return {"status": "live"}
+
+
+@router.get(
+    "/health/ready",
+    status_code=status.HTTP_200_OK,
+    summary="Checks that the application can serve requests.",
+)
+def ready() -> dict:
+    """
+    Checks that the application can serve requests, which it can't until the data is loaded
+    :return: Status of the application and generation of the data being served
+    """
+    if not StaticData.ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The data is not loaded yet.",
+        )
+    return {"status": "ready", "generation": StaticData.Generation}
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from starlette import status
+from starlette.responses import Response
+
+from src.server.application.metrics import METRICS_MEDIA_TYPE, exposition
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    summary="Exposes the metrics of the application to Prometheus.",
+    response_class=Response,
+    include_in_schema=False,
+)
+def metrics() -> Response:
+    """
+    Exposes the metrics of the application, aggregated across its worker processes
+    :return: Metrics in the text format of Prometheus
+    """
+    return Response(exposition(), media_type=METRICS_MEDIA_TYPE)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from starlette import status
+from starlette.responses import Response
+
+from src.server.application.responses import item_response
+from src.server.models.stats import Stats
+from src.server.repositories.stats import get_stats_async
+
+router = APIRouter()
+
+
+@router.get(
+    "/stats",
+    status_code=status.HTTP_200_OK,
+    response_model=Stats,
+    summary="Retrieves the number of users and of tasks, by status.",
+)
+async def stats() -> Response:
+    """
+    Retrieves the number of users and of tasks, by status, without reading the tasks
+    :return: Statistics of the data
+    """
+    return item_response(await get_stats_async())
@@ -1,31 +1,84 @@
+from functools import partial
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from starlette import status
-from src.server.models.repositories import GetAllResult
-from src.server.models.tasks import Task
-from src.server.repositories.tasks import get_all_tasks, get_task_by_id
+from starlette.responses import Response
+from src.server.application.batch import unique_ids
+from src.server.application.concurrency import run_in_worker, scan
+from src.server.application.fields import FieldTree, fields_request, project_item, project_items
+from src.server.application.pagination import PageRequest, page_request, page_response
+from src.server.application.responses import item_response, list_response
+from src.server.application.streaming import NDJSON_MEDIA_TYPE, stream, stream_requested
+from src.server.models.repositories import BatchRequest, GetAllResult
+from src.server.models.tasks import Task, TaskCreate, TaskUpdate
+from src.server.persistence.records import TaskRecord
+from src.server.repositories.tasks import (
+    create_task_async,
+    delete_task_async,
+    get_all_tasks_async,
+    get_task_by_id_async,
+    get_tasks_by_ids_async,
+    iter_tasks,
+    update_task_async,
+)
+from src.server.repositories.users import get_user_by_id_async
+from src.server.settings import DATA_WRITABLE
 
 router = APIRouter()
 
 
+async def tasks_writable() -> None:
+    """
+    Check that the tasks can be written, which they can only when the data is kept in memory or in SQLite
+    """
+    if not DATA_WRITABLE:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="The tasks can't be written when they are served from a snapshot or stored as columns.",
+        )
+
+
+async def check_user(user_id: Optional[int]) -> None:
+    """
+    Check that the user a task is assigned to exists
+    :param user_id: User identifier, None when the task is not assigned to another user
+    """
+    if user_id is not None and not await get_user_by_id_async(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The user with the id '{user_id}' does not exist.",
+        )
+
+
 @router.get(
     "/tasks/",
     status_code=status.HTTP_200_OK,
     response_model=GetAllResult,
     summary="Retrieves all tasks " "listed on the tasks.json " "file",
+    responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
-def tasks(
+async def tasks(
     title: Optional[str] = Query("", min_length=0, max_length=50),
     completed: bool = None,
-) -> GetAllResult:
+    page: PageRequest = Depends(page_request),
+    streaming: bool = Depends(stream_requested),
+    fields: Optional[FieldTree] = Depends(fields_request(Task)),
+) -> Response:
     """
     Retrieves all tasks listed on the tasks.json file
     :param title: Displays tasks containing the provided string in their title. Defaults to an empty string
     :param completed: Filter tasks based on their attribute “completed”. When not specified, returns all tasks
+    :param page: Pagination parameters. When no limit is specified, returns all tasks
+    :param streaming: Stream the tasks one per line instead of returning them in a single document
+    :param fields: Fields of the tasks to return. All when not specified
     :return: All tasks
     """
-    return GetAllResult(data=get_all_tasks(title, completed))
+    if streaming:
+        tasks = await scan(iter_tasks, title, completed, page.after_id)
+        return await stream(tasks, page, partial(project_items, tree=fields))
+    data = await get_all_tasks_async(title, completed, page.after_id, page.fetch_size)
+    return await run_in_worker(page_response, data, page, fields)
 
 
 @router.get(
@@ -34,16 +87,101 @@ def tasks(
     response_model=Task,
     summary="Retrieves information from a " "single task.",
 )
-def task_by_id(id: int = Path(..., title="The ID of the task", ge=1)) -> Task:
+async def task_by_id(
+    id: int = Path(..., title="The ID of the task", ge=1),
+    fields: Optional[FieldTree] = Depends(fields_request(Task)),
+) -> Response:
     """
     Retrieves information from a single task.
     :param id: Task identifier
+    :param fields: Fields of the task to return. All when not specified
     :return: Task
     """
-    task: Task = get_task_by_id(id)
+    task: TaskRecord = await get_task_by_id_async(id)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"The task with the id '{id}' does not exist.",
+        )
+    return item_response(project_item(task, fields))
+
+
+@router.post(
+    "/tasks/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=GetAllResult,
+    summary="Retrieves many tasks in a single request.",
+)
+async def tasks_batch(
+    batch: BatchRequest, fields: Optional[FieldTree] = Depends(fields_request(Task))
+) -> Response:
+    """
+    Retrieves many tasks in a single request, looking them up in bulk
+    :param batch: Identifiers of the tasks. The ones that don't exist are listed in 'missing'
+    :param fields: Fields of the tasks to return. All when not specified
+    :return: Tasks found, in the order of the identifiers
+    """
+    found, missing = await get_tasks_by_ids_async(unique_ids(batch.ids))
+    return await run_in_worker(list_response, project_items(found, fields), None, missing)
+
+
+@router.post(
+    "/tasks/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=Task,
+    summary="Creates a task.",
+    dependencies=[Depends(tasks_writable)],
+)
+async def create_task(task: TaskCreate) -> Response:
+    """
+    Creates a task. It is written to the log of the tasks before it is returned
+    :param task: Task to create
+    :return: Task created, with its identifier
+    """
+    await check_user(task.user_id)
+    created: TaskRecord = await create_task_async(task.user_id, task.title, task.completed)
+    return item_response(created, status.HTTP_201_CREATED)
+
+
+@router.patch(
+    "/tasks/{id}",
+    status_code=status.HTTP_200_OK,
+    response_model=Task,
+    summary="Changes a task.",
+    dependencies=[Depends(tasks_writable)],
+)
+async def update_task(changes: TaskUpdate, id: int = Path(..., title="The ID of the task", ge=1)) -> Response:
+    """
+    Changes some attributes of a task. It is written to the log of the tasks before it is returned
+    :param changes: Attributes to change
+    :param id: Task identifier
+    :return: Task changed
+    """
+    await check_user(changes.user_id)
+    task: TaskRecord = await update_task_async(id, changes.dict(exclude_none=True))
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"The task with the id '{id}' does not exist.",
         )
-    return task
+    return item_response(task)
+
+
+@router.delete(
+    "/tasks/{id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Deletes a task.",
+    dependencies=[Depends(tasks_writable)],
+)
+async def delete_task(id: int = Path(..., title="The ID of the task", ge=1)) -> Response:
+    """
+    Deletes a task. It is written to the log of the tasks before it is answered
+    :param id: Task identifier
+    :return: Empty response
+    """
+    if not await delete_task_async(id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"The task with the id '{id}' does not exist.",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,21 +1,51 @@
+from collections.abc import Iterable, Iterator
+from functools import partial
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from starlette import status
+from starlette.responses import Response
+from src.server.application.batch import parse_ids
+from src.server.application.concurrency import SCAN_CHUNK_SIZE, run_in_worker, scan, take
+from src.server.application.fields import FieldTree, fields_request, project_item, project_items
+from src.server.application.pagination import MAX_PAGE_SIZE, PageRequest, page_of, page_request, page_response
+from src.server.application.responses import JSON_MEDIA_TYPE, annotate, embed, item_response, list_response
+from src.server.application.streaming import NDJSON_MEDIA_TYPE, stream, stream_requested
 from src.server.models.repositories import GetAllResult
-from src.server.models.users import User
-from src.server.repositories.users import get_all_users, get_user_by_id, get_user_tasks
+from src.server.models.stats import UserTaskStats
+from src.server.models.tasks import Task
+from src.server.models.users import NearbyUsersResult, User, UserWithTasks
+from src.server.persistence.records import UserRecord
+from src.server.repositories.stats import get_user_stats_async
+from src.server.repositories.tasks import group_tasks_by_user
+from src.server.repositories.users import (
+    get_all_users_async,
+    get_nearby_users_async,
+    get_user_by_id_async,
+    get_user_tasks_async,
+    get_users_by_ids_async,
+    iter_user_tasks,
+    iter_users,
+)
 
 router = APIRouter()
 
+# Number of users returned by a nearby search when no limit is given
+NEARBY_LIMIT: int = 10
+
+# Description of the parameter that embeds the tasks of the users
+INCLUDE_DESCRIPTION: str = (
+    "'tasks' to embed the tasks of each user, filtered with 'title' and 'completed', in its 'tasks' attribute"
+)
+
 
-def get_user(id: int = Path(..., title="The ID of the user", ge=1)) -> User:
+async def get_user(id: int = Path(..., title="The ID of the user", ge=1)) -> UserRecord:
     """
     Retrieves information from a single user
     :param id: User id
     :return: User
     """
-    user: User = get_user_by_id(id)
+    user: UserRecord = await get_user_by_id_async(id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -24,38 +54,162 @@ def get_user(id: int = Path(..., title="The ID of the user", ge=1)) -> User:
     return user
 
 
+def with_tasks(
+    users: Iterable[UserRecord], title: Optional[str], completed: Optional[bool], fields: Optional[FieldTree] = None
+) -> Iterator[bytes]:
+    """
+    Serialize users with their tasks embedded. The tasks of each chunk of users are grouped in a single pass,
+    instead of being searched user by user
+    :param users: Users to serialize
+    :param title: Title that the embedded tasks should contain
+    :param completed: Status of the embedded tasks
+    :param fields: Fields of the users to return. All when not specified
+    :return: Json of each user, with its tasks
+    """
+    users = iter(users)
+    while chunk := take(users, SCAN_CHUNK_SIZE):
+        tasks = group_tasks_by_user([user.id for user in chunk], title, completed)
+        for user in chunk:
+            yield embed(project_item(user, fields), "tasks", tasks.get(user.id, []))
+
+
+def users_with_tasks_response(
+    data: list[UserRecord],
+    page: PageRequest,
+    title: Optional[str],
+    completed: Optional[bool],
+    fields: Optional[FieldTree] = None,
+) -> Response:
+    """
+    Build a page of users with their tasks embedded
+    :param data: Users sorted by identifier, starting after the cursor of the page. At most page.fetch_size of them
+    :param page: Pagination parameters
+    :param title: Title that the embedded tasks should contain
+    :param completed: Status of the embedded tasks
+    :param fields: Fields of the users to return. All when not specified
+    :return: Page of users, with the shape of GetAllResult
+    """
+    users, next_cursor = page_of(data, page)
+    return list_response(with_tasks(users, title, completed, fields), next_cursor)
+
+
+def nearby_response(found: list[tuple[UserRecord, float]], fields: Optional[FieldTree] = None) -> Response:
+    """
+    Build the list of the users found near a point
+    :param found: Users and their distance to the point in kilometers
+    :param fields: Fields of the users to return. All when not specified
+    :return: Users, with the shape of NearbyUsersResult
+    """
+    return list_response(
+        annotate(project_item(user, fields), "distance_km", round(distance, 3)) for user, distance in found
+    )
+
+
 @router.get(
     "/users/",
     status_code=status.HTTP_200_OK,
     response_model=GetAllResult,
     summary="Retrieves all users.",
+    responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
-def users(
+async def users(
     street: Optional[str] = Query("", min_length=0, max_length=50),
     city: Optional[str] = Query("", min_length=0, max_length=50),
     company_name: Optional[str] = Query("", min_length=0, max_length=50),
-) -> GetAllResult:
+    ids: Optional[str] = Query(
+        None,
+        description="Comma separated identifiers of the users to get, such as '1,2,3'. "
+        "The ones that don't exist are listed in 'missing'. The other parameters are ignored",
+    ),
+    include: Optional[str] = Query(None, regex="^tasks$", description=INCLUDE_DESCRIPTION),
+    title: Optional[str] = Query("", min_length=0, max_length=50),
+    completed: bool = None,
+    page: PageRequest = Depends(page_request),
+    streaming: bool = Depends(stream_requested),
+    fields: Optional[FieldTree] = Depends(fields_request(User)),
+) -> Response:
     """
     Retrieves all users listed on the users.json file.
+    :param ids: Identifiers of the users to get in a single lookup, instead of filtering all the users
+    :param include: 'tasks' to embed the tasks of each user
+    :param title: Only embeds the tasks containing the provided string in their title
+    :param completed: Only embeds the tasks with this status. When not specified, embeds all tasks
+    :param page: Pagination parameters. When no limit is specified, returns all users
+    :param streaming: Stream the users one per line instead of returning them in a single document
+    :param fields: Fields of the users to return. All when not specified
     :return: All users
     """
-    return GetAllResult(data=get_all_users(street, city, company_name))
+    user_ids = parse_ids(ids)
+    if user_ids is not None:
+        found, missing = await get_users_by_ids_async(user_ids)
+        return await run_in_worker(list_response, project_items(found, fields), None, missing)
+    if streaming:
+        users = await scan(iter_users, street, city, company_name, page.after_id)
+        if include:
+            return await stream(users, page, partial(with_tasks, title=title, completed=completed, fields=fields))
+        return await stream(users, page, partial(project_items, tree=fields))
+    data = await get_all_users_async(street, city, company_name, page.after_id, page.fetch_size)
+    if include:
+        return await run_in_worker(users_with_tasks_response, data, page, title, completed, fields)
+    return await run_in_worker(page_response, data, page, fields)
+
+
+@router.get(
+    "/users/nearby",
+    status_code=status.HTTP_200_OK,
+    response_model=NearbyUsersResult,
+    summary="Retrieves the users nearest to a point.",
+)
+async def nearby_users(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point, in degrees"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the point, in degrees"),
+    radius_km: float = Query(..., gt=0, description="Maximum distance to the users, in kilometers"),
+    limit: int = Query(NEARBY_LIMIT, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of users to return"),
+    fields: Optional[FieldTree] = Depends(fields_request(User)),
+) -> Response:
+    """
+    Retrieves the users within a distance of a point, nearest first, with their distance in 'distance_km'.
+    They are found with a spatial index, that only computes the distance to the users of the nearby cells
+    :param lat: Latitude of the point
+    :param lng: Longitude of the point
+    :param radius_km: Maximum distance to the users
+    :param limit: Maximum number of users to return
+    :param fields: Fields of the users to return. All when not specified
+    :return: Nearest users
+    """
+    found = await get_nearby_users_async(lat, lng, radius_km, limit)
+    return await run_in_worker(nearby_response, found, fields)
 
 
 @router.get(
     "/users/{id}",
     status_code=status.HTTP_200_OK,
-    response_model=User,
+    response_model=UserWithTasks,
     summary="Retrieves all users.",
 )
-def user_by_id(id: int = Path(..., title="The ID of the user", ge=1)) -> User:
+async def user_by_id(
+    id: int = Path(..., title="The ID of the user", ge=1),
+    include: Optional[str] = Query(None, regex="^tasks$", description=INCLUDE_DESCRIPTION),
+    title: Optional[str] = Query("", min_length=0, max_length=50),
+    completed: bool = None,
+    fields: Optional[FieldTree] = Depends(fields_request(User)),
+) -> Response:
     """
     Retrieves information from a single user
     :param id: User id
+    :param include: 'tasks' to embed the tasks of the user
+    :param title: Only embeds the tasks containing the provided string in their title
+    :param completed: Only embeds the tasks with this status. When not specified, embeds all tasks
+    :param fields: Fields of the user to return. All when not specified
     :return: User
     """
-    user: User = get_user(id)
-    return user
+    user: UserRecord = await get_user(id)
+    if include:
+        tasks = await get_user_tasks_async(user.id, title, completed)
+        return Response(
+            await run_in_worker(embed, project_item(user, fields), "tasks", tasks), media_type=JSON_MEDIA_TYPE
+        )
+    return item_response(project_item(user, fields))
 
 
 @router.get(
@@ -63,18 +217,50 @@ def user_by_id(id: int = Path(..., title="The ID of the user", ge=1)) -> User:
     status_code=status.HTTP_200_OK,
     response_model=GetAllResult,
     summary="Retrieves all tasks from the specified user.",
+    responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
-def user_tasks(
+async def user_tasks(
     id: int = Path(..., title="The ID of the user", ge=1),
     title: Optional[str] = Query("", min_length=0, max_length=50),
     completed: bool = None,
-) -> GetAllResult:
+    page: PageRequest = Depends(page_request),
+    streaming: bool = Depends(stream_requested),
+    fields: Optional[FieldTree] = Depends(fields_request(Task)),
+) -> Response:
     """
     Retrieves all tasks from the specified user
     :param id: User id
     :param title: Displays tasks containing the provided string in their title. Defaults to an empty string
     :param completed: Filter tasks based on their attribute “completed”. When not specified, returns all tasks
+    :param page: Pagination parameters. When no limit is specified, returns all tasks
+    :param streaming: Stream the tasks one per line instead of returning them in a single document
+    :param fields: Fields of the tasks to return. All when not specified
     :return: All tasks
     """
-    user: User = get_user(id)
-    return GetAllResult(data=get_user_tasks(user.id, title, completed))
+    user: UserRecord = await get_user(id)
+    if streaming:
+        tasks = await scan(iter_user_tasks, user.id, title, completed, page.after_id)
+        return await stream(tasks, page, partial(project_items, tree=fields))
+    data = await get_user_tasks_async(user.id, title, completed, page.after_id, page.fetch_size)
+    return await run_in_worker(page_response, data, page, fields)
+
+
+@router.get(
+    "/users/{id}/stats",
+    status_code=status.HTTP_200_OK,
+    response_model=UserTaskStats,
+    summary="Retrieves the number of tasks of the specified user, by status.",
+)
+async def user_stats(id: int = Path(..., title="The ID of the user", ge=1)) -> Response:
+    """
+    Retrieves the number of tasks of the specified user, by status, without reading the tasks
+    :param id: User id
+    :return: Statistics of the user
+    """
+    stats: UserTaskStats = await get_user_stats_async(id)
+    if not stats:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"The user with the id '{id}' does not exist.",
+        )
+    return item_response(stats)
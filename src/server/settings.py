@@ -0,0 +1,51 @@
+import os
+
+# noinspection PyPackageRequirements
+from decouple import Choices, config
+
+# Serve the data from a memory-mapped snapshot shared by every worker, instead of a copy of the jsons per worker
+DATA_SNAPSHOT: bool = config("DATA_SNAPSHOT", default=False, cast=bool)
+# Store the tasks as typed columns filtered with vectorized masks, instead of a list of objects. Ignored with a snapshot
+DATA_COLUMNAR: bool = config("DATA_COLUMNAR", default=False, cast=bool)
+# Where the data is served from: 'memory', the jsons loaded into every worker, or 'sqlite', a database built from them
+DATA_BACKEND: str = config("DATA_BACKEND", default="memory", cast=Choices(["memory", "sqlite"]))
+# Path of the SQLite database, imported from the jsons when it doesn't exist. Relative to the working directory
+DATA_SQLITE_PATH: str = config(
+    "DATA_SQLITE_PATH",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "data.sqlite3"),
+    cast=os.path.abspath,
+)
+# Seconds between checks for changes in the jsons, that are then reloaded in the background. 0 disables the checks
+DATA_RELOAD_INTERVAL: float = config("DATA_RELOAD_INTERVAL", default=0, cast=float)
+# Load the data when the application starts, instead of on the first request that needs it
+DATA_PRELOAD: bool = config("DATA_PRELOAD", default=True, cast=bool)
+# Level of the application logs
+LOG_LEVEL: str = config("LOG_LEVEL", default="INFO")
+# Cache the validated data of the jsons, so that it is validated again only when they change
+DATA_CACHE: bool = config("DATA_CACHE", default=True, cast=bool)
+# Measure the requests, the repositories and the data loads, and expose the measurements on '/metrics'
+METRICS: bool = config("METRICS", default=True, cast=bool)
+# Secret that requests send in the 'X-Profile' header to be profiled. Empty disables profiling on demand
+PROFILING_TOKEN: str = config("PROFILING_TOKEN", default="")
+# Fraction of the requests that are profiled without asking for it. 0 disables the sampling
+PROFILING_SAMPLE_RATE: float = config("PROFILING_SAMPLE_RATE", default=0, cast=float)
+# Seconds between the samples of the call stacks of a profiled request
+PROFILING_INTERVAL: float = config("PROFILING_INTERVAL", default=0.001, cast=float)
+# Directory where the profiles of the requests are written. Relative to the working directory
+PROFILING_DIRECTORY: str = config(
+    "PROFILING_DIRECTORY",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles"),
+    cast=os.path.abspath,
+)
+# Profiling is only set up when some request can be profiled, so that it costs nothing otherwise
+PROFILING_ENABLED: bool = bool(PROFILING_TOKEN) or PROFILING_SAMPLE_RATE > 0
+# Maximum size, in bytes, of the responses kept in the query result cache. 0 disables the cache
+RESULT_CACHE_BYTES: int = config("RESULT_CACHE_BYTES", default=64 * 1024 * 1024, cast=int)
+# Compress the responses in the encoding negotiated with the Accept-Encoding header of the requests
+COMPRESSION: bool = config("COMPRESSION", default=True, cast=bool)
+# Smallest response body, in bytes, that is compressed. Smaller bodies are sent as they are
+COMPRESSION_MINIMUM_BYTES: int = config("COMPRESSION_MINIMUM_BYTES", default=1024, cast=int)
+# Entries of the log of the writes of the tasks that trigger its compaction in the background. 0 disables it
+TASKS_LOG_COMPACT_ENTRIES: int = config("TASKS_LOG_COMPACT_ENTRIES", default=10000, cast=int)
+# The tasks can be written to the database, or to the data kept in memory, but not to a snapshot or to columns
+DATA_WRITABLE: bool = DATA_BACKEND == "sqlite" or not (DATA_SNAPSHOT or DATA_COLUMNAR)
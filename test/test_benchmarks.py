@@ -0,0 +1,70 @@
+"""
+File where the dataset generator and the baselines of the benchmarks are tested
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.common import regressions, use_dataset
+from benchmarks.dataset import generate_dataset
+from src.server.models.tasks import Task
+from src.server.models.users import User
+from src.server.repositories.tasks import get_all_tasks
+
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Class where a small dataset is generated and served
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        generate_dataset(self.directory.name, 50, 500, seed=1)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def read(self, name: str) -> list:
+        with io.open(os.path.join(self.directory.name, name), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_generated_data_is_valid(self) -> None:
+        """
+        Test that the generated jsons are valid for the models, and that the same seed generates the same data
+        """
+        users, tasks = [User(**user) for user in self.read("users.json")], [Task(**t) for t in self.read("tasks.json")]
+        self.assertEqual(list(range(1, 51)), [user.id for user in users])
+        self.assertEqual(list(range(1, 501)), [task.id for task in tasks])
+        self.assertTrue(all(1 <= task.user_id <= 50 for task in tasks))
+
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, 50, 500, seed=1)
+            with io.open(os.path.join(directory, "tasks.json"), "r", encoding="utf-8") as file:
+                self.assertEqual(self.read("tasks.json"), json.load(file))
+
+    def test_use_dataset(self) -> None:
+        """
+        Test that the generated dataset is served while it is used, and the original one afterwards
+        """
+        with use_dataset(self.directory.name) as data:
+            self.assertEqual(500, len(data.tasks))
+            self.assertEqual(500, len(get_all_tasks("", None)))
+        self.assertEqual(200, len(get_all_tasks("", None)))
+
+    def test_regressions(self) -> None:
+        """
+        Test that only the metrics that got worse beyond the tolerance are regressions
+        """
+        baseline = {"cases": {"a": {"p50_ms": 1.0, "p99_ms": 2.0, "throughput": 100.0}}}
+        results = {"cases": {"a": {"p50_ms": 1.1, "p99_ms": 3.0, "throughput": 50.0}, "b": {"p50_ms": 9.0}}}
+        found = regressions(results, baseline, tolerance=0.2)
+        self.assertEqual(2, len(found))
+        self.assertTrue(found[0].startswith("a p99_ms"))
+        self.assertTrue(found[1].startswith("a throughput"))
+
+
+if __name__ == "__main__":
+    unittest.main()
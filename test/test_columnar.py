@@ -0,0 +1,89 @@
+"""
+File where the columnar store of the tasks is tested
+"""
+
+import unittest
+
+from src.server.persistence.columnar import ColumnarIndex, columnar_tasks, postings_by_trigram, postings_by_user
+from src.server.persistence.database import Dataset, index_by_id, index_by_trigram, index_by_user, read_tasks
+from src.server.persistence.records import TaskRecord
+from src.server.persistence.snapshot import MappedIndex
+from src.server.repositories.tasks import search_tasks
+
+
+class TestColumnarTasks(unittest.TestCase):
+    """
+    Class where the columnar store is compared with the list of tasks it was built from
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tasks = read_tasks()
+        cls.columns = columnar_tasks(cls.tasks)
+        cls.tasks_by_user, cls.tasks_by_trigram = index_by_user(cls.tasks), index_by_trigram(cls.tasks)
+        cls.listed = Dataset(
+            0, "", [], {}, cls.tasks, index_by_id(cls.tasks), cls.tasks_by_user, cls.tasks_by_trigram
+        )
+        cls.columnar = Dataset(
+            0,
+            "",
+            [],
+            {},
+            cls.columns,
+            MappedIndex(cls.columns.ids),
+            postings_by_user(cls.columns),
+            postings_by_trigram(cls.tasks_by_trigram),
+        )
+
+    def test_data(self) -> None:
+        """
+        Test that the tasks built from the columns are the ones they were stored from
+        """
+        self.assertEqual(self.tasks, list(self.columns))
+        self.assertEqual([task.title for task in self.tasks], [self.columns.title(i) for i in range(len(self.tasks))])
+
+    def test_indexes(self) -> None:
+        """
+        Test that the indexes over the columns give the same positions as the ones built from the list
+        """
+        for user_id, positions in self.tasks_by_user.items():
+            self.assertEqual(positions, list(self.columnar.tasks_by_user.get(user_id)))
+        for trigram, positions in self.tasks_by_trigram.items():
+            self.assertEqual(list(positions), list(self.columnar.tasks_by_trigram.get(trigram)))
+        self.assertIsNone(self.columnar.tasks_by_trigram.get("zzz"))
+        self.assertEqual(len(self.tasks) - 1, self.columnar.tasks_index.get(self.tasks[-1].id))
+        task_ids = [self.tasks[2].id, 2**63, -1, 2**32, self.tasks[0].id]
+        self.assertEqual([2, None, None, None, 0], ColumnarIndex(self.columns.ids).get_many(task_ids))
+
+    def test_search(self) -> None:
+        """
+        Test that searching the columns gets the same tasks as filtering the list
+        """
+        for user_id in [None, 1, 7, 11]:
+            for title in ["", "e", "et", "T ", "aut", "Qui Ut", "zzz"]:
+                for completed in [None, True, False]:
+                    for after_id in [None, 0, 57, 200]:
+                        expected = list(self.search(self.listed, user_id, title, completed, after_id))
+                        result = list(self.search(self.columnar, user_id, title, completed, after_id))
+                        self.assertEqual(expected, result)
+
+    def test_containing(self) -> None:
+        """
+        Test that the titles found in the buffer of the lowercase titles are the ones that contain the text, even when
+        lowercasing changes their length, and that a text found across two titles is not a match
+        """
+        titles = ["ab", "cd", "İx", "", "ÉE", "xab"]
+        columns = columnar_tasks([TaskRecord(1, task_id, title, False) for task_id, title in enumerate(titles, 1)])
+        for text in ["b", "bc", "x", "é", "ée", "ab", "i̇x", "zz"]:
+            expected = [row for row, title in enumerate(titles) if text in title.lower()]
+            self.assertEqual(expected, columns.containing(text, 0).tolist())
+        self.assertEqual([5], columns.containing("ab", 1).tolist())
+
+    @staticmethod
+    def search(data: Dataset, user_id, title, completed, after_id):
+        positions = data.tasks_by_user.get(user_id, []) if user_id is not None else None
+        return search_tasks(data, positions, title, completed, after_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
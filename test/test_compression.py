@@ -0,0 +1,133 @@
+"""
+File where the compression of the responses is tested
+"""
+
+import gzip
+import json
+import unittest
+
+import brotli
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app, result_cache
+from src.server.application.compression import ENCODINGS, compress, negotiate
+from src.server.persistence.database import load_once
+from src.server.settings import COMPRESSION, COMPRESSION_MINIMUM_BYTES, RESULT_CACHE_BYTES
+
+client = TestClient(app)
+
+
+@unittest.skipUnless(COMPRESSION, "The compression is disabled")
+class TestCompression(unittest.TestCase):
+    """
+    Class where the responses are compressed in the encoding negotiated with the client
+    """
+
+    def setUp(self) -> None:
+        load_once()
+
+    def test_negotiate(self) -> None:
+        """
+        Test that the encoding is chosen from the quality values of the Accept-Encoding header
+        """
+        self.assertEqual("gzip", negotiate("gzip, deflate"))
+        self.assertEqual("gzip", negotiate("deflate;q=1, gzip;q=0.5"))
+        self.assertEqual(ENCODINGS[0], negotiate("*"))
+        self.assertIsNone(negotiate("gzip;q=0, deflate"))
+        self.assertIsNone(negotiate("identity"))
+        self.assertIsNone(negotiate(""))
+        self.assertIsNone(negotiate(None))
+        self.assertEqual("br", negotiate("gzip, br"))
+        self.assertEqual("gzip", negotiate("gzip, br;q=0.5"))
+
+    def test_compressed_list(self) -> None:
+        """
+        Test that a large list is sent in gzip, and as it is to clients that don't accept it
+        """
+        plain = client.get("/tasks/", headers={"Accept-Encoding": "identity"})
+        self.assertEqual(status.HTTP_200_OK, plain.status_code)
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertIn("Accept-Encoding", plain.headers["vary"])
+
+        response = client.get("/tasks/", headers={"Accept-Encoding": "gzip"}, stream=True)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertEqual("Accept-Encoding", response.headers["vary"])
+        body = response.raw.read(decode_content=False)
+        self.assertEqual(int(response.headers["content-length"]), len(body))
+        self.assertLess(len(body), len(plain.content))
+        self.assertEqual(plain.content, gzip.decompress(body))
+        if "etag" in plain.headers:
+            self.assertNotEqual(plain.headers["etag"], response.headers["etag"])
+
+    def test_brotli(self) -> None:
+        """
+        Test that lists and streams are sent in brotli to the clients that prefer it
+        """
+        for params in ({}, {"stream": True}):
+            plain = client.get("/tasks/", params=params, headers={"Accept-Encoding": "identity"})
+            response = client.get("/tasks/", params=params, headers={"Accept-Encoding": "gzip;q=0.5, br"})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual("br", response.headers["content-encoding"])
+            self.assertEqual(plain.content, response.content)
+        self.assertEqual(plain.content, brotli.decompress(compress(plain.content, "br")))
+
+    def test_small_responses(self) -> None:
+        """
+        Test that the responses smaller than the minimum are sent as they are
+        """
+        response = client.get("/tasks/1", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertLess(len(response.content), COMPRESSION_MINIMUM_BYTES)
+        self.assertNotIn("content-encoding", response.headers)
+
+        response = client.get("/users/12345", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_compressed_stream(self) -> None:
+        """
+        Test that a streamed response is compressed as it is sent
+        """
+        plain = client.get("/users/", params={"stream": True}, headers={"Accept-Encoding": "identity"})
+        response = client.get("/users/", params={"stream": True}, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(plain.content, response.content)
+        self.assertTrue(all(json.loads(line) for line in response.content.splitlines()))
+
+    @unittest.skipUnless(RESULT_CACHE_BYTES > 0, "The result cache is disabled")
+    def test_precompressed_results(self) -> None:
+        """
+        Test that the results of the cache are compressed once per encoding, and then served as they were kept
+        """
+        first = client.get("/users/", params={"limit": 8}, headers={"Accept-Encoding": "gzip"}, stream=True)
+        self.assertEqual("gzip", first.headers["content-encoding"])
+        body = first.raw.read(decode_content=False)
+        key = next(key for key in result_cache.results if key.startswith("/users/?limit=8"))
+        result = result_cache.results[key]
+        self.assertEqual(body, result.encoded["gzip"])
+        self.assertEqual(compress(result.body, "gzip"), body)
+        self.assertEqual(sum(cached.size for cached in result_cache.results.values()), result_cache.size)
+
+        # The kept body is served, without compressing it again
+        result.encoded["gzip"] = kept = compress(result.body + b" ", "gzip")
+        second = client.get("/users/?limit=8", headers={"Accept-Encoding": "gzip"}, stream=True)
+        self.assertEqual(kept, second.raw.read(decode_content=False))
+        result.encoded["gzip"] = body
+
+        response = client.get(
+            "/users/?limit=8", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]}
+        )
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        response = client.get(
+            "/users/?limit=8", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]}
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(result.body, response.content)
+
+
+if __name__ == "__main__":
+    unittest.main()
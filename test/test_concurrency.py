@@ -0,0 +1,85 @@
+"""
+File where the asynchronous repository functions are tested
+"""
+
+import unittest
+from unittest import mock
+
+import anyio
+
+from src.server.application import concurrency
+from src.server.application.concurrency import collect
+from src.server.persistence.database import load_once
+from src.server.repositories.tasks import (
+    get_all_tasks,
+    get_all_tasks_async,
+    get_task_by_id,
+    get_task_by_id_async,
+    iter_tasks,
+)
+
+
+class TestCollect(unittest.TestCase):
+    """
+    Class where the chunked scans are tested
+    """
+
+    def test_collect_in_chunks(self) -> None:
+        """
+        Test that collecting the items of a scan a chunk at a time gets the same items as consuming it at once
+        """
+        expected = list(iter_tasks("", None, None))
+
+        with mock.patch.object(concurrency, "SCAN_CHUNK_SIZE", 7):
+            self.assertEqual(expected, anyio.run(lambda: collect(iter_tasks, "", None, None)))
+            self.assertEqual(expected[:10], anyio.run(lambda: collect(iter_tasks, "", None, None, limit=10)))
+            self.assertEqual(expected[:14], anyio.run(lambda: collect(iter_tasks, "", None, None, limit=14)))
+
+    def test_async_repository(self) -> None:
+        """
+        Test that the asynchronous repository gets the same tasks as the synchronous one
+        """
+        for title, completed in [("", None), ("aut", True), ("et", False)]:
+            result = anyio.run(get_all_tasks_async, title, completed)
+            self.assertEqual(get_all_tasks(title, completed), result)
+
+
+class TestLookup(unittest.TestCase):
+    """
+    Class where the lookups by identifier are tested
+    """
+
+    def setUp(self) -> None:
+        load_once()
+        self.functions = []
+        run_in_worker = concurrency.run_in_worker
+
+        async def recorded(function, *args):
+            self.functions.append(function)
+            return await run_in_worker(function, *args)
+
+        self.patch = mock.patch.object(concurrency, "run_in_worker", recorded)
+        self.patch.start()
+
+    def tearDown(self) -> None:
+        self.patch.stop()
+
+    def test_lookup_in_memory(self) -> None:
+        """
+        Test that a lookup of the data in memory runs on the event loop
+        """
+        with mock.patch.object(concurrency, "DATA_BACKEND", "memory"):
+            self.assertEqual(get_task_by_id(1), anyio.run(get_task_by_id_async, 1))
+        self.assertNotIn(get_task_by_id, self.functions)
+
+    def test_lookup_in_sqlite(self) -> None:
+        """
+        Test that a lookup, and the check for the writes of other processes, run on worker threads with SQLite
+        """
+        with mock.patch.object(concurrency, "DATA_BACKEND", "sqlite"):
+            self.assertEqual(get_task_by_id(1), anyio.run(get_task_by_id_async, 1))
+        self.assertEqual(["apply_writes", "get_task_by_id"], [function.__name__ for function in self.functions])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+File where the loading and reloading of the data is tested
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app
+from src.server.persistence import database
+from src.server.persistence.cache import read_validated
+from src.server.persistence.database import (
+    StaticData,
+    load_once,
+    reload_data,
+    reload_if_changed,
+    validate_task,
+    validate_user,
+)
+from src.server.persistence.records import task_record, user_record
+from src.server.settings import DATA_BACKEND, DATA_PRELOAD
+
+client = TestClient(app)
+
+
+@unittest.skipIf(DATA_BACKEND == "sqlite", "the jsons are not imported again into the database")
+class TestDataReload(unittest.TestCase):
+    """
+    Class where the data is reloaded from copies of the jsons
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.users_path = shutil.copy(database.USERS_PATH, self.directory.name)
+        self.tasks_path = shutil.copy(database.TASKS_PATH, self.directory.name)
+        self.patches = [
+            mock.patch.object(database, "USERS_PATH", self.users_path),
+            mock.patch.object(database, "TASKS_PATH", self.tasks_path),
+        ]
+        for patch in self.patches:
+            patch.start()
+        reload_data()
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        reload_data()
+        self.directory.cleanup()
+
+    def write_tasks(self, tasks: list) -> None:
+        """
+        Replace the tasks json, making sure its modification time changes
+        :param tasks: Tasks to write
+        """
+        stat = os.stat(self.tasks_path)
+        with open(self.tasks_path, "w", encoding="utf-8") as file:
+            json.dump(tasks, file)
+        os.utime(self.tasks_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    def test_reload_if_changed(self) -> None:
+        """
+        Test that the data is reloaded, under a new generation, only when the jsons change
+        """
+        generation = StaticData.Generation
+        self.assertFalse(reload_if_changed())
+        self.assertEqual(generation, StaticData.Generation)
+
+        self.write_tasks([{"user_id": 1, "id": 1, "title": "reloaded task", "completed": True}])
+        self.assertTrue(reload_if_changed())
+        self.assertEqual(generation + 1, StaticData.Generation)
+
+        response = client.get("/tasks/", params={"title": "reloaded"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.json()["total_items"])
+        self.assertEqual(status.HTTP_404_NOT_FOUND, client.get("/tasks/2").status_code)
+
+    def test_empty_data_is_loaded_once(self) -> None:
+        """
+        Test that an empty json is not loaded again on every request
+        """
+        self.write_tasks([])
+        reload_data()
+        generation = StaticData.Generation
+
+        for _ in range(3):
+            response = client.get("/tasks/")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(0, response.json()["total_items"])
+        self.assertEqual(generation, StaticData.Generation)
+
+
+class TestDataLoad(unittest.TestCase):
+    """
+    Class where the first load of the data is tested
+    """
+
+    def setUp(self) -> None:
+        self.dataset = StaticData.Current
+        StaticData.Current = None
+
+    def tearDown(self) -> None:
+        StaticData.Current = self.dataset or StaticData.Current
+
+    def test_concurrent_first_load(self) -> None:
+        """
+        Test that when several requests find the data unloaded at the same time, it is loaded only once
+        """
+        generation = StaticData.Generation
+        threads = [threading.Thread(target=load_once) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(generation + 1, StaticData.Generation)
+
+    @unittest.skipUnless(DATA_PRELOAD, "The data is loaded on the first request that needs it")
+    def test_ready_after_startup(self) -> None:
+        """
+        Test that the application is not ready until the data is loaded, which happens at startup
+        """
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, client.get("/health/ready").status_code)
+        self.assertEqual(status.HTTP_200_OK, client.get("/health/live").status_code)
+
+        with TestClient(app) as started_client:
+            response = started_client.get("/health/ready")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(StaticData.Generation, response.json()["generation"])
+
+
+class TestValidatedCache(unittest.TestCase):
+    """
+    Class where the cache of validated data is tested
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_directory = os.path.join(self.directory.name, "cache")
+        self.users_path = shutil.copy(database.USERS_PATH, self.directory.name)
+        self.validate = mock.Mock(side_effect=validate_user)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_warm_read_skips_validation(self) -> None:
+        """
+        Test that once the data is cached, it is read without validating it and is equal to the validated data
+        """
+        users = read_validated(self.users_path, self.cache_directory, self.validate, user_record)
+        self.assertEqual(len(users), self.validate.call_count)
+
+        self.validate.reset_mock()
+        cached_users = read_validated(self.users_path, self.cache_directory, self.validate, user_record)
+        self.validate.assert_not_called()
+        self.assertEqual(users, cached_users)
+        self.assertEqual(users[0].address.geo, cached_users[0].address.geo)
+
+    def test_changed_json_is_validated(self) -> None:
+        """
+        Test that the data is validated again when the content of the json changes
+        """
+        read_validated(self.users_path, self.cache_directory, self.validate, user_record)
+        with open(self.users_path, "r", encoding="utf-8") as file:
+            users = json.load(file)
+        with open(self.users_path, "w", encoding="utf-8") as file:
+            json.dump(users[:2], file)
+
+        self.validate.reset_mock()
+        cached_users = read_validated(self.users_path, self.cache_directory, self.validate, user_record)
+        self.assertEqual(2, self.validate.call_count)
+        self.assertEqual(2, len(cached_users))
+
+    def test_tasks_cache(self) -> None:
+        """
+        Test that cached tasks are equal to the validated ones
+        """
+        tasks_path = shutil.copy(database.TASKS_PATH, self.directory.name)
+        tasks = read_validated(tasks_path, self.cache_directory, validate_task, task_record)
+        self.assertEqual(tasks, read_validated(tasks_path, self.cache_directory, validate_task, task_record))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+File where the spatial index of the users is tested
+"""
+
+import unittest
+
+import numpy as np
+
+from src.server.persistence.database import StaticData, read_users, reload_data
+from src.server.persistence.geo import GeoIndex, haversine_km, locate_users
+from src.server.repositories.users import get_nearby_users
+
+
+class TestGeoIndex(unittest.TestCase):
+    """
+    Class where the spatial index is compared with computing the distance to every point
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        generator = np.random.default_rng(0)
+        count = 5000
+        # Uniform over the sphere, with points on the poles and on the antimeridian
+        cls.lats = np.degrees(np.arcsin(generator.uniform(-1, 1, count)))
+        cls.lngs = generator.uniform(-180, 180, count)
+        cls.lats[:10], cls.lats[10:20], cls.lngs[20:30], cls.lngs[30:40] = 90, -90, 180, -180
+        cls.index = GeoIndex(np.arange(count), cls.lats, cls.lngs)
+        cls.generator = generator
+
+    def brute_force(self, lat: float, lng: float, radius_km: float, limit: int) -> list[int]:
+        distances = haversine_km(lat, lng, self.lats, self.lngs)
+        inside = np.flatnonzero(distances <= radius_km)
+        return inside[np.lexsort((inside, distances[inside]))][:limit].tolist()
+
+    def test_haversine(self) -> None:
+        """
+        Test the distance of points a known distance apart
+        """
+        distances = haversine_km(0, 0, np.array([0, 0, 90, 0]), np.array([0, 180, 0, -179]))
+        self.assertEqual(0, distances[0])
+        self.assertAlmostEqual(np.pi * 6371.0088, distances[1], places=6)
+        self.assertAlmostEqual(np.pi * 6371.0088 / 2, distances[2], places=6)
+        self.assertAlmostEqual(distances[1] * 179 / 180, distances[3], places=6)
+
+    def test_nearest(self) -> None:
+        """
+        Test that the index finds the same points, in the same order, as computing every distance
+        """
+        points = [(0, 0), (89.99, 0), (-89.99, 10), (45, 179.99), (-30, -179.99), (60, 90)]
+        points += [(self.generator.uniform(-90, 90), self.generator.uniform(-180, 180)) for _ in range(20)]
+        for lat, lng in points:
+            for radius_km in [1, 150, 1000, 5000, 20100]:
+                for limit in [1, 10, 1000]:
+                    expected = self.brute_force(lat, lng, radius_km, limit)
+                    positions, distances = self.index.nearest(lat, lng, radius_km, limit)
+                    self.assertEqual(expected, positions)
+                    self.assertEqual(sorted(distances), distances)
+
+    def test_cells(self) -> None:
+        """
+        Test that a small circle only touches the cells around it, and that one around a pole touches every longitude
+        """
+        cells = self.index.cells_within(0.5, 179.9, 50)
+        self.assertEqual([90 * GeoIndex.columns, 91 * GeoIndex.columns - 1], sorted(cells.tolist()))
+        self.assertEqual(GeoIndex.columns * 2, len(self.index.cells_within(89.5, 0, 100)))
+        self.assertLess(len(self.index.nearest(10, 10, 100, 1000)[0]), len(self.lats))
+
+    def test_users(self) -> None:
+        """
+        Test that the index of the users finds each user at its own coordinates
+        """
+        users = read_users()
+        index = locate_users(users)
+        self.assertEqual(len(users), len(index))
+        for position, user in enumerate(users):
+            positions, distances = index.nearest(user.address.geo.lat, user.address.geo.lng, 1, 1)
+            self.assertEqual(([position], [0]), (positions, distances))
+
+    def test_built_on_first_search(self) -> None:
+        """
+        Test that the index of the users of a dataset is only built when it is first searched
+        """
+        reload_data()
+        self.assertIsNone(StaticData.Current.located_users)
+        user = read_users()[0]
+        self.assertEqual(user.id, get_nearby_users(user.address.geo.lat, user.address.geo.lng, 1, 1)[0][0].id)
+        self.assertIsNotNone(StaticData.Current.located_users)
+
+
+if __name__ == "__main__":
+    unittest.main()
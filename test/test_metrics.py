@@ -0,0 +1,106 @@
+"""
+File where the metrics of the application are tested
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from prometheus_client import REGISTRY
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app
+from src.server.application.metrics import exposition
+from src.server.repositories.tasks import get_all_tasks
+from src.server.repositories.users import get_all_users
+from src.server.settings import DATA_BACKEND, METRICS
+
+client = TestClient(app)
+
+# Root of the project, from where the server modules are imported
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample(name: str, **labels: str) -> float:
+    """
+    Get the current value of a metric of this process
+    :param name: Name of the sample
+    :param labels: Labels of the sample
+    :return: Value, 0 if it was never recorded
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Class where the metrics are recorded and exposed
+    """
+
+    @unittest.skipUnless(METRICS, "The metrics are disabled")
+    def test_requests_by_route(self) -> None:
+        """
+        Test that requests are measured by the template of their route, and unknown paths under a single label
+        """
+        labels = {"method": "GET", "route": "/tasks/{id}", "status": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        for task_id in range(1, 4):
+            client.get(f"/tasks/{task_id}")
+        self.assertEqual(before + 3, sample("http_request_duration_seconds_count", **labels))
+
+        client.get("/not/a/route")
+        unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+        self.assertGreaterEqual(sample("http_request_duration_seconds_count", **unmatched), 1)
+        self.assertEqual(0, sample("http_requests_in_progress", method="GET", route="/tasks/{id}"))
+
+    @unittest.skipIf(DATA_BACKEND == "sqlite", "the status of the tasks is filtered by the database")
+    def test_filter_rows(self) -> None:
+        """
+        Test that the filters count the rows they scan and return
+        """
+        scanned = sample("repository_filter_rows_scanned_total", filter="tasks.completed")
+        returned = sample("repository_filter_rows_returned_total", filter="tasks.completed")
+        completed_tasks = get_all_tasks("", True)
+        self.assertEqual(scanned + 200, sample("repository_filter_rows_scanned_total", filter="tasks.completed"))
+        self.assertEqual(
+            returned + len(completed_tasks), sample("repository_filter_rows_returned_total", filter="tasks.completed")
+        )
+
+        calls = sample("repository_call_duration_seconds_count", function="get_all_users")
+        get_all_users(None, "gwenborough", None)
+        self.assertEqual(calls + 1, sample("repository_call_duration_seconds_count", function="get_all_users"))
+
+    @unittest.skipUnless(METRICS, "The metrics are disabled")
+    def test_metrics_endpoint(self) -> None:
+        """
+        Test that the metrics are exposed in the text format of Prometheus
+        """
+        response = client.get("/metrics")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('data_rows{entity="tasks"} 200.0', response.text)
+
+    def test_workers_are_aggregated(self) -> None:
+        """
+        Test that the metrics written by several processes are exposed together
+        """
+        script = (
+            "from src.server.application.metrics import REQUEST_DURATION;"
+            "REQUEST_DURATION.labels('GET', '/aggregated', '200').observe(0.1)"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            environment = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", script], cwd=PROJECT_DIRECTORY, env=environment, check=True)
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+                metrics = exposition().decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",route="/aggregated",status="200"} 2.0', metrics
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+File where the profiling of single requests is tested
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from starlette import status
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+from starlette.types import Receive, Scope, Send
+
+from src.server.application import streaming
+from src.server.application.profiling import ProfilingMiddleware, profiled_run_in_threadpool
+
+
+def spin_on_loop(seconds: float) -> None:
+    """
+    Keep the current thread busy
+    """
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def spin_on_worker(seconds: float) -> None:
+    """
+    Keep the worker thread busy
+    """
+    spin_on_loop(seconds)
+
+
+def slow_items():
+    """
+    Items that take time to be produced, on the worker thread that serializes them
+    """
+    spin_on_worker(0.05)
+    yield b"{}"
+
+
+async def streaming_app(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    Application that streams items, serializing them on worker threads
+    """
+    response = StreamingResponse(streaming.ndjson_chunks(slow_items()), media_type=streaming.NDJSON_MEDIA_TYPE)
+    await response(scope, receive, send)
+
+
+async def failing_app(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    Application that fails
+    """
+    raise RuntimeError("the application failed")
+
+
+async def slow_app(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    Application that spends time both on the event loop and on a worker thread
+    """
+    spin_on_loop(0.05)
+    await profiled_run_in_threadpool(spin_on_worker, 0.05)
+    await PlainTextResponse("done")(scope, receive, send)
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Class where requests are profiled on demand
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        middleware = ProfilingMiddleware(
+            slow_app, token="secret", sample_rate=0, interval=0.001, directory=self.directory.name
+        )
+        self.client = TestClient(middleware)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def profiles(self) -> list[str]:
+        return [os.path.join(self.directory.name, name) for name in os.listdir(self.directory.name)]
+
+    def test_requests_without_the_token_are_not_profiled(self) -> None:
+        """
+        Test that only the requests with the profiling token are profiled
+        """
+        for headers in [{}, {"X-Profile": "not the secret"}]:
+            response = self.client.get("/tasks/", headers=headers)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([], self.profiles())
+
+    def test_collapsed_stacks(self) -> None:
+        """
+        Test that the profile covers the event loop and the worker threads, as collapsed stacks
+        """
+        response = self.client.get("/tasks/", headers={"X-Profile": "secret", "X-Profile-Format": "collapsed"})
+        self.assertEqual("done", response.text)
+        [path] = self.profiles()
+        self.assertTrue(path.endswith("GET-tasks.txt"))
+        with open(path, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("slow_app" in line and "spin_on_loop" in line for line in lines))
+        self.assertTrue(any("spin_on_worker" in line for line in lines))
+
+    def test_speedscope(self) -> None:
+        """
+        Test that the profile is written in the file format of speedscope by default
+        """
+        self.client.get("/tasks/", params={"title": "et"}, headers={"X-Profile": "secret"})
+        [path] = self.profiles()
+        with open(path, "r", encoding="utf-8") as file:
+            profile = json.load(file)
+        [sampled] = profile["profiles"]
+        self.assertEqual("GET /tasks/?title=et", sampled["name"])
+        self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+        frames = [frame["name"] for frame in profile["shared"]["frames"]]
+        self.assertTrue(any(frame.startswith("spin_on_worker") for frame in frames))
+
+    def test_streamed_serialization(self) -> None:
+        """
+        Test that the serialization of a streamed response, on the worker threads, is in the profile
+        """
+        middleware = ProfilingMiddleware(
+            streaming_app, token="secret", sample_rate=0, interval=0.001, directory=self.directory.name
+        )
+        headers = {"X-Profile": "secret", "X-Profile-Format": "collapsed"}
+        with mock.patch.object(streaming, "run_in_worker", profiled_run_in_threadpool):
+            response = TestClient(middleware).get("/tasks/", headers=headers)
+        self.assertEqual("{}\n", response.text)
+        [path] = self.profiles()
+        with open(path, "r", encoding="utf-8") as file:
+            self.assertIn("ndjson_chunk", file.read())
+
+    def test_profile_not_written(self) -> None:
+        """
+        Test that a profile that can't be written is logged, without failing the request or hiding its own error
+        """
+        directory = os.path.join(self.directory.name, "file")
+        open(directory, "w").close()
+        middleware = ProfilingMiddleware(slow_app, token="secret", sample_rate=0, interval=0.001, directory=directory)
+        with self.assertLogs("src.server.application.profiling", "ERROR") as logs:
+            response = TestClient(middleware).get("/tasks/", headers={"X-Profile": "secret"})
+        self.assertEqual("done", response.text)
+        self.assertIn("request_profile_failed", logs.output[0])
+
+        middleware.app = failing_app
+        with self.assertLogs("src.server.application.profiling", "ERROR"):
+            with self.assertRaisesRegex(RuntimeError, "the application failed"):
+                TestClient(middleware).get("/tasks/", headers={"X-Profile": "secret"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+File where the records the data is kept in are tested
+"""
+
+import io
+import json
+import unittest
+
+from src.server.models.tasks import Task
+from src.server.models.users import User
+from src.server.persistence import database
+from src.server.persistence.database import validate_task, validate_user
+
+
+class TestRecords(unittest.TestCase):
+    """
+    Class where the records are compared with the API models
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        with io.open(database.USERS_PATH, "r", encoding="utf-8") as file:
+            cls.users = json.load(file)
+        with io.open(database.TASKS_PATH, "r", encoding="utf-8") as file:
+            cls.tasks = json.load(file)
+
+    def test_shape(self) -> None:
+        """
+        Test that records have the data, and the field order, of the API models
+        """
+        for user in self.users:
+            self.assertEqual(list(User(**user).dict().items()), list(validate_user(user).dict().items()))
+        for task in self.tasks:
+            self.assertEqual(list(Task(**task).dict().items()), list(validate_task(task).dict().items()))
+
+    def test_slots(self) -> None:
+        """
+        Test that records have no per-instance dictionary and can't get attributes that are not fields
+        """
+        user, task = validate_user(self.users[0]), validate_task(self.tasks[0])
+        for record in (user, user.address, user.address.geo, user.company, task):
+            self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            task.phone = ""
+
+    def test_validation(self) -> None:
+        """
+        Test that the data is validated by the API models before records are built
+        """
+        with self.assertRaises(ValueError):
+            validate_task({**self.tasks[0], "id": 0})
+        with self.assertRaises(ValueError):
+            validate_user({**self.users[0], "address": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+File where the cache of query results is tested
+"""
+
+import unittest
+
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app, result_cache
+from src.server.application.result_cache import CachedResult, ResultCache
+from src.server.persistence.database import StaticData, load_once, reload_data
+from src.server.settings import RESULT_CACHE_BYTES
+
+client = TestClient(app)
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    Class where the responses of the endpoints are served from the result cache
+    """
+
+    def setUp(self) -> None:
+        load_once()
+
+    @unittest.skipUnless(RESULT_CACHE_BYTES > 0, "The result cache is disabled")
+    def test_etag_not_modified(self) -> None:
+        """
+        Test that polling with the ETag of a response gets '304 Not Modified' while the result does not change
+        """
+        response = client.get("/tasks/", params={"completed": False})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        etag = response.headers["etag"]
+
+        response = client.get("/tasks/", params={"completed": False}, headers={"If-None-Match": etag})
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertEqual(b"", response.content)
+        self.assertEqual(etag, response.headers["etag"])
+
+        response = client.get("/tasks/", params={"completed": True}, headers={"If-None-Match": etag})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response.headers["etag"])
+
+    @unittest.skipUnless(RESULT_CACHE_BYTES > 0, "The result cache is disabled")
+    def test_cached_until_reload(self) -> None:
+        """
+        Test that results are reused, whatever the order of the parameters, until the data is reloaded
+        """
+        first = client.get("/users/?city=south&street=e")
+        self.assertEqual(1, sum(key.startswith("/users/?city=south&street=e") for key in result_cache.results))
+        second = client.get("/users/?street=e&city=south")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first.headers["etag"], second.headers["etag"])
+
+        reload_data()
+        self.assertIsNone(result_cache.get("/users/?city=south&street=e ", StaticData.Generation))
+        third = client.get("/users/?street=e&city=south")
+        # The tag depends only on the content, that did not change
+        self.assertEqual(first.headers["etag"], third.headers["etag"])
+
+    def test_errors_are_not_cached(self) -> None:
+        """
+        Test that error responses go through without being cached
+        """
+        response = client.get("/users/12345")
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        self.assertNotIn("etag", response.headers)
+        self.assertFalse(any(key.startswith("/users/12345") for key in result_cache.results))
+
+    def test_bounded_size(self) -> None:
+        """
+        Test that the least recently used results are discarded to keep the cache under its size
+        """
+        cache = ResultCache(max_bytes=10)
+        for key in ["a", "b", "c"]:
+            cache.get(key, 1)
+            cache.put(key, CachedResult(1, [], b"1234", b'"tag"'))
+        self.assertEqual(["b", "c"], list(cache.results))
+        self.assertEqual(8, cache.size)
+
+        cache.get("b", 1)
+        cache.put("d", CachedResult(1, [], b"1234", b'"tag"'))
+        self.assertEqual(["b", "d"], list(cache.results))
+
+        cache.put("e", CachedResult(1, [], b"12345678901", b'"tag"'))
+        self.assertNotIn("e", cache.results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+File where the memory-mapped snapshot of the data is tested
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.server.persistence import database
+from src.server.persistence.database import index_by_trigram, index_by_user, open_snapshot, read_tasks, read_users
+from src.server.persistence.snapshot import Snapshot, write_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Class where the snapshot is compiled from the jsons and compared with them
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.users, cls.tasks = read_users(), read_tasks()
+        cls.tasks_by_user, cls.tasks_by_trigram = index_by_user(cls.tasks), index_by_trigram(cls.tasks)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "snapshot.bin")
+        write_snapshot(cls.path, "signature", cls.users, cls.tasks, cls.tasks_by_user, cls.tasks_by_trigram)
+        cls.snapshot = Snapshot(cls.path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def test_signature(self) -> None:
+        """
+        Test that the snapshot keeps the signature of the files it was compiled from
+        """
+        self.assertEqual("signature", self.snapshot.signature)
+
+    def test_data(self) -> None:
+        """
+        Test that the users and tasks of the snapshot are the ones of the jsons
+        """
+        self.assertEqual(self.users, list(self.snapshot.users))
+        self.assertEqual(self.tasks, list(self.snapshot.tasks))
+
+    def test_indexes(self) -> None:
+        """
+        Test that the indexes of the snapshot give the same positions as the ones built in memory
+        """
+        for position, task in enumerate(self.tasks):
+            self.assertEqual(position, self.snapshot.tasks_index.get(task.id))
+        self.assertIsNone(self.snapshot.tasks_index.get(len(self.tasks) + 1))
+        self.assertEqual(len(self.users) - 1, self.snapshot.users_index.get(self.users[-1].id))
+
+        for user_id, positions in self.tasks_by_user.items():
+            self.assertEqual(positions, list(self.snapshot.tasks_by_user.get(user_id)))
+        for trigram, positions in self.tasks_by_trigram.items():
+            self.assertEqual(list(positions), list(self.snapshot.tasks_by_trigram.get(trigram)))
+        self.assertIsNone(self.snapshot.tasks_by_trigram.get("zzz"))
+
+    def test_corrupt(self) -> None:
+        """
+        Test that a snapshot that was cut short, or has an unknown section, is rejected, and compiled again
+        """
+        with open(self.path, "rb") as file:
+            content = file.read()
+        renamed = content.replace(b"heap\0\0\0\0", b"hea?\0\0\0\0", 1)
+        self.assertEqual(len(content), len(renamed))
+        path = os.path.join(self.directory.name, "corrupt.bin")
+        for corrupt in (content[:20], content[:200], content[: len(content) // 2], renamed):
+            with open(path, "wb") as file:
+                file.write(corrupt)
+            self.assertRaises(ValueError, Snapshot, path)
+
+        with mock.patch.object(database, "SNAPSHOT_PATH", path):
+            self.assertEqual(self.users, list(open_snapshot().users))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+File where the SQLite store of the data is tested
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.server.application.utils import to_json
+from src.server.persistence.database import (
+    Dataset,
+    SqliteDataset,
+    count_tasks,
+    find_by_ids,
+    index_by_id,
+    index_by_trigram,
+    index_by_user,
+    read_tasks,
+    read_users,
+)
+from src.server.persistence.sqlite import SqliteStore, SqliteWrites, import_records
+from src.server.repositories.tasks import search_tasks
+from src.server.repositories.users import apply_users_filters
+
+
+class TestSqliteStore(unittest.TestCase):
+    """
+    Class where the database is imported from the jsons and compared with them
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.users, cls.tasks = read_users(), read_tasks()
+        cls.listed = Dataset(
+            0,
+            "",
+            cls.users,
+            index_by_id(cls.users),
+            cls.tasks,
+            index_by_id(cls.tasks),
+            index_by_user(cls.tasks),
+            index_by_trigram(cls.tasks),
+        )
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "data.sqlite3")
+        import_records(cls.path, cls.users, cls.tasks)
+        cls.stored = SqliteDataset(0, SqliteStore(cls.path))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def test_data(self) -> None:
+        """
+        Test that the items read from the database are the ones they were imported from
+        """
+        self.assertEqual(len(self.users), len(self.stored.users))
+        self.assertEqual(len(self.tasks), len(self.stored.tasks))
+        user, task = self.stored.users[self.users[0].id], self.stored.tasks[self.tasks[-1].id]
+        self.assertEqual((self.users[0], self.tasks[-1]), (user, task))
+        self.assertEqual((to_json(user.dict()), to_json(task.dict())), (user._json, task._json))
+        self.assertEqual([3, None, 1, None], self.stored.tasks_index.get_many([3, len(self.tasks) + 1, 1, 2**63]))
+        self.assertNotIn(0, self.stored.users_index)
+        self.assertNotIn(2**63, self.stored.users_index)
+        self.assertRaises(IndexError, self.stored.tasks.__getitem__, -(2**63) - 1)
+        self.assertEqual((0, 0), self.stored.task_counts.of_user(2**63))
+
+    def test_find_by_ids(self) -> None:
+        """
+        Test that the items got in bulk from the database are the ones of the lists, in the order they were asked
+        """
+        task_ids = [15, 3, len(self.tasks) + 1, 2**63, 7]
+        expected = find_by_ids(self.listed.tasks, self.listed.tasks_index, task_ids)
+        self.assertEqual(expected, find_by_ids(self.stored.tasks, self.stored.tasks_index, task_ids))
+        self.assertEqual([self.users[4], self.users[0]], self.stored.users.fetch_many([5, 0, 1]))
+
+    def test_counts(self) -> None:
+        """
+        Test that the counts kept by the database are the ones of the tasks
+        """
+        counts, stored = count_tasks(self.tasks), self.stored.task_counts
+        self.assertEqual((counts.total, counts.completed), (stored.total, stored.completed))
+        for user_id in [1, 5, 10, 11]:
+            self.assertEqual(counts.of_user(user_id), self.stored.task_counts.of_user(user_id))
+
+    def test_search(self) -> None:
+        """
+        Test that searching the database gets the same tasks as filtering the list
+        """
+        for user_id in [None, 1, 7, 11]:
+            for title in ["", "et", "aut", "Qui Ut", 'a"b', "zzz"]:
+                for completed in [None, True, False]:
+                    for after_id in [None, 0, 57, 200]:
+                        expected = list(self.search(self.listed, user_id, title, completed, after_id))
+                        result = list(self.search(self.stored, user_id, title, completed, after_id))
+                        self.assertEqual(expected, result)
+
+    def test_search_users(self) -> None:
+        """
+        Test that searching the users with the trigram index gets the same users as filtering the list
+        """
+        for street, city, company_name in [(None, None, None), (None, "gwen", None), ("Kulas", None, "group"),
+                                           (None, "SOUTH", "LLC"), ("ap", None, None), (None, "zzz", None)]:
+            texts = {"street": street, "city": city, "company_name": company_name}
+            for after_id in [None, 3]:
+                expected = [user for user in self.users if after_id is None or user.id > after_id]
+                expected = list(apply_users_filters(expected, street, city, company_name))
+                result = self.stored.users.search(after_id, texts)
+                self.assertEqual(expected, list(apply_users_filters(result, street, city, company_name)))
+
+    def test_writes_of_other_processes(self) -> None:
+        """
+        Test that the writes of another connection update the counts and are seen as a change
+        """
+        other = SqliteWrites(SqliteStore(self.path))
+        task = self.tasks[0].dict()
+        self.assertFalse(self.stored.written_elsewhere())
+        with other.locked():
+            other.append({"put": {**task, "completed": not task["completed"]}})
+        self.assertTrue(self.stored.written_elsewhere())
+        self.assertEqual(not task["completed"], self.stored.tasks[task["id"]].completed)
+        with other.locked():
+            other.append({"put": task})
+        total, completed = count_tasks(self.tasks).of_user(task["user_id"])
+        self.assertEqual((total, completed), self.stored.task_counts.of_user(task["user_id"]))
+        self.assertEqual(len(self.tasks), other.last_id)
+        self.assertEqual(2, self.stored.catch_up())
+        self.assertFalse(self.stored.written_elsewhere())
+
+    @staticmethod
+    def search(data: Dataset, user_id, title, completed, after_id):
+        positions = data.tasks_by_user.get(user_id, []) if user_id is not None else None
+        return search_tasks(data, positions, title, completed, after_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
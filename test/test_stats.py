@@ -0,0 +1,69 @@
+"""
+File where the statistics endpoints are tested
+"""
+
+import unittest
+
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app
+from src.server.models.stats import Stats, UserTaskStats
+from src.server.persistence.columnar import columnar_tasks
+from src.server.persistence.database import count_tasks, read_tasks
+from test.test_tasks import TASKS_COUNT
+from test.test_users import USERS_COUNT
+
+client = TestClient(app)
+
+
+class TestStatsRouter(unittest.TestCase):
+    """
+    Class where the statistics endpoints are compared with counting the tasks
+    """
+
+    def test_user_stats(self) -> None:
+        """
+        Test that the statistics of each user are the counts of the tasks of the user
+        """
+        for user_id in range(1, USERS_COUNT + 1):
+            response = client.get(f"/users/{user_id}/stats")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            tasks = client.get(f"/users/{user_id}/tasks").json()["data"]
+            completed = sum(task["completed"] for task in tasks)
+            expected = UserTaskStats(user_id=user_id, total=len(tasks), completed=completed,
+                                     pending=len(tasks) - completed)
+            self.assertEqual(expected.dict(), response.json())
+
+    def test_user_stats_fail(self) -> None:
+        """
+        Test the statistics of a user that does not exist
+        """
+        response = client.get(f"/users/{USERS_COUNT + 1}/stats")
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_stats(self) -> None:
+        """
+        Test that the global statistics are the counts of every task
+        """
+        response = client.get("/stats")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        tasks = client.get("/tasks/").json()["data"]
+        completed = sum(task["completed"] for task in tasks)
+        self.assertEqual(TASKS_COUNT, len(tasks))
+        expected = Stats(users=USERS_COUNT, total=len(tasks), completed=completed, pending=len(tasks) - completed)
+        self.assertEqual(expected.dict(), response.json())
+
+    def test_count_tasks_columns(self) -> None:
+        """
+        Test that counting the columns of the tasks gives the same counts as counting their records
+        """
+        tasks = read_tasks()
+        listed, columnar = count_tasks(tasks), count_tasks(columnar_tasks(tasks))
+        self.assertEqual(listed.by_user, columnar.by_user)
+        self.assertEqual((listed.total, listed.completed), (columnar.total, columnar.completed))
+        self.assertEqual((0, 0), listed.of_user(USERS_COUNT + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
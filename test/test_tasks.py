@@ -3,6 +3,7 @@ File where task endpoints are tested
 """
 
 import enum
+import json
 import unittest
 from typing import Any
 
@@ -54,6 +55,7 @@ class TestTasksRouter(unittest.TestCase):
 
         tasks = "/tasks/"
         task_by_id = "/tasks/{}"
+        tasks_batch = "/tasks/batch"
 
     def test_tasks(self):
         """
@@ -105,6 +107,21 @@ class TestTasksRouter(unittest.TestCase):
             self.assertEqual(result.total_items, len(result.data))
             self.assertEqual(0, result.total_items)
 
+    def test_tasks_by_title_matches_scan(self):
+        """
+        Test that searching by title, through the title index, gets the same tasks as scanning all of them,
+        regardless of the case of the searched text
+        """
+        all_tasks = GetAllResult(**client.get(self.Endpoints.tasks).json()).data
+        words = ["a", "et", "aut", "AUTEM", "Qui Ut", "illo expedita", "zzz"]
+
+        for word in words:
+            response = client.get(self.Endpoints.tasks, params={"title": word})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            result = GetAllResult(**response.json())
+            expected = [task for task in all_tasks if word.lower() in task["title"].lower()]
+            self.assertEqual(expected, result.data)
+
     def test_tasks_by_status(self):
         """
         Test the method that allows to get all tasks, by status
@@ -143,6 +160,68 @@ class TestTasksRouter(unittest.TestCase):
             TASKS_COUNT, result_all_tasks.total_items, tasks_count_by_status
         )
 
+    def test_tasks_pages(self):
+        """
+        Test that walking the pages of the tasks, following their cursors, gets all the tasks in order
+        """
+        all_tasks = GetAllResult(**client.get(self.Endpoints.tasks, params={"completed": False}).json()).data
+
+        tasks, cursor = [], None
+        while True:
+            response = client.get(self.Endpoints.tasks, params={"completed": False, "limit": 7, "cursor": cursor})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            result = GetAllResult(**response.json())
+            self.assertGreaterEqual(7, result.total_items)
+            self.assertEqual(result.total_items, len(result.data))
+            tasks += result.data
+            cursor = result.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(all_tasks, tasks)
+
+    def test_tasks_invalid_cursor(self):
+        """
+        Test the method that allows to get all tasks, when the cursor is not valid
+        """
+
+        response = client.get(self.Endpoints.tasks, params={"limit": 10, "cursor": "not a cursor"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_tasks_stream(self):
+        """
+        Test the method that allows to get all tasks, streaming them one per line
+        """
+        all_tasks = GetAllResult(**client.get(self.Endpoints.tasks, params={"title": "aut"}).json()).data
+
+        for params, headers in [({"stream": 1}, {}), ({}, {"Accept": "application/x-ndjson"})]:
+            response = client.get(self.Endpoints.tasks, params={"title": "aut", **params}, headers=headers)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+            tasks = [json.loads(line) for line in response.text.splitlines()]
+            self.assertEqual(all_tasks, tasks)
+            self.assertTrue(verify_tasks(tasks))
+
+    def test_tasks_stream_pages(self):
+        """
+        Test that walking the streamed pages of the tasks, following the cursors of their headers, gets all the tasks
+        """
+        all_tasks = GetAllResult(**client.get(self.Endpoints.tasks, params={"title": "aut"}).json()).data
+
+        tasks, cursor = [], None
+        while True:
+            params = {"title": "aut", "stream": 1, "limit": 7, "cursor": cursor}
+            response = client.get(self.Endpoints.tasks, params=params)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            page = [json.loads(line) for line in response.text.splitlines()]
+            self.assertGreaterEqual(7, len(page))
+            tasks += page
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+
+        self.assertEqual(all_tasks, tasks)
+
     def test_task_by_id_ok(self):
         """
         Test the method that allows you to get all the tasks by their identifier,
@@ -161,8 +240,69 @@ class TestTasksRouter(unittest.TestCase):
         when the identifier passed as a parameter does not correspond to an existing task
         """
 
-        response = client.get(self.Endpoints.task_by_id.format(TASKS_COUNT + 1))
-        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        for task_id in (TASKS_COUNT + 1, 2**80):
+            response = client.get(self.Endpoints.task_by_id.format(task_id))
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_tasks_batch(self):
+        """
+        Test the method that allows you to get many tasks at once, in the order of their identifiers,
+        listing the identifiers that don't correspond to an existing task
+        """
+
+        response = client.post(self.Endpoints.tasks_batch, json={"ids": [15, 3, TASKS_COUNT + 1, 3, 2**80, -1, 7]})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = response.json()
+        self.assertEqual([15, 3, 7], [task["id"] for task in result["data"]])
+        self.assertEqual([TASKS_COUNT + 1, 2**80, -1], result["missing"])
+        self.assertTrue(verify_tasks(result["data"]))
+        for task in result["data"]:
+            self.assertEqual(client.get(self.Endpoints.task_by_id.format(task["id"])).json(), task)
+
+    def test_tasks_batch_fail(self):
+        """
+        Try the method that allows you to get many tasks at once, when the identifiers are not valid
+        """
+
+        for body in ({"ids": []}, {"ids": ["one"]}, {}):
+            response = client.post(self.Endpoints.tasks_batch, json=body)
+            self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+        response = client.post(self.Endpoints.tasks_batch, json={"ids": list(range(1, 1002))})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_tasks_fields(self):
+        """
+        Test the methods that allow to get tasks, returning only some of their fields
+        """
+
+        all_tasks = client.get(self.Endpoints.tasks, params={"title": "aut", "limit": 20}).json()
+        response = client.get(self.Endpoints.tasks, params={"title": "aut", "limit": 20, "fields": "title,id"})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = response.json()
+        self.assertEqual([{"id": task["id"], "title": task["title"]} for task in all_tasks["data"]], result["data"])
+        self.assertEqual(all_tasks["next_cursor"], result["next_cursor"])
+
+        response = client.get(self.Endpoints.tasks, params={"title": "aut", "fields": "id", "stream": 1})
+        self.assertEqual(
+            [task["id"] for task in client.get(self.Endpoints.tasks, params={"title": "aut"}).json()["data"]],
+            [json.loads(line)["id"] for line in response.text.splitlines()],
+        )
+        response = client.get(self.Endpoints.task_by_id.format(3), params={"fields": "completed"})
+        self.assertEqual({"completed": client.get(self.Endpoints.task_by_id.format(3)).json()["completed"]},
+                         response.json())
+        response = client.post(self.Endpoints.tasks_batch, params={"fields": "id"}, json={"ids": [5, 2]})
+        self.assertEqual([{"id": 5}, {"id": 2}], response.json()["data"])
+
+    def test_tasks_fields_fail(self):
+        """
+        Try the methods that allow to get tasks, when the fields are not fields of the tasks
+        """
+
+        for fields in ("name", "id,title.length"):
+            response = client.get(self.Endpoints.tasks, params={"fields": fields})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+            response = client.get(self.Endpoints.task_by_id.format(1), params={"fields": fields})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ File where user endpoints are tested.
 """
 
 import enum
+import json
 import unittest
 from typing import Any, Optional
 
@@ -11,7 +12,8 @@ from starlette.testclient import TestClient
 
 from src.server.app import app
 from src.server.models.repositories import GetAllResult
-from src.server.models.users import User
+from src.server.models.users import NearbyUsersResult, User
+from src.server.repositories.users import get_user_by_id
 from test.test_tasks import verify_tasks
 
 client = TestClient(app)
@@ -77,6 +79,7 @@ class TestUserRouter(unittest.TestCase):
         users = "/users/"
         user_by_id = "/users/{}"
         users_tasks = "/users/{}/tasks"
+        users_nearby = "/users/nearby"
 
     def test_users(self) -> None:
         """
@@ -102,6 +105,167 @@ class TestUserRouter(unittest.TestCase):
         self.assertEqual(result.total_items, len(result.data))
         self.assertTrue(verify_users(result.data))
 
+    def test_users_pages(self) -> None:
+        """
+        Test the method that allows to obtain all the users, a page at a time
+        """
+
+        response = client.get(self.Endpoints.users, params={"limit": USERS_COUNT - 1})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        first_page = GetAllResult(**response.json())
+        self.assertEqual(USERS_COUNT - 1, first_page.total_items)
+        self.assertIsNotNone(first_page.next_cursor)
+
+        response = client.get(self.Endpoints.users, params={"limit": USERS_COUNT, "cursor": first_page.next_cursor})
+        second_page = GetAllResult(**response.json())
+        self.assertEqual([USERS_COUNT], [user["id"] for user in second_page.data])
+        self.assertIsNone(second_page.next_cursor)
+
+    def test_users_stream(self) -> None:
+        """
+        Test the method that allows to obtain all the users, streaming them one per line
+        """
+
+        response = client.get(self.Endpoints.users, params={"stream": True, "limit": 3})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        users = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([1, 2, 3], [user["id"] for user in users])
+        self.assertTrue(verify_users(users))
+
+    def test_users_by_ids(self) -> None:
+        """
+        Test the method that allows obtaining many users at once, in the order of their identifiers,
+        listing the identifiers that don't belong to a user
+        """
+
+        response = client.get(
+            self.Endpoints.users, params={"ids": f"4,1,{USERS_COUNT + 1},4,{2**80}", "city": "unknown"}
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = response.json()
+        self.assertEqual([4, 1], [user["id"] for user in result["data"]])
+        self.assertEqual([USERS_COUNT + 1, 2**80], result["missing"])
+        self.assertTrue(verify_users(result["data"]))
+
+    def test_users_by_ids_fail(self) -> None:
+        """
+        Test the method that allows obtaining many users at once, when the identifiers are not valid
+        """
+
+        response = client.get(self.Endpoints.users, params={"ids": "1,two"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = client.get(self.Endpoints.users, params={"ids": ",".join(map(str, range(1, 1002)))})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_users_nearby(self) -> None:
+        """
+        Test the method that allows obtaining the users nearest to a point, sorted by their distance to it
+        """
+
+        geo = get_user_by_id(1).address.geo
+        response = client.get(self.Endpoints.users_nearby, params={"lat": geo.lat, "lng": geo.lng, "radius_km": 20000})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = NearbyUsersResult(**response.json())
+        self.assertEqual(USERS_COUNT, result.total_items)
+        self.assertEqual(1, result.data[0].id)
+        self.assertEqual(0, result.data[0].distance_km)
+        ids, distances = [user.id for user in result.data], [user.distance_km for user in result.data]
+        self.assertEqual(sorted(distances), distances)
+
+        radius_km = distances[4]
+        params = {"lat": geo.lat, "lng": geo.lng, "radius_km": radius_km, "limit": 3}
+        result = client.get(self.Endpoints.users_nearby, params=params).json()
+        self.assertEqual(ids[:3], [user["id"] for user in result["data"]])
+        params.pop("limit")
+        result = client.get(self.Endpoints.users_nearby, params=params).json()
+        self.assertTrue(all(user["distance_km"] <= radius_km for user in result["data"]))
+        self.assertEqual(distances[:result["total_items"]], [user["distance_km"] for user in result["data"]])
+
+        params = {"lat": -geo.lat, "lng": geo.lng + (180 if geo.lng < 0 else -180), "radius_km": 1}
+        self.assertEqual(0, client.get(self.Endpoints.users_nearby, params=params).json()["total_items"])
+
+    def test_users_nearby_fail(self) -> None:
+        """
+        Test the method that allows obtaining the users nearest to a point, when the point or the radius are not valid
+        """
+
+        for params in [{"lat": 91, "lng": 0, "radius_km": 10}, {"lat": 0, "lng": -181, "radius_km": 10},
+                       {"lat": 0, "lng": 0, "radius_km": 0}, {"lat": 0, "lng": 0}]:
+            response = client.get(self.Endpoints.users_nearby, params=params)
+            self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+
+    def test_users_fields(self) -> None:
+        """
+        Test the methods that allow to get users, returning only some of their fields, nested ones included
+        """
+
+        response = client.get(self.Endpoints.users, params={"fields": "id,address.city,name", "limit": 3})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        result = response.json()
+        users = [get_user_by_id(user_id) for user_id in range(1, 4)]
+        expected = [{"id": user.id, "name": user.name, "address": {"city": user.address.city}} for user in users]
+        self.assertEqual(expected, result["data"])
+        self.assertIsNotNone(result["next_cursor"])
+
+        response = client.get(self.Endpoints.user_by_id.format(1), params={"fields": "address.geo.lat,address"})
+        self.assertEqual({"address": users[0].address.dict()}, response.json())
+        params = {"fields": "company.name", "include": "tasks", "completed": True}
+        user = client.get(self.Endpoints.user_by_id.format(1), params=params).json()
+        self.assertEqual(["company", "tasks"], list(user))
+        self.assertEqual({"name": users[0].company.name}, user["company"])
+        self.assertTrue(all(task["completed"] for task in user["tasks"]))
+
+        for params in [{"ids": "2,1"}, {"lat": 0, "lng": 0, "radius_km": 20000}]:
+            endpoint = self.Endpoints.users_nearby if "lat" in params else self.Endpoints.users
+            result = client.get(endpoint, params={**params, "fields": "username"}).json()
+            self.assertTrue(all(set(user) <= {"username", "distance_km"} for user in result["data"]))
+        tasks = client.get(self.Endpoints.users_tasks.format(2), params={"fields": "user_id"}).json()["data"]
+        self.assertTrue(tasks and all(task == {"user_id": 2} for task in tasks))
+
+    def test_users_fields_fail(self) -> None:
+        """
+        Test the methods that allow to get users, when the fields are not fields of the users
+        """
+
+        for fields in ("title", "address.country", "name.first"):
+            response = client.get(self.Endpoints.users, params={"fields": fields})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_users_include_tasks(self) -> None:
+        """
+        Test that the tasks embedded in the users, with and without task filters and pagination,
+        are the tasks of each user
+        """
+
+        for parameters in [{}, {"completed": True}, {"title": "et"}, {"title": "qui", "completed": False}]:
+            response = client.get(self.Endpoints.users, params={"include": "tasks", "limit": 4, **parameters})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            result = response.json()
+            self.assertEqual([1, 2, 3, 4], [user["id"] for user in result["data"]])
+            self.assertIsNotNone(result["next_cursor"])
+            for user in result["data"]:
+                tasks = client.get(self.Endpoints.users_tasks.format(user["id"]), params=parameters).json()["data"]
+                self.assertEqual(tasks, user.pop("tasks"))
+                self.assertEqual(client.get(self.Endpoints.user_by_id.format(user["id"])).json(), user)
+
+        response = client.get(self.Endpoints.users, params={"include": "tasks", "stream": True})
+        users = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(list(range(1, USERS_COUNT + 1)), [user["id"] for user in users])
+        self.assertTrue(all(len(user["tasks"]) > 0 for user in users))
+
+    def test_user_by_id_include_tasks(self) -> None:
+        """
+        Test that the tasks embedded in a user are the tasks of the user
+        """
+
+        for parameters in [{}, {"completed": False}]:
+            response = client.get(self.Endpoints.user_by_id.format(3), params={"include": "tasks", **parameters})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            tasks = client.get(self.Endpoints.users_tasks.format(3), params=parameters).json()["data"]
+            self.assertEqual(tasks, response.json()["tasks"])
+        response = client.get(self.Endpoints.user_by_id.format(3), params={"include": "posts"})
+        self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+
     def test_user_by_id_ok(self) -> None:
         """
         Tests the method that allows obtaining a user based on its identifier,
@@ -114,14 +278,25 @@ class TestUserRouter(unittest.TestCase):
             user = response.json()
             self.assertTrue(verify_users([user]))
 
+    def test_user_by_id_serialization(self) -> None:
+        """
+        Test that the json cached for each user is the serialization of the user
+        """
+
+        for user_id in range(1, USERS_COUNT + 1):
+            response = client.get(self.Endpoints.user_by_id.format(user_id))
+            self.assertEqual("application/json", response.headers["content-type"])
+            self.assertEqual(get_user_by_id(user_id).dict(), response.json())
+
     def test_user_by_id_fail(self) -> None:
         """
         Test the method that allows to obtain a user from its identifier,
         when the identifier passed as parameter does not belong to a user
         """
 
-        response = client.get(self.Endpoints.user_by_id.format(USERS_COUNT + 1))
-        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        for user_id in (USERS_COUNT + 1, 2**80):
+            response = client.get(self.Endpoints.user_by_id.format(user_id))
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
 
     def test_users_tasks_ok(self) -> None:
         """
@@ -136,6 +311,38 @@ class TestUserRouter(unittest.TestCase):
             self.assertTrue(result.total_items >= 0)
             self.assertTrue(verify_tasks(result.data))
 
+    def test_users_tasks_belong_to_user(self) -> None:
+        """
+        Test that the tasks obtained for each user belong to that user and that, together, they cover all the tasks
+        """
+
+        tasks_count = 0
+        for user_id in range(1, USERS_COUNT + 1):
+            response = client.get(self.Endpoints.users_tasks.format(user_id), params={"completed": True})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            result = GetAllResult(**response.json())
+            self.assertTrue(all(task["user_id"] == user_id and task["completed"] for task in result.data))
+            tasks_count += result.total_items
+
+        response = client.get("/tasks/", params={"completed": True})
+        self.assertEqual(GetAllResult(**response.json()).total_items, tasks_count)
+
+    def test_users_tasks_pages(self) -> None:
+        """
+        Test that walking the pages of a user's tasks, following their cursors, gets all of their tasks
+        """
+
+        endpoint = self.Endpoints.users_tasks.format(1)
+        all_tasks = GetAllResult(**client.get(endpoint, params={"title": "et"}).json()).data
+
+        first_page = GetAllResult(**client.get(endpoint, params={"title": "et", "limit": 5}).json())
+        self.assertEqual(all_tasks[:5], first_page.data)
+        second_page = GetAllResult(
+            **client.get(endpoint, params={"title": "et", "limit": 100, "cursor": first_page.next_cursor}).json()
+        )
+        self.assertEqual(all_tasks[5:], second_page.data)
+        self.assertIsNone(second_page.next_cursor)
+
     def test_users_tasks_fail(self) -> None:
         """
         Test the method that allows to obtain a user's tasks from its identifier,
@@ -0,0 +1,316 @@
+"""
+File where the writes of the tasks, and their log, are tested
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from starlette import status
+from starlette.testclient import TestClient
+
+from src.server.app import app
+from src.server.persistence import database
+from src.server.persistence.database import StaticData, compact_tasks_log, reload_data
+from src.server.persistence.journal import TaskJournal, read_entries
+from src.server.persistence.sqlite import SqliteStore, SqliteWrites
+from src.server.settings import DATA_BACKEND, DATA_WRITABLE
+from test.test_tasks import TASKS_COUNT
+from test.test_users import USERS_COUNT
+
+client = TestClient(app)
+# Client of the routes alone, as when the result cache is disabled, that no middleware loads the data for
+uncached_client = TestClient(app.router)
+
+
+class WritesTestCase(unittest.TestCase):
+    """
+    Base class of the tests where tasks are written to a log, or a database, in a temporary directory
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.directory.name, "tasks.log")
+        self.patches = [
+            mock.patch.object(database, "TASKS_LOG_PATH", self.log_path),
+            mock.patch.object(database, "DATA_SQLITE_PATH", os.path.join(self.directory.name, "data.sqlite3")),
+        ]
+        for patch in self.patches:
+            patch.start()
+        reload_data()
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        reload_data()
+        self.directory.cleanup()
+
+
+@unittest.skipUnless(DATA_WRITABLE, "the tasks can't be written to a snapshot or to columns")
+class TestTaskWrites(WritesTestCase):
+    """
+    Class where tasks are written
+    """
+
+    @staticmethod
+    def titles(title: str) -> list[int]:
+        """
+        Search the tasks by title
+        :param title: Title that the tasks should contain
+        :return: Identifiers of the tasks found
+        """
+        return [task["id"] for task in client.get("/tasks/", params={"title": title}).json()["data"]]
+
+    def test_create(self) -> None:
+        """
+        Test that a created task gets the next identifier and is found through every index
+        """
+        stats = client.get("/users/2/stats").json()
+        response = client.post("/tasks/", json={"user_id": 2, "title": "Write the quarterly report"})
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        task = {"user_id": 2, "id": TASKS_COUNT + 1, "title": "Write the quarterly report", "completed": False}
+        self.assertEqual(task, response.json())
+        self.assertEqual(task, client.get(f"/tasks/{TASKS_COUNT + 1}").json())
+        self.assertEqual(task, client.get("/tasks/").json()["data"][-1])
+        self.assertEqual(task, client.get("/users/2/tasks").json()["data"][-1])
+        self.assertEqual([TASKS_COUNT + 1], self.titles("quarterly"))
+        self.assertEqual(stats["total"] + 1, client.get("/users/2/stats").json()["total"])
+
+    def test_create_fail(self) -> None:
+        """
+        Test creating a task of a user that does not exist, or without a title
+        """
+        response = client.post("/tasks/", json={"user_id": USERS_COUNT + 1, "title": "Nobody does this"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = client.post("/tasks/", json={"user_id": 1})
+        self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_update(self) -> None:
+        """
+        Test that a changed task is moved in the indexes of the users and of the titles
+        """
+        task = client.get("/tasks/1").json()
+        self.assertIn(1, self.titles(task["title"]))
+        response = client.patch("/tasks/1", json={"user_id": 3, "title": "Renamed zebra task", "completed": True})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        changed = {"user_id": 3, "id": 1, "title": "Renamed zebra task", "completed": True}
+        self.assertEqual(changed, response.json())
+        self.assertEqual(changed, client.get("/tasks/1").json())
+        self.assertNotIn(1, self.titles(task["title"]))
+        self.assertEqual([1], self.titles("zebra"))
+        self.assertNotIn(1, [item["id"] for item in client.get(f"/users/{task['user_id']}/tasks").json()["data"]])
+        self.assertEqual(changed, client.get("/users/3/tasks").json()["data"][0])
+
+        response = client.patch("/tasks/1", json={"completed": False})
+        self.assertEqual({**changed, "completed": False}, response.json())
+
+    def test_update_fail(self) -> None:
+        """
+        Test changing a task that does not exist, or assigning it to a user that does not exist
+        """
+        response = client.patch(f"/tasks/{TASKS_COUNT + 1}", json={"completed": True})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        response = client.patch("/tasks/1", json={"user_id": USERS_COUNT + 1})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_delete(self) -> None:
+        """
+        Test that a deleted task is not found anymore, and that its identifier is not reused
+        """
+        task = client.get(f"/tasks/{TASKS_COUNT}").json()
+        response = client.delete(f"/tasks/{TASKS_COUNT}")
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, client.get(f"/tasks/{TASKS_COUNT}").status_code)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, client.delete(f"/tasks/{TASKS_COUNT}").status_code)
+        self.assertNotIn(TASKS_COUNT, [item["id"] for item in client.get("/tasks/").json()["data"]])
+        self.assertNotIn(TASKS_COUNT, self.titles(task["title"]))
+        self.assertEqual(TASKS_COUNT - 1, client.get("/stats").json()["total"])
+
+        response = client.post("/tasks/", json={"user_id": 1, "title": "After the deleted one"})
+        self.assertEqual(TASKS_COUNT + 1, response.json()["id"])
+
+    def test_replay(self) -> None:
+        """
+        Test that the writes are replayed when the data is loaded again
+        """
+        client.post("/tasks/", json={"user_id": 4, "title": "Replayed task", "completed": True})
+        client.patch("/tasks/5", json={"title": "Replayed change"})
+        client.delete("/tasks/6")
+        tasks = client.get("/tasks/").json()
+        generation = StaticData.Generation
+
+        reload_data()
+        self.assertLess(generation, StaticData.Generation)
+        self.assertEqual(tasks, client.get("/tasks/").json())
+
+    def test_result_cache(self) -> None:
+        """
+        Test that the results cached before a write are not served after it
+        """
+        before = client.get("/tasks/11").json()
+        client.patch("/tasks/11", json={"title": "Not cached"})
+        self.assertNotEqual(before, client.get("/tasks/11").json())
+        self.assertEqual("Not cached", client.get("/tasks/11").json()["title"])
+
+
+@unittest.skipUnless(DATA_WRITABLE and DATA_BACKEND == "memory", "the log is only kept when the data is in memory")
+class TestTasksLog(WritesTestCase):
+    """
+    Class where the log of the writes of the tasks is tested
+    """
+
+    def test_replay(self) -> None:
+        """
+        Test that every write is in the log
+        """
+        client.post("/tasks/", json={"user_id": 4, "title": "Replayed task", "completed": True})
+        client.patch("/tasks/5", json={"title": "Replayed change"})
+        client.delete("/tasks/6")
+        self.assertEqual(3, len(read_entries(self.log_path)[0]))
+
+    def test_compaction(self) -> None:
+        """
+        Test that compacting the log keeps the last write of each task, and the same tasks
+        """
+        for completed in (True, False, True):
+            client.patch("/tasks/7", json={"completed": completed})
+        client.delete("/tasks/8")
+        tasks = client.get("/tasks/").json()
+
+        compact_tasks_log()
+        self.assertEqual([], read_entries(self.log_path)[0])
+        compacted, _ = read_entries(f"{self.log_path}.compacted")
+        self.assertEqual([7, 8], sorted(entry.get("delete") or entry["put"]["id"] for entry in compacted))
+        reload_data()
+        self.assertEqual(tasks, client.get("/tasks/").json())
+
+    def test_compaction_in_background(self) -> None:
+        """
+        Test that the log is compacted in the background once it has enough entries
+        """
+        with mock.patch.object(database, "TASKS_LOG_COMPACT_ENTRIES", 2):
+            client.patch("/tasks/9", json={"completed": True})
+            self.assertFalse(os.path.exists(f"{self.log_path}.compacted"))
+            client.patch("/tasks/9", json={"completed": False})
+        for thread in threading.enumerate():
+            if thread.name == "tasks-log-compaction":
+                thread.join()
+        self.assertTrue(os.path.exists(f"{self.log_path}.compacted"))
+        self.assertEqual(0, StaticData.Current.journal.entries)
+
+    def test_writes_of_other_processes(self) -> None:
+        """
+        Test that the writes another process appends to the log are served without reloading the data, and that
+        the data is only replayed when the other process compacts the log
+        """
+        task = client.get("/tasks/12").json()
+        dataset, generation = StaticData.Current, StaticData.Generation
+        other = TaskJournal(self.log_path)
+        other.replay()
+        with other.locked():
+            other.tail()
+            other.append({"put": {**task, "title": "Written elsewhere"}})
+        self.assertEqual("Written elsewhere", client.get("/tasks/12").json()["title"])
+        response = client.get("/tasks/", params={"title": "written elsewhere"})
+        self.assertEqual([12], [item["id"] for item in response.json()["data"]])
+        self.assertIs(dataset, StaticData.Current)
+        self.assertEqual(generation + 1, StaticData.Generation)
+
+        with other.locked():
+            other.tail()
+            other.append({"delete": 12})
+            other.compact()
+        self.assertEqual(status.HTTP_404_NOT_FOUND, client.get("/tasks/12").status_code)
+        self.assertIsNot(dataset, StaticData.Current)
+
+    def test_writes_of_other_processes_uncached(self) -> None:
+        """
+        Test that the lists and the streams serve the writes of other processes when the result cache is disabled
+        """
+        task = client.get("/tasks/14").json()
+        other = TaskJournal(self.log_path)
+        other.replay()
+        with other.locked():
+            other.tail()
+            other.append({"put": {**task, "title": "Listed elsewhere"}})
+        response = uncached_client.get("/tasks/", params={"title": "listed elsewhere"})
+        self.assertEqual([14], [item["id"] for item in response.json()["data"]])
+
+        with other.locked():
+            other.tail()
+            other.append({"put": {**task, "title": "Streamed elsewhere"}})
+        response = uncached_client.get(
+            "/tasks/", params={"title": "streamed elsewhere"}, headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual([14], [json.loads(line)["id"] for line in response.text.splitlines()])
+
+    def test_torn_write(self) -> None:
+        """
+        Test that a write cut short by a crash is ignored, and overwritten by the next write
+        """
+        client.patch("/tasks/10", json={"completed": True})
+        with open(self.log_path, "ab") as file:
+            file.write(b'{"put":{"user_id":1,"id":10')
+        reload_data()
+        self.assertTrue(client.get("/tasks/10").json()["completed"])
+        client.patch("/tasks/10", json={"title": "After the crash"})
+        self.assertEqual(2, len(read_entries(self.log_path)[0]))
+        reload_data()
+        self.assertEqual("After the crash", client.get("/tasks/10").json()["title"])
+
+
+@unittest.skipUnless(DATA_BACKEND == "sqlite", "the tasks are only written to a database in SQLite")
+class TestDatabaseWrites(WritesTestCase):
+    """
+    Class where the tasks are written to the database by other processes
+    """
+
+    def test_writes_of_other_processes(self) -> None:
+        """
+        Test that the results cached before another process writes the tasks are not served after it
+        """
+        task = client.get("/tasks/13").json()
+        generation = StaticData.Generation
+        other = SqliteWrites(SqliteStore(StaticData.Current.store.path))
+        with other.locked():
+            other.append({"put": {**task, "title": "Written elsewhere"}})
+        self.assertEqual("Written elsewhere", client.get("/tasks/13").json()["title"])
+        self.assertEqual(generation + 1, StaticData.Generation)
+
+    def test_writes_of_other_processes_uncached(self) -> None:
+        """
+        Test that the lists serve the writes of other processes when the result cache is disabled
+        """
+        task = client.get("/tasks/15").json()
+        other = SqliteWrites(SqliteStore(StaticData.Current.store.path))
+        with other.locked():
+            other.append({"put": {**task, "title": "Listed elsewhere"}})
+        response = uncached_client.get("/tasks/", params={"title": "listed elsewhere"})
+        self.assertEqual([15], [item["id"] for item in response.json()["data"]])
+
+
+@unittest.skipIf(DATA_WRITABLE, "the tasks can be written when the data is kept in memory or in SQLite")
+class TestReadOnlyTasks(unittest.TestCase):
+    """
+    Class where the tasks can't be written
+    """
+
+    def test_writes_not_implemented(self) -> None:
+        """
+        Test that writes are rejected when the tasks are served from a snapshot or stored as columns
+        """
+        responses = [
+            client.post("/tasks/", json={"user_id": 1, "title": "Not written"}),
+            client.patch("/tasks/1", json={"completed": True}),
+            client.delete("/tasks/1"),
+        ]
+        for response in responses:
+            self.assertEqual(status.HTTP_501_NOT_IMPLEMENTED, response.status_code)
+
+
+if __name__ == "__main__":
+    unittest.main()